@@ -6,8 +6,24 @@ Author: Cyrus Ramavarapu
 Date: 23 October 2016
 """
 import sys
+import json
+import struct
 import pytest
 from xsim import *
+import isa
+import packed_trace
+import xsim_batch
+import xsim_bbv
+import xsim_branch
+import xsim_cache
+import xsim_int
+import xsim_memory
+import xsim_pipeline
+import xsim_profile
+import xsim_simpoint
+import xsim_sweep
+import xsim_trace
+import xsim_watchdog
 
 from bitstring import Bits
 
@@ -727,10 +743,10 @@ def test_lw_instruction():
     load_register_fields = ''.join([Rs, right_operand])
     lis(load_register_fields)
 
-    DATA_MEMORY[right_operand.zfill(16)] = 16 
+    DATA_MEMORY[int(right_operand, 2)] = 16
     load_data_fields = ''.join([Rd, Rs, Rt])
 
-    expected_value = Bits(int=DATA_MEMORY[right_operand.zfill(16)], length=16).bin
+    expected_value = Bits(int=DATA_MEMORY[int(right_operand, 2)], length=16).bin
     return_value = load_word(load_data_fields)
 
     assert expected_value == return_value
@@ -757,3 +773,691 @@ def test_sw_instruction():
     return_value = store_word(store_word_fields)
 
     assert expected_value == return_value 
+
+
+def test_int_engine_matches_bitstring(tmp_path):
+    """Tests that the integer engine produces the same
+       statistics as the bitstring engine.
+    """
+    config_file = 'configs/config_1.json'
+
+    for input_file in ['input/input_1.txt', 'input/input_2.txt']:
+        bitstring_output = str(tmp_path / 'bitstring.json')
+        int_output = str(tmp_path / 'int.json')
+
+        xsim(config_file, input_file, bitstring_output)
+        xsim(config_file, input_file, int_output, engine='int')
+
+        with open(bitstring_output) as bitstring_stats:
+            expected_value = bitstring_stats.read()
+        with open(int_output) as int_stats:
+            return_value = int_stats.read()
+
+        assert expected_value == return_value
+
+
+def test_int_mul_wraps():
+    """Tests the integer engine mul keeps the lower
+       16 bits and reports the full product.
+    """
+    xsim_int.init_register_file()
+    xsim_int.lis(1, 0x7F)
+    xsim_int.lui(1, 0x7F)
+    xsim_int.mul_instruction(2, 1, 1)
+
+    assert (0x7F7F * 0x7F7F) & 0xFFFF == xsim_int.REGISTERS[2]
+    assert 0x7F7F * 0x7F7F == xsim_int.REGISTER_STATS[2]
+
+
+def test_int_exp_bounded():
+    """Tests the integer engine exp matches the bitstring
+       engine and stays bounded for large exponents.
+    """
+    init()
+    xsim_int.init_register_file()
+    Rs = '001'
+    Rt = '011'
+    lis(''.join([Rs, Bits(int=3, length=8).bin]))
+    lis(''.join([Rt, Bits(int=7, length=8).bin]))
+    xsim_int.lis(1, 3)
+    xsim_int.lis(3, 7)
+
+    expected_value = Bits(bin=exp_instruction('101001011')).uint
+    return_value = xsim_int.exp_instruction(5, 1, 3)
+
+    assert expected_value == return_value
+
+    xsim_int.lis(3, 0x7F)
+    xsim_int.lui(3, 0x7F)
+
+    assert pow(3, 0x7F7F, 0x10000) == xsim_int.exp_instruction(5, 1, 3)
+
+
+def test_decode_instruction():
+    """Tests the decode stage extracts the fields and
+       operands of R, I and IX type instructions.
+    """
+    (op_id, rd, rs, rt, imm8, imm11, handler, operands) = \
+        xsim_int.decode_instruction(0b00101101001011 << 2)
+    assert (0b00101, 5, 1, 3) == (op_id, rd, rs, rt)
+    assert xsim_int.mul_instruction == handler
+    assert (5, 1, 3) == operands
+
+    record = xsim_int.decode_instruction(0x89FF)
+    assert (0b10001, 1, 0xFF) == (record[0], record[1], record[4])
+    assert (1, 0xFF) == record[7]
+
+    record = xsim_int.decode_instruction(0xC004)
+    assert (0b11000, 4, (4,)) == (record[0], record[5], record[7])
+
+
+def test_jit_engine_matches_int(tmp_path):
+    """Tests that compiled basic blocks, including a block
+       that loops on itself, produce the same statistics as
+       the integer engine.
+    """
+    config_file = 'configs/config_1.json'
+    loop_file = tmp_path / 'loop.txt'
+    # r5 = 1, r1 = 3, r2 = 20; inner loop adds and multiplies
+    # counting r2 down, outer loop counts r1 down
+    loop_file.write_text('\n'.join(['# nested loop', '8501', '8103', '8214',
+                                    '0354', '2C68', '0A54', 'B203', '0934',
+                                    'B102', '6800']) + '\n')
+
+    for input_file in ['input/input_1.txt', 'input/input_2.txt',
+                       str(loop_file)]:
+        int_output = str(tmp_path / 'int.json')
+        jit_output = str(tmp_path / 'jit.json')
+
+        xsim(config_file, input_file, int_output, engine='int')
+        xsim(config_file, input_file, jit_output, engine='jit')
+
+        with open(int_output) as int_stats:
+            expected_value = int_stats.read()
+        with open(jit_output) as jit_stats:
+            return_value = jit_stats.read()
+
+        assert expected_value == return_value
+
+
+def test_trace_sink_matches_across_engines(tmp_path):
+    """Tests that every engine writes the same full state
+       trace and that the last record holds the final cycles.
+    """
+    config_file = 'configs/config_1.json'
+    input_file = 'input/input_2.txt'
+    traces = []
+
+    for engine in ['bitstring', 'int', 'jit']:
+        trace_file = str(tmp_path / '{}.trace'.format(engine))
+        output_file = str(tmp_path / '{}.json'.format(engine))
+        trace = xsim_trace.TraceSink(trace_file, xsim_trace.TRACE_FULL)
+        xsim(config_file, input_file, output_file, engine=engine,
+             trace=trace, display=False)
+        trace.close()
+
+        with open(trace_file) as trace_in:
+            traces.append(trace_in.read())
+
+    assert traces[0] == traces[1] == traces[2]
+
+    records = [json.loads(line) for line in traces[0].splitlines()]
+    assert STATISTICS_DICT['stats'][0]['instructions'] == len(records)
+    assert STATISTICS_DICT['stats'][0]['cycles'] == records[-1]['cycles']
+    assert 'halt' == records[-1]['op']
+
+
+def test_memory_image_load_and_dump(tmp_path):
+    """Tests that a memory image is preloaded and the final
+       memory dumped by every engine, and that unwritten
+       words read as 0.
+    """
+    config_file = 'configs/config_1.json'
+    copy_file = tmp_path / 'copy.txt'
+    # r1 = 3, r2 = M[r1], r3 = 5, M[r3] = r2, r4 = 9, r5 = M[r4]
+    copy_file.write_text('\n'.join(['# copy word', '8103', '4220', '8305',
+                                    '4868', '8409', '4580', '6800']) + '\n')
+    image_file = tmp_path / 'image.bin'
+    image_file.write_bytes(struct.pack('<4H', 1, 2, 3, 0x1234))
+    dumps = []
+
+    for engine in ['bitstring', 'int', 'jit']:
+        output_file = str(tmp_path / '{}.json'.format(engine))
+        dump_file = tmp_path / '{}.bin'.format(engine)
+        xsim(config_file, str(copy_file), output_file, engine=engine,
+             display=False, memory_image=str(image_file),
+             memory_dump=str(dump_file))
+        dumps.append(dump_file.read_bytes())
+
+        assert 0 == STATISTICS_DICT['registers'][0]['r5']
+
+    assert dumps[0] == dumps[1] == dumps[2]
+    assert xsim_memory.MEMORY_BYTES == len(dumps[0])
+    assert (1, 2, 3, 0x1234, 0, 0x1234) == struct.unpack('<6H', dumps[0][:12])
+
+
+def test_packed_trace_matches_hex(tmp_path):
+    """Tests that a packed trace loads the same words as its
+       hex trace and that every engine runs it the same way.
+    """
+    config_file = 'configs/config_1.json'
+    input_file = 'input/input_1.txt'
+    packed_file = str(tmp_path / 'input_1.xpt')
+    words = packed_trace.load_hex(input_file)
+    packed_trace.write_packed(packed_file, words)
+
+    assert packed_trace.is_packed(packed_file)
+    assert not packed_trace.is_packed(input_file)
+    assert list(words) == list(packed_trace.read_packed(packed_file))
+
+    for engine in ['bitstring', 'int', 'jit']:
+        hex_stats = json.dumps(simulate(configure_latency(config_file),
+                                        input_file, engine))
+        packed_stats = json.dumps(simulate(configure_latency(config_file),
+                                           packed_file, engine))
+        assert hex_stats == packed_stats
+
+
+def test_sweep_matches_single_runs(tmp_path):
+    """Tests that every configuration scored by a sweep has
+       the cycles of a full simulation with that configuration.
+    """
+    input_file = 'input/input_2.txt'
+    config_list = [{'add': 3, 'mul': 7}, {'div': 12, 'exp': 5, 'sub': 2}, {}]
+    config_file = tmp_path / 'configs.json'
+    config_file.write_text(json.dumps(config_list))
+
+    results = xsim_sweep.sweep(
+        xsim_int.parse_input(input_file),
+        xsim_sweep.load_configurations([str(config_file),
+                                        'configs/config_1.json']))
+    config_list.append(configure_latency('configs/config_1.json'))
+
+    assert len(config_list) == len(results)
+    for (position, config_values) in enumerate(config_list):
+        single_config = tmp_path / 'config_{}.json'.format(position)
+        single_config.write_text(json.dumps(config_values))
+        xsim(str(single_config), input_file, str(tmp_path / 'out.json'),
+             engine='int', display=False)
+
+        stats = STATISTICS_DICT['stats'][0]
+        assert stats['cycles'] == results[position]['cycles']
+        assert stats['instructions'] == results[position]['instructions']
+
+    # a program running off the end of instruction memory
+    for engine in ['int', 'jit']:
+        with pytest.raises(ValueError):
+            xsim_sweep.sweep([0x8101, 0x8200],
+                             xsim_sweep.load_configurations(
+                                 ['configs/config_1.json']), engine)
+
+
+def test_batch_matches_single_runs(tmp_path):
+    """Tests that the batch runner gives every job the
+       statistics of a single run, including jobs that abort
+       and jobs returned by a worker in the same chunk.
+    """
+    input_files = ['input/input_1.txt', 'input/input_2.txt',
+                   'input/input_3.txt']
+    config_files = []
+    for latency in range(1, 5):
+        config_file = str(tmp_path / 'lat{}.json'.format(latency))
+        with open(config_file, 'w') as config:
+            json.dump(dict.fromkeys(['div', 'mod', 'exp', 'mul', 'add'],
+                                    latency), config)
+        config_files.append(config_file)
+
+    results = xsim_batch.run_batch(input_files, config_files, engine='int',
+                                   workers=1)
+
+    assert len(input_files) * len(config_files) == len(results)
+    assert 'abort' in results[-1]['statistics']
+    jobs = [(input_file, config_file) for input_file in input_files
+            for config_file in config_files]
+    for ((input_file, config_file), result) in zip(jobs, results):
+        xsim(config_file, input_file, str(tmp_path / 'out.json'),
+             engine='int', display=False)
+        assert input_file == result['input']
+        assert config_file == result['config']
+        assert STATISTICS_DICT == result['statistics']
+
+
+def test_checkpoint_resume_matches_full_run(tmp_path):
+    """Tests that a run stopped at a checkpoint by one engine
+       and resumed by another ends with the statistics of an
+       uninterrupted run.
+    """
+    config_file = 'configs/config_1.json'
+    input_file = 'input/input_2.txt'
+    checkpoint_file = str(tmp_path / 'run.ckpt')
+    output_file = str(tmp_path / 'out.json')
+
+    xsim(config_file, input_file, output_file, engine='int', display=False)
+    expected_value = json.dumps(STATISTICS_DICT)
+
+    for (first, second) in [('bitstring', 'jit'), ('jit', 'int'),
+                            ('int', 'bitstring')]:
+        xsim(config_file, input_file, output_file, engine=first,
+             display=False, stop_instruction=7,
+             checkpoint_file=checkpoint_file)
+        assert 7 == STATISTICS_DICT['stats'][0]['instructions']
+
+        xsim(config_file, input_file, output_file, engine=second,
+             display=False, resume_file=checkpoint_file)
+        assert expected_value == json.dumps(STATISTICS_DICT)
+
+
+def test_watchdog_budgets(tmp_path):
+    """Tests that instruction and cycle budgets abort every
+       engine at the same instruction with partial statistics.
+    """
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({'add': 3}))
+    loop_file = tmp_path / 'loop.txt'
+    # r1 = 1, then add r2 = r2 + r1 forever
+    loop_file.write_text('\n'.join(['8101', '0224', 'C001']) + '\n')
+    output_file = str(tmp_path / 'out.json')
+
+    for engine in ['bitstring', 'int', 'jit']:
+        xsim(str(config_file), str(loop_file), output_file, engine=engine,
+             display=False,
+             watchdog=xsim_watchdog.Watchdog(max_instructions=100))
+        assert 100 == STATISTICS_DICT['stats'][0]['instructions']
+        assert 'instruction budget' == STATISTICS_DICT['abort'][0]['reason']
+
+        xsim(str(config_file), str(loop_file), output_file, engine=engine,
+             display=False, watchdog=xsim_watchdog.Watchdog(max_cycles=100))
+        with open(output_file) as stats_file:
+            stats = json.load(stats_file)
+        # liz then 24 adds and jumps take 97 cycles, the next add
+        # reaches the budget on the 50th instruction
+        assert 100 == stats['stats'][0]['cycles']
+        assert 50 == stats['stats'][0]['instructions']
+        assert 'cycle budget' == stats['abort'][0]['reason']
+
+
+def test_jump_outside_memory_aborts(tmp_path):
+    """Tests that a jump to a negative PC or past the end of
+       instruction memory aborts every engine instead of
+       wrapping around the program.
+    """
+    config_file = 'configs/config_1.json'
+    output_file = str(tmp_path / 'out.json')
+    # lis r2 -1 or 4, jr r2, halt
+    for (words, pc) in [(['8AFF', '6040', '6800'], -1),
+                        (['8A04', '6040', '6800'], 4)]:
+        program_file = tmp_path / 'jump.txt'
+        program_file.write_text('\n'.join(words) + '\n')
+
+        for engine in ['bitstring', 'int', 'jit']:
+            xsim(config_file, str(program_file), output_file, engine=engine,
+                 display=False)
+            assert 2 == STATISTICS_DICT['stats'][0]['instructions']
+            assert [{'reason': xsim_watchdog.ABORT_PC, 'pc': pc}] == \
+                STATISTICS_DICT['abort']
+
+        simulator = XSim()
+        simulator.load_program([int(word, 16) for word in words])
+        assert 2 == simulator.run()
+        assert [{'reason': xsim_watchdog.ABORT_PC, 'pc': pc}] == \
+            simulator.stats()['abort']
+
+
+def test_profile_counts_nested_loop(tmp_path):
+    """Tests that every engine profiles the executions of each
+       PC, the taken and not taken counts of each branch and the
+       cycles of each block of a nested loop.
+    """
+    config_file = 'configs/config_1.json'
+    loop_file = tmp_path / 'loop.txt'
+    # r5 = 1, r1 = 3, r2 = 20; inner loop adds and multiplies
+    # counting r2 down, outer loop counts r1 down
+    loop_file.write_text('\n'.join(['8501', '8103', '8214', '0354', '2C68',
+                                    '0A54', 'B203', '0934', 'B102',
+                                    '6800']) + '\n')
+    output_file = str(tmp_path / 'out.json')
+
+    for engine in ['bitstring', 'int', 'jit']:
+        profile = xsim_profile.Profile()
+        xsim(config_file, str(loop_file), output_file, engine=engine,
+             display=False, profile=profile)
+        report = profile.report()
+
+        executions = [record['executions'] for record in report['pcs']]
+        assert [1, 1, 3, 60, 60, 60, 60, 3, 3, 1] == executions
+        assert (57, 3) == (report['pcs'][6]['taken'],
+                           report['pcs'][6]['not_taken'])
+        assert (2, 1) == (report['pcs'][8]['taken'],
+                          report['pcs'][8]['not_taken'])
+        assert 3 == report['blocks'][0]['start']
+        assert STATISTICS_DICT['stats'][0]['cycles'] == report['cycles']
+        assert report['cycles'] == sum(block['cycles']
+                                       for block in report['blocks'])
+
+
+def test_xsim_instances_run_independently(tmp_path):
+    """Tests that interleaved XSim instances keep their own
+       state and end with the statistics of single runs.
+    """
+    config_file = 'configs/config_1.json'
+    input_files = ['input/input_1.txt', 'input/input_2.txt',
+                   'input/input_3.txt']
+    simulators = []
+
+    for input_file in input_files:
+        simulator = XSim(configure_latency(config_file))
+        simulator.load_program(xsim_int.parse_input(input_file))
+        simulators.append(simulator)
+
+    while any(simulator.end is None for simulator in simulators):
+        for simulator in simulators:
+            simulator.step()
+            simulator.run(2)
+
+    for (input_file, simulator) in zip(input_files, simulators):
+        xsim(config_file, input_file, str(tmp_path / 'out.json'),
+             engine='int', display=False)
+        assert STATISTICS_DICT == simulator.stats()
+        assert 0 == simulator.run()
+
+
+def test_cache_hierarchy_times_loads_and_stores(tmp_path):
+    """Tests that every engine and XSim time a strided store
+       and load loop through two cache levels the same way.
+    """
+    config_file = 'configs/config_1.json'
+    cache_file = tmp_path / 'cache.json'
+    cache_file.write_text(json.dumps({
+        'levels': [{'name': 'L1', 'size': 256, 'associativity': 2,
+                    'line_size': 16, 'latency': 1},
+                   {'name': 'L2', 'size': 4096, 'associativity': 4,
+                    'line_size': 32, 'latency': 6}],
+        'memory_latency': 40}))
+    loop_file = tmp_path / 'loop.txt'
+    # r1 = 0, r2 = 8, r3 = 40, r5 = 1; store r3 to M[r1], load it
+    # back and step r1 by one L1 line 40 times
+    loop_file.write_text('\n'.join(['8100', '8208', '8328', '8501', '482C',
+                                    '4420', '0128', '0B74', 'B304',
+                                    '6800']) + '\n')
+    uncached = simulate(configure_latency(config_file), str(loop_file),
+                        'int')['stats'][0]['cycles']
+
+    for engine in ['bitstring', 'int', 'jit']:
+        cache = xsim_cache.load_cache_config(str(cache_file))
+        statistics = simulate(configure_latency(config_file),
+                              str(loop_file), engine, cache=cache)
+        (l1, l2) = statistics['cache'][0]['levels']
+
+        # stores miss L1 and every other one misses L2, loads hit
+        assert (40, 40) == (l1['hits'], l1['misses'])
+        assert (20, 20) == (l2['hits'], l2['misses'])
+        assert 20 * 6 + 20 * 46 == statistics['cache'][0]['stall_cycles']
+        assert uncached + 1040 == statistics['stats'][0]['cycles']
+
+    simulator = XSim(configure_latency(config_file),
+                     xsim_cache.load_cache_config(str(cache_file)))
+    simulator.load_program(xsim_int.parse_input(str(loop_file)))
+    simulator.run()
+    assert statistics == simulator.stats()
+
+
+def test_cache_stalls_count_against_cycle_budget(tmp_path):
+    """Tests that the stall cycles of the cache are charged as
+       the accesses happen, so a cycle budget stops every engine
+       at the same instruction and the trace agrees with the
+       statistics.
+    """
+    config_file = 'configs/config_1.json'
+    cache_file = tmp_path / 'cache.json'
+    cache_file.write_text(json.dumps({
+        'levels': [{'name': 'L1', 'size': 64, 'associativity': 1,
+                    'line_size': 16, 'latency': 1}],
+        'memory_latency': 40}))
+    loop_file = tmp_path / 'loop.txt'
+    # r1 = 100, r2 = 16, r3 = 1; load M[r5], step r5 by 16 words
+    # and count r1 down, every load misses
+    loop_file.write_text('\n'.join(['8164', '8210', '8301', '44A0', '05A8',
+                                    '092C', 'A103', '6800']) + '\n')
+    trace_file = str(tmp_path / 'loop.trace')
+
+    runs = []
+    for engine in ['bitstring', 'int', 'jit']:
+        cache = xsim_cache.load_cache_config(str(cache_file))
+        trace = xsim_trace.TraceSink(trace_file, xsim_trace.TRACE_OPCODE)
+        statistics = simulate(configure_latency(config_file),
+                              str(loop_file), engine, trace=trace,
+                              cache=cache,
+                              watchdog=xsim_watchdog.Watchdog(
+                                  max_cycles=1000))
+        trace.close()
+        with open(trace_file) as trace_lines:
+            records = [json.loads(line) for line in trace_lines]
+
+        # each iteration takes 4 cycles and a 40 cycle stall, the
+        # load of the 23rd one reaches the budget
+        assert 'cycle budget' == statistics['abort'][0]['reason']
+        assert 1012 == statistics['stats'][0]['cycles']
+        assert 92 == statistics['stats'][0]['instructions']
+        assert 23 * 40 == statistics['cache'][0]['stall_cycles']
+        assert records[-1]['cycles'] == statistics['stats'][0]['cycles']
+        runs.append(statistics)
+
+    assert runs[0] == runs[1] == runs[2]
+
+
+def test_branch_predictors_side_by_side(tmp_path):
+    """Tests that predictors compared in one run agree across
+       engines and that the first one adds its penalty.
+    """
+    config_file = 'configs/config_1.json'
+    loop_file = tmp_path / 'loop.txt'
+    # r5 = 1, r1 = 3, r2 = 20; inner loop adds and multiplies
+    # counting r2 down, outer loop counts r1 down
+    loop_file.write_text('\n'.join(['8501', '8103', '8214', '0354', '2C68',
+                                    '0A54', 'B203', '0934', 'B102',
+                                    '6800']) + '\n')
+    unpredicted = simulate(configure_latency(config_file), str(loop_file),
+                        'int')['stats'][0]['cycles']
+
+    for engine in ['bitstring', 'int', 'jit']:
+        branches = xsim_branch.BranchPredictors(
+            [xsim_branch.make_predictor(spec)
+             for spec in ['static-not-taken', 'bimodal:16', 'gshare:64:4']],
+            penalty=3)
+        statistics = simulate(configure_latency(config_file),
+                              str(loop_file), engine, branches=branches)
+        (static, bimodal, gshare) = statistics['branch'][0]['predictors']
+
+        # the inner branch is taken 57 of 60 times, the outer
+        # one 2 of 3 times
+        assert [(6, 60, 57, 57), (8, 3, 2, 2)] == [
+            (record['pc'], record['executions'], record['taken'],
+             record['mispredictions']) for record in static['pcs']]
+        assert 4 == bimodal['mispredictions']
+        assert 63 == gshare['branches']
+        assert unpredicted + 59 * 3 == statistics['stats'][0]['cycles']
+
+    with pytest.raises(ValueError):
+        xsim_branch.make_predictor('bimodal:100')
+
+
+def test_mispredictions_count_against_cycle_budget(tmp_path):
+    """Tests that the misprediction penalty is charged as the
+       branch retires, so a cycle budget stops every engine at
+       the same instruction and the trace and the basic block
+       vectors agree with the statistics.
+    """
+    config_file = 'configs/config_1.json'
+    loop_file = tmp_path / 'loop.txt'
+    # the loop of test_branch_predictors_side_by_side
+    loop_file.write_text('\n'.join(['8501', '8103', '8214', '0354', '2C68',
+                                    '0A54', 'B203', '0934', 'B102',
+                                    '6800']) + '\n')
+    trace_file = str(tmp_path / 'loop.trace')
+
+    runs = []
+    for engine in ['bitstring', 'int', 'jit']:
+        branches = xsim_branch.BranchPredictors(
+            [xsim_branch.make_predictor('static-not-taken')], penalty=10)
+        trace = xsim_trace.TraceSink(trace_file, xsim_trace.TRACE_OPCODE)
+        bbv = xsim_bbv.BasicBlockVectors(50)
+        statistics = simulate(configure_latency(config_file),
+                              str(loop_file), engine, trace=trace,
+                              branches=branches, bbv=bbv,
+                              watchdog=xsim_watchdog.Watchdog(
+                                  max_cycles=500))
+        trace.close()
+        with open(trace_file) as trace_lines:
+            records = [json.loads(line) for line in trace_lines]
+
+        # 36 mispredictions of 10 cycles reach the budget after
+        # 150 instructions
+        assert 'cycle budget' == statistics['abort'][0]['reason']
+        assert (510, 150) == (statistics['stats'][0]['cycles'],
+                              statistics['stats'][0]['instructions'])
+        assert 36 == statistics['branch'][0]['predictors'][0][
+            'mispredictions']
+        assert records[-1]['cycles'] == statistics['stats'][0]['cycles']
+        assert [171, 171, 168] == [interval['cycles']
+                                   for interval in bbv.intervals]
+        runs.append(statistics)
+
+    assert runs[0] == runs[1] == runs[2]
+
+
+def test_wrappers_in_any_order(tmp_path):
+    """Tests that the profile, branch and cache wrappers take
+       the operands of handlers already wrapped by the trace,
+       which makes every entry take the PC.
+    """
+    # the loop of test_branch_predictors_side_by_side with a
+    # load from r1 before the halt
+    words = [0x8501, 0x8103, 0x8214, 0x0354, 0x2C68, 0x0A54, 0xB203,
+             0x0934, 0xB102, 0x4020, 0x6800]
+    latency_dict = configure_latency('configs/config_1.json')
+    runs = []
+
+    for trace_first in [False, True]:
+        machine = xsim_int.Machine()
+        program = xsim_int.decode_program(words, machine.handlers)
+        dispatch_table = isa.build_dispatch_table(machine.handlers,
+                                                  latency_dict)
+        trace_file = tmp_path / 'trace_{}.jsonl'.format(trace_first)
+        sink = xsim_trace.TraceSink(str(trace_file),
+                                    xsim_trace.TRACE_OPCODE)
+        profile = xsim_profile.Profile()
+        profile.start([record[0] for record in program], dispatch_table, 0)
+        branches = xsim_branch.BranchPredictors(
+            [xsim_branch.make_predictor('bimodal:16')])
+        cache = xsim_cache.CacheHierarchy(
+            [xsim_cache.CacheLevel('L1', 64, 1, 16, 1)])
+
+        if trace_first:
+            dispatch_table = xsim_trace.traced_dispatch_table(
+                dispatch_table, sink)
+        dispatch_table = profile.profiled_dispatch_table(dispatch_table)
+        dispatch_table = branches.predicted_dispatch_table(dispatch_table)
+        dispatch_table = cache.cached_dispatch_table(dispatch_table,
+                                                     machine.load_address,
+                                                     machine.store_address)
+        if not trace_first:
+            dispatch_table = xsim_trace.traced_dispatch_table(
+                dispatch_table, sink)
+
+        op_counts = [0] * len(isa.STAT_NAMES)
+        end = xsim_int.execute(program, dispatch_table, 0, op_counts)
+        sink.close()
+        profile.finish(end[0], True)
+        runs.append((end, op_counts, profile.report(),
+                     dict(branches.executions), list(cache.counts),
+                     trace_file.read_text()))
+
+    assert runs[0] == runs[1]
+    assert 63 == sum(runs[0][3].values())
+    assert 1 == runs[0][4][0]
+
+
+def test_pipeline_stalls(tmp_path):
+    """Tests that the in-order pipeline times RAW, load use and
+       branch stalls the same way in every engine.
+    """
+    config_file = tmp_path / 'config.json'
+    config_file.write_text('{"mul": 3}')
+    pipeline_file = tmp_path / 'pipeline.txt'
+    # r1 = 3, r2 = 4, r3 = r1 * r2, independent add, r5 = r3 + r3,
+    # r6 = M[r1], r7 = r6 + r6, bz r7 over a liz to the halt
+    pipeline_file.write_text('\n'.join(['8103', '8204', '2B28', '0428',
+                                        '056C', '4620', '07D8', 'BF09',
+                                        '8100', '6800']) + '\n')
+    latency_dict = configure_latency(str(config_file))
+    cycles = simulate(latency_dict, str(pipeline_file),
+                      'int')['stats'][0]['cycles']
+
+    for engine in ['bitstring', 'int', 'jit']:
+        pipeline = xsim_pipeline.Pipeline()
+        statistics = simulate(latency_dict, str(pipeline_file), engine,
+                              pipeline=pipeline)
+        record = statistics['pipeline'][0]
+
+        # the add after the multiply completes first, the add
+        # using its result waits one cycle, the add using the
+        # load one cycle and the halt two cycles of bubbles
+        assert 9 == record['instructions']
+        assert 17 == record['cycles']
+        assert {'raw': 1, 'load_use': 1, 'structural': 0, 'waw': 0,
+                'control': 2} == record['stalls']
+        assert cycles == statistics['stats'][0]['cycles']
+
+    pipeline = xsim_pipeline.Pipeline(forwarding=False)
+    statistics = simulate(latency_dict, str(pipeline_file), 'jit',
+                          pipeline=pipeline)
+    # without forwarding every result is read in ID during WB
+    assert 24 == statistics['pipeline'][0]['cycles']
+    assert {'raw': 7, 'load_use': 2, 'structural': 0, 'waw': 0,
+            'control': 2} == statistics['pipeline'][0]['stalls']
+
+
+def test_simpoints_estimate_cpi(tmp_path):
+    """Tests that the basic block vectors of a two phase program
+       agree across engines and that its simpoints estimate its
+       CPI.
+    """
+    config_file = tmp_path / 'config.json'
+    config_file.write_text('{"mul": 5}')
+    phase_file = tmp_path / 'phases.txt'
+    # twice: 100 iterations of two adds, then 100 iterations of
+    # two multiplies
+    phase_file.write_text('\n'.join(['8702', '8601', '8164', '0258', '0378',
+                                     '0938', 'A103', '8164', '2C4C', '2D68',
+                                     '0938', 'A108', '0FF8', 'A702',
+                                     '6800']) + '\n')
+    latency_dict = configure_latency(str(config_file))
+
+    vectors = []
+    for engine in ['bitstring', 'int', 'jit']:
+        bbv = xsim_bbv.BasicBlockVectors(100)
+        statistics = simulate(latency_dict, str(phase_file), engine,
+                              bbv=bbv)
+        vectors.append(bbv.intervals)
+    assert vectors[0] == vectors[1] == vectors[2]
+
+    intervals = vectors[0]
+    # every interval ends with the block reaching 100 instructions
+    assert all(100 <= interval['instructions'] <= 103
+               for interval in intervals[:-1])
+    assert statistics['stats'][0]['instructions'] == sum(
+        interval['instructions'] for interval in intervals)
+    assert statistics['stats'][0]['cycles'] == sum(
+        interval['cycles'] for interval in intervals)
+    assert [[3, 100]] == intervals[2]['blocks']
+
+    manifest = xsim_simpoint.build_manifest(intervals, max_k=4)
+    simpoints = manifest['simpoints']
+    assert 2 <= manifest['k'] <= 4
+    assert abs(1 - sum(simpoint['weight'] for simpoint in simpoints)) < 1e-5
+    assert manifest['xsim_cpi_error'] < 0.05
+    # the add and the multiply phases are both represented
+    cpis = {interval['interval']: interval['cycles'] /
+            interval['instructions'] for interval in intervals}
+    assert min(cpis[simpoint['interval']] for simpoint in simpoints) < 1.1
+    assert max(cpis[simpoint['interval']] for simpoint in simpoints) > 2.9
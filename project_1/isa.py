@@ -0,0 +1,107 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  isa
+Course:  CS2410
+
+Opcode table of the X isa shared by the xsim engines and
+the dispatch table built from it.
+"""
+
+# DEFINES
+OPCODE_COUNT = 32
+HALT_OPCODE = 0b01101
+
+# Pseudo op_code of the record placed at the PC a run stops at.
+# It has an empty dispatch table entry past the real op_codes.
+STOP_OPCODE = OPCODE_COUNT
+
+# OPCODE MAPPING
+# op_code -> (name, operand format, control flow)
+OPCODE_MAP = {0b00000: ('add', 'rd rs rt', False),
+              0b00001: ('sub', 'rd rs rt', False),
+              0b00010: ('and', 'rd rs rt', False),
+              0b00011: ('nor', 'rd rs rt', False),
+              0b00100: ('div', 'rd rs rt', False),
+              0b00101: ('mul', 'rd rs rt', False),
+              0b00110: ('mod', 'rd rs rt', False),
+              0b00111: ('exp', 'rd rs rt', False),
+              0b01000: ('lw', 'rd rs', False),
+              0b01001: ('sw', 'rs rt', False),
+              0b10000: ('liz', 'rd imm8', False),
+              0b10001: ('lis', 'rd imm8', False),
+              0b10010: ('lui', 'rd imm8', False),
+              0b10100: ('bp', 'rd imm8', True),
+              0b10101: ('bn', 'rd imm8', True),
+              0b10110: ('bx', 'rd imm8', True),
+              0b10111: ('bz', 'rd imm8', True),
+              0b01100: ('jr', 'rs', True),
+              0b10011: ('jalr', 'rd rs', True),
+              0b11000: ('j', 'imm11', True),
+              0b01101: ('halt', '', True),
+              0b01110: ('put', 'rs', False)}
+
+# Statistic names in the order they appear in the output JSON.
+# The position of a name is its stat slot.
+STAT_NAMES = ['add', 'sub', 'and', 'nor', 'div', 'mul', 'mod', 'exp',
+              'lw', 'sw', 'liz', 'lis', 'lui', 'bp', 'bn', 'bx', 'bz',
+              'jr', 'jalr', 'j', 'halt', 'put']
+
+# Name printed when an instruction of a stat slot retires
+STAT_LABELS = [name.upper() for name in STAT_NAMES]
+
+# Operations whose latency is configurable, all others take 1 cycle
+CONFIGURABLE_OPS = ['add', 'sub', 'and', 'nor', 'div', 'mul', 'mod', 'exp']
+
+
+def get_latency(name, latency_dict):
+    """Gets the latency of an operation
+
+       Keyword arguments:
+       name -- name of the operation
+       latency_dict -- dictionary of configured latencies
+
+       Return: int
+    """
+    if name in CONFIGURABLE_OPS:
+        return latency_dict[name]
+    return 1
+
+
+def build_dispatch_table(handlers, latency_dict):
+    """Builds the op_code indexed dispatch table for an
+       engine.  HALT has no handler.  The operand count is the
+       number of operands a handler takes before the PC, so
+       wrappers can take the operands of any handler without
+       inspecting it.
+
+       Keyword arguments:
+       handlers -- dictionary of operation name to handler
+       latency_dict -- dictionary of configured latencies
+
+       Return: List of Tuple(handler, latency, stat slot, control flow,
+                             operand count)
+               with None for unrecognized op_codes and STOP_OPCODE
+    """
+    dispatch_table = [None] * (OPCODE_COUNT + 1)
+
+    for op_code, (name, operand_format, control_flow) in OPCODE_MAP.items():
+        dispatch_table[op_code] = (handlers.get(name),
+                                   get_latency(name, latency_dict),
+                                   STAT_NAMES.index(name),
+                                   control_flow,
+                                   len(operand_format.split()))
+
+    return dispatch_table
+
+
+def counts_to_stats(op_counts):
+    """Converts the flat per stat slot counts into the
+       statistics dictionary layout
+
+       Keyword arguments:
+       op_counts -- list of counts indexed by stat slot
+
+       Return: Dictionary
+    """
+    return dict(zip(STAT_NAMES, op_counts))
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+"""
+Project: X isa packed traces
+Module:  packed_trace
+Course:  CS2410
+
+Packed binary traces of X instructions and a fast loader for the
+ASCII hex traces.  A packed trace is a 16 byte header of the magic
+'XPKT', a version and the number of instructions, followed by the
+instructions as little-endian 16 bit words.  Packed traces are
+memory mapped rather than read so the words are never copied.
+
+The same module is used by xsim and tomsim.  Run it to convert
+hex traces:
+
+   python3 packed_trace.py <hex_file> <packed_file>
+"""
+
+import mmap
+import os
+import struct
+import sys
+
+from array import array
+
+# DEFINES
+PACKED_MAGIC = b'XPKT'
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct('<4sB3xQ')
+HEX_LINE = len('0000\n')
+
+
+def is_packed(trace_file):
+    """Checks whether a trace file is a packed trace
+
+       Keyword arguments:
+       trace_file -- path of the trace
+
+       Return: Boolean
+    """
+    with open(trace_file, 'rb') as trace:
+        return trace.read(len(PACKED_MAGIC)) == PACKED_MAGIC
+
+
+def read_packed(trace_file):
+    """Maps a packed trace into memory
+
+       Keyword arguments:
+       trace_file -- path of the packed trace
+
+       Return: memoryview of the 16 bit instruction words
+    """
+    with open(trace_file, 'rb') as trace:
+        trace_bytes = os.fstat(trace.fileno()).st_size
+        if trace_bytes < PACKED_HEADER.size:
+            raise ValueError('{} is not a packed trace'.format(trace_file))
+        data = mmap.mmap(trace.fileno(), 0, access=mmap.ACCESS_READ)
+
+    (magic, version, word_count) = PACKED_HEADER.unpack_from(data)
+    if magic != PACKED_MAGIC or version != PACKED_VERSION:
+        raise ValueError('{} is not a packed trace'.format(trace_file))
+    if trace_bytes != PACKED_HEADER.size + 2 * word_count:
+        raise ValueError('{} should hold {} words'.format(trace_file,
+                                                          word_count))
+
+    words = memoryview(data)[PACKED_HEADER.size:].cast('H')
+    if sys.byteorder == 'big':
+        words = array('H', words)
+        words.byteswap()
+
+    return words
+
+
+def write_packed(trace_file, words):
+    """Writes instruction words as a packed trace
+
+       Keyword arguments:
+       trace_file -- path of the packed trace
+       words -- sequence of 16 bit instruction words
+
+       Return: None
+    """
+    words = array('H', words)
+    if sys.byteorder == 'big':
+        words.byteswap()
+
+    with open(trace_file, 'wb') as trace:
+        trace.write(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION,
+                                       len(words)))
+        words.tofile(trace)
+
+
+def load_hex(hex_file):
+    """Loads an ASCII hex trace of one instruction per line,
+       skipping lines that start with '#'.  Traces of 4 digit
+       lines are decoded in bulk by bytes.fromhex instead of
+       one int() per line.
+
+       Keyword arguments:
+       hex_file -- path of the hex trace
+
+       Return: array of 16 bit instruction words
+    """
+    with open(hex_file, 'rb') as hex_data:
+        data = hex_data.read()
+
+    if b'#' in data:
+        data = b'\n'.join(line for line in data.splitlines()
+                          if not line.startswith(b'#'))
+    if data and not data.endswith(b'\n'):
+        data += b'\n'
+
+    line_count = len(data) // HEX_LINE
+    if (len(data) == line_count * HEX_LINE and
+            data[HEX_LINE - 1::HEX_LINE] == b'\n' * line_count):
+        try:
+            words = array('H', bytes.fromhex(data.decode()))
+        except ValueError:
+            words = None
+        if words is not None and len(words) == line_count:
+            if sys.byteorder == 'little':
+                words.byteswap()
+            return words
+
+    return array('H', (int(token, 16) & 0xFFFF for token in data.split()))
+
+
+def load_trace(trace_file):
+    """Loads the instruction words of a packed or hex trace
+
+       Keyword arguments:
+       trace_file -- path of the trace
+
+       Return: sequence of 16 bit instruction words
+    """
+    if is_packed(trace_file):
+        return read_packed(trace_file)
+    return load_hex(trace_file)
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) != 3:
+        print('Usage: ./packed_trace hexfile packedfile')
+        exit(1)
+
+    write_packed(sys.argv[2], load_hex(sys.argv[1]))
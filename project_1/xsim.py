@@ -6,18 +6,34 @@ Author:  Cyrus Ramavarapu
 Date:    22 October 2016
 """
 
+import os
 import sys
 import json
+import argparse
 
 from pprint import pprint
 from bitstring import Bits
 
+import isa
+import packed_trace
+import xsim_bbv
+import xsim_branch
+import xsim_cache
+import xsim_checkpoint
+import xsim_int
+import xsim_jit
+import xsim_memory
+import xsim_pipeline
+import xsim_profile
+import xsim_trace
+import xsim_watchdog
+
 # DEFINES
 WORD_SIZE = 1
 
 # GLOBALS
 REGISTER_FILE = {}
-DATA_MEMORY = {}
+DATA_MEMORY = xsim_memory.create_memory()
 STATISTICS_DICT = {}
 
 
@@ -49,23 +65,64 @@ def configure_latency(config_file):
 
 def parse_input(input_file):
     """Parses input file and converts ASCII
-       Hex instructions into binary
+       Hex or packed instructions into binary
 
        Keyword arguments:
        input_file -- file containing instructions in ASCII hex
+                     or as a packed trace
 
        Return: List
     """
 
-    instruction_memory = []
+    return [format(word, '016b')
+            for word in packed_trace.load_trace(input_file)]
+
+
+def decode_operands(op_code, data_fields):
+    """Extracts the operands of an instruction from its data
+       fields in the order of its isa operand format.
+       Registers are decoded to their names in the register
+       file and immediates to unsigned ints.
+
+       Keyword arguments:
+       op_code -- int op_code of the instruction
+       data_fields -- the instruction sans the op_code [0:5]
+
+       Return: Tuple
+    """
+    if op_code not in isa.OPCODE_MAP:
+        return ()
 
-    with open(input_file) as hex_data:
-        for line in hex_data:
-            if line[0] is not '#':
-                binary_value = bin(int(line, 16))[2:].zfill(4 * 4)
-                instruction_memory.append(binary_value)
+    fields = {'rd': ''.join(['r', str(int(data_fields[0:3], 2))]),
+              'rs': ''.join(['r', str(int(data_fields[3:6], 2))]),
+              'rt': ''.join(['r', str(int(data_fields[6:9], 2))]),
+              'imm8': int(data_fields[3:11], 2),
+              'imm11': int(data_fields, 2)}
+    operand_format = isa.OPCODE_MAP[op_code][1]
+    return tuple(fields[name] for name in operand_format.split())
+
+
+def decode_input(instruction_memory):
+    """Decodes every instruction into its op_code and the
+       operands its handler takes once at load time.
+       Identical instructions share one record.
+
+       Keyword arguments:
+       instruction_memory -- list of binary instruction strings
+
+       Return: List of Tuple(int op_code, Tuple operands)
+    """
+    decoded = {}
+    program = []
+    for instruction in instruction_memory:
+        if instruction not in decoded:
+            op_code = int(instruction[0:5], 2)
+            decoded[instruction] = (op_code,
+                                    decode_operands(op_code,
+                                                    instruction[5:16]))
+        program.append(decoded[instruction])
 
-    return instruction_memory
+    return program
 
 
 def init_register_file():
@@ -123,6 +180,7 @@ def init_statistics_dict():
 
        Return: Dictionary
     """
+    STATISTICS_DICT.clear()
     STATISTICS_DICT['registers'] = [
         {'r0': 0,
          'r1': 0,
@@ -180,48 +238,42 @@ def process_I_instruction(data_fields):
     return (Rd, Imm8)
 
 
-def add_instruction(data_fields):
-    """ADD instruction with op_code '00000'
+def execute_add(Rd, Rs, Rt):
+    """ADD instruction with op_code '00000' on decoded operands
 
     Keyword arguments:
-    data_fields -- the current instruction being parsed
-                  sans the op_code [0:5]
+    Rd, Rs, Rt -- register names
 
     Return: int
     """
-    (Rd, Rs, Rt) = process_R_instruction(data_fields)
     result = Bits(bin=REGISTER_FILE[Rs]).int + Bits(bin=REGISTER_FILE[Rt]).int
     REGISTER_FILE[Rd] = Bits(int=result, length=16).bin
     update_register_statistics(Rd, result)
     return REGISTER_FILE[Rd]
 
 
-def sub_instruction(data_fields):
-    """SUB instruction with op_code '00001'
+def execute_sub(Rd, Rs, Rt):
+    """SUB instruction with op_code '00001' on decoded operands
 
     Keyword arguments:
-    data_fields -- the current instruction being parsed sans
-                   the op_code [0:5]
+    Rd, Rs, Rt -- register names
 
     Return: int
     """
-    (Rd, Rs, Rt) = process_R_instruction(data_fields)
     result = Bits(bin=REGISTER_FILE[Rs]).int - Bits(bin=REGISTER_FILE[Rt]).int
     REGISTER_FILE[Rd] = Bits(int=result, length=16).bin
     update_register_statistics(Rd, result)
     return REGISTER_FILE[Rd]
 
 
-def and_instruction(data_fields):
-    """AND instruction with op_code '00010'
+def execute_and(Rd, Rs, Rt):
+    """AND instruction with op_code '00010' on decoded operands
 
     Keyword arguments:
-    data_fields -- the current instruction being parsed sans
-                   the op_code [0:5]
+    Rd, Rs, Rt -- register names
 
     Return: int
     """
-    (Rd, Rs, Rt) = process_R_instruction(data_fields)
     REGISTER_FILE[Rd] = (
         Bits(
             bin=REGISTER_FILE[Rs]) & Bits(
@@ -232,18 +284,16 @@ def and_instruction(data_fields):
     return REGISTER_FILE[Rd]
 
 
-def nor_instruction(data_fields):
-    """NOR instruction with op_code '00011'
+def execute_nor(Rd, Rs, Rt):
+    """NOR instruction with op_code '00011' on decoded operands
 
     Keyword arguments:
-    data_fields -- the current instruction being parsed sans
-                   the op_code [0:5]
+    Rd, Rs, Rt -- register names
 
     Return: int
 
     NOTE: POTENTIAL BUG DUE TO TWOS-COMPLEMENT
     """
-    (Rd, Rs, Rt) = process_R_instruction(data_fields)
     REGISTER_FILE[Rd] = (~(Bits(bin=REGISTER_FILE[Rs]) |
                            Bits(bin=REGISTER_FILE[Rt]))).bin
     int_result = Bits(bin=REGISTER_FILE[Rd]).bin
@@ -251,33 +301,29 @@ def nor_instruction(data_fields):
     return REGISTER_FILE[Rd]
 
 
-def div_instruction(data_fields):
-    """DIV instruction with op_code '00100'
+def execute_div(Rd, Rs, Rt):
+    """DIV instruction with op_code '00100' on decoded operands
 
     Keyword arguments:
-    data_fields -- the current instruction being parsed sans
-                   the op_code [0:5]
+    Rd, Rs, Rt -- register names
 
     Return: int
     """
-    (Rd, Rs, Rt) = process_R_instruction(data_fields)
     result = Bits(bin=REGISTER_FILE[Rs]).int / Bits(bin=REGISTER_FILE[Rt]).int
     REGISTER_FILE[Rd] = Bits(int=int(result), length=16).bin
     update_register_statistics(Rd, int(result))
     return REGISTER_FILE[Rd]
 
 
-def mul_instruction(data_fields):
-    """MUL instruction with op_code '00100'.  Takes only
-       lower 16 bits of result
+def execute_mul(Rd, Rs, Rt):
+    """MUL instruction with op_code '00101' on decoded
+       operands.  Takes only lower 16 bits of result
 
     Keyword arguments:
-    data_fields -- the current instruction being parsed sans
-                   the op_code [0:5]
+    Rd, Rs, Rt -- register names
 
     Return: int
     """
-    (Rd, Rs, Rt) = process_R_instruction(data_fields)
     result = Bits(bin=REGISTER_FILE[Rs]).int * Bits(bin=REGISTER_FILE[Rt]).int
     bin_result = Bits(int=result, length=32).bin
     REGISTER_FILE[Rd] = bin_result[len(bin_result) - 16:len(bin_result)]
@@ -286,32 +332,28 @@ def mul_instruction(data_fields):
     return REGISTER_FILE[Rd]
 
 
-def mod_instruction(data_fields):
-    """MOD instruction with op_code '00110'.
+def execute_mod(Rd, Rs, Rt):
+    """MOD instruction with op_code '00110' on decoded operands
 
     Keyword arguments:
-    data_fields -- the current instruction being parsed sans
-                   the op_code [0:5]
+    Rd, Rs, Rt -- register names
 
     Return: int
     """
-    (Rd, Rs, Rt) = process_R_instruction(data_fields)
     result = Bits(bin=REGISTER_FILE[Rs]).int % Bits(bin=REGISTER_FILE[Rt]).int
     REGISTER_FILE[Rd] = Bits(int=result, length=16).bin
     update_register_statistics(Rd, result)
     return REGISTER_FILE[Rd]
 
 
-def exp_instruction(data_fields):
-    """EXP instruction with op_code '00111'.
+def execute_exp(Rd, Rs, Rt):
+    """EXP instruction with op_code '00111' on decoded operands
 
     Keyword arguments:
-    data_fields -- the current instruction being parsed sans
-                   the op_code [0:5]
+    Rd, Rs, Rt -- register names
 
     Return: int
     """
-    (Rd, Rs, Rt) = process_R_instruction(data_fields)
     result = Bits(bin=REGISTER_FILE[Rs]).int ** Bits(bin=REGISTER_FILE[Rt]).int
     bin_result = Bits(int=result, length=32).bin
     REGISTER_FILE[Rd] = bin_result[len(bin_result) - 16:len(bin_result)]
@@ -321,9 +363,306 @@ def exp_instruction(data_fields):
     return REGISTER_FILE[Rd]
 
 
+def execute_lw(Rd, Rs):
+    """LW instruction with op_code 01000 on decoded operands.
+       Source is word_alligned, unwritten words read as 0
+
+    Keyword arguments:
+    Rd, Rs -- register names
+
+    Return: int
+    """
+    result = DATA_MEMORY[int(REGISTER_FILE[Rs], 2)]
+    REGISTER_FILE[Rd] = format(result, '016b')
+
+    update_register_statistics(Rd, result * 2)
+
+    return REGISTER_FILE[Rd]
+
+
+def execute_sw(Rs, Rt):
+    """SW instruction with op_code 01001 on decoded operands.
+       Source is word_alligned
+
+    Keyword arguments:
+    Rs, Rt -- register names
+
+    Return: int
+    """
+    address = int(REGISTER_FILE[Rs], 2)
+    DATA_MEMORY[address] = int(REGISTER_FILE[Rt], 2)
+
+    return DATA_MEMORY[address]
+
+
+def execute_liz(Rd, Imm8):
+    """LIZ instruction with op_code 10000 on decoded operands
+
+    Keyword arguments:
+    Rd -- register name
+    Imm8 -- unsigned 8 bit immediate
+
+    Return: int
+    """
+    REGISTER_FILE[Rd] = format(Imm8, '016b')
+    update_register_statistics(Rd, Imm8)
+    return REGISTER_FILE[Rd]
+
+
+def execute_lis(Rd, Imm8):
+    """LIS instruction with op_code 10001 on decoded operands.
+       The immediate is sign extended
+
+    Keyword arguments:
+    Rd -- register name
+    Imm8 -- unsigned 8 bit immediate
+
+    Return: int
+    """
+    if Imm8 & 0x80:
+        REGISTER_FILE[Rd] = format(Imm8 | 0xFF00, '016b')
+        update_register_statistics(Rd, Imm8 - 0x100)
+    else:
+        REGISTER_FILE[Rd] = format(Imm8, '016b')
+        update_register_statistics(Rd, Imm8)
+    return REGISTER_FILE[Rd]
+
+
+def execute_lui(Rd, Imm8):
+    """LUI instruction with op_code 10010 on decoded operands
+
+    Keyword arguments:
+    Rd -- register name
+    Imm8 -- unsigned 8 bit immediate
+
+    Return: int
+    """
+    REGISTER_FILE[Rd] = ''.join([format(Imm8, '08b'),
+                                 REGISTER_FILE[Rd][8:16]])
+    int_value = Bits(bin=REGISTER_FILE[Rd]).int
+    update_register_statistics(Rd, int_value)
+    return REGISTER_FILE[Rd]
+
+
+def execute_bp(Rd, Imm8, program_counter):
+    """BP instruction with op_code 10100 on decoded operands
+
+    Keyword arguments:
+    Rd -- register name
+    Imm8 -- unsigned 8 bit branch target
+    program_counter -- the current value of PC
+
+    Return: int
+    """
+    if Bits(bin=REGISTER_FILE[Rd]).int > 0:
+        return int(Imm8 / WORD_SIZE)
+    return program_counter + 1
+
+
+def execute_bn(Rd, Imm8, program_counter):
+    """BN instruction with op_code 10101 on decoded operands
+
+    Keyword arguments:
+    Rd -- register name
+    Imm8 -- unsigned 8 bit branch target
+    program_counter -- the current value of PC
+
+    Return: int
+    """
+    if Bits(bin=REGISTER_FILE[Rd]).int < 0:
+        return int(Imm8 / WORD_SIZE)
+    return program_counter + 1
+
+
+def execute_bx(Rd, Imm8, program_counter):
+    """BX instruction with op_code 10110 on decoded operands
+
+    Keyword arguments:
+    Rd -- register name
+    Imm8 -- unsigned 8 bit branch target
+    program_counter -- the current value of PC
+
+    Return: int
+    """
+    if Bits(bin=REGISTER_FILE[Rd]).int != 0:
+        return int(Imm8 / WORD_SIZE)
+    return program_counter + 1
+
+
+def execute_bz(Rd, Imm8, program_counter):
+    """BZ instruction with op_code 10111 on decoded operands
+
+    Keyword arguments:
+    Rd -- register name
+    Imm8 -- unsigned 8 bit branch target
+    program_counter -- the current value of PC
+
+    Return: int
+    """
+    if Bits(bin=REGISTER_FILE[Rd]).int == 0:
+        return int(Imm8 / WORD_SIZE)
+    return program_counter + 1
+
+
+def execute_jr(Rs, program_counter):
+    """JR instruction with op_code 01100 on decoded operands
+
+    Keyword arguments:
+    Rs -- register name
+    program_counter -- the current value of PC
+
+    Return: int
+    """
+    return Bits(bin=REGISTER_FILE[Rs]).int
+
+
+def execute_jalr(Rd, Rs, program_counter):
+    """JALR instruction with op_code 10011 on decoded operands
+
+    Keyword arguments:
+    Rd, Rs -- register names
+    program_counter -- the current value of PC
+
+    Return: int
+    """
+    int_value = program_counter + 1
+
+    REGISTER_FILE[Rd] = Bits(
+        int=int_value,
+        length=16).bin
+
+    update_register_statistics(Rd, int_value)
+
+    return int((Bits(bin=REGISTER_FILE[Rs]).int / 2))
+
+
+def execute_j(Imm11, program_counter):
+    """J instruction with op_code 11000 on decoded operands.
+       The upper 5 bits of the byte address of PC are kept.
+
+    Keyword arguments:
+    Imm11 -- unsigned 11 bit immediate
+    program_counter -- the current value of PC
+
+    Return: int
+    """
+    word = ((program_counter * 2) & 0xF800) | Imm11
+    if word & 0x8000:
+        word -= 0x10000
+    return int(word / WORD_SIZE)
+
+
+def execute_put(Rs):
+    """PUT instruction with op_code 01110 on decoded operands
+
+    Keyword arguments:
+    Rs -- register name
+
+    Return: int
+    """
+    return REGISTER_FILE[Rs]
+
+
+def add_instruction(data_fields):
+    """ADD instruction with op_code '00000'
+
+    Keyword arguments:
+    data_fields -- the current instruction being parsed
+                  sans the op_code [0:5]
+
+    Return: int
+    """
+    return execute_add(*process_R_instruction(data_fields))
+
+
+def sub_instruction(data_fields):
+    """SUB instruction with op_code '00001'
+
+    Keyword arguments:
+    data_fields -- the current instruction being parsed sans
+                   the op_code [0:5]
+
+    Return: int
+    """
+    return execute_sub(*process_R_instruction(data_fields))
+
+
+def and_instruction(data_fields):
+    """AND instruction with op_code '00010'
+
+    Keyword arguments:
+    data_fields -- the current instruction being parsed sans
+                   the op_code [0:5]
+
+    Return: int
+    """
+    return execute_and(*process_R_instruction(data_fields))
+
+
+def nor_instruction(data_fields):
+    """NOR instruction with op_code '00011'
+
+    Keyword arguments:
+    data_fields -- the current instruction being parsed sans
+                   the op_code [0:5]
+
+    Return: int
+    """
+    return execute_nor(*process_R_instruction(data_fields))
+
+
+def div_instruction(data_fields):
+    """DIV instruction with op_code '00100'
+
+    Keyword arguments:
+    data_fields -- the current instruction being parsed sans
+                   the op_code [0:5]
+
+    Return: int
+    """
+    return execute_div(*process_R_instruction(data_fields))
+
+
+def mul_instruction(data_fields):
+    """MUL instruction with op_code '00100'.  Takes only
+       lower 16 bits of result
+
+    Keyword arguments:
+    data_fields -- the current instruction being parsed sans
+                   the op_code [0:5]
+
+    Return: int
+    """
+    return execute_mul(*process_R_instruction(data_fields))
+
+
+def mod_instruction(data_fields):
+    """MOD instruction with op_code '00110'.
+
+    Keyword arguments:
+    data_fields -- the current instruction being parsed sans
+                   the op_code [0:5]
+
+    Return: int
+    """
+    return execute_mod(*process_R_instruction(data_fields))
+
+
+def exp_instruction(data_fields):
+    """EXP instruction with op_code '00111'.
+
+    Keyword arguments:
+    data_fields -- the current instruction being parsed sans
+                   the op_code [0:5]
+
+    Return: int
+    """
+    return execute_exp(*process_R_instruction(data_fields))
+
+
 def load_word(data_fields):
     """LW instruction with op_code 01000.  Source is
-       word_alligned
+       word_alligned, unwritten words read as 0
 
     Keyword arguments:
     data_fields -- the current instruction being parsed sans
@@ -332,15 +671,7 @@ def load_word(data_fields):
     Return: int
     """
     (Rd, Rs, Rt) = process_R_instruction(data_fields)
-    result = DATA_MEMORY[REGISTER_FILE[Rs].zfill(16)]
-    if result > 0:
-        REGISTER_FILE[Rd] = Bits(uint=result, length=16).bin
-    else:
-        REGISTER_FILE[Rd] = Bits(uint=result, length=16).bin
-
-    update_register_statistics(Rd, result * 2)
-
-    return REGISTER_FILE[Rd]
+    return execute_lw(Rd, Rs)
 
 
 def store_word(data_fields):
@@ -354,14 +685,11 @@ def store_word(data_fields):
     Return: int
     """
     (Rd, Rs, Rt) = process_R_instruction(data_fields)
-    DATA_MEMORY[REGISTER_FILE[Rs].zfill(16)] = get_register_stats(Rt)
-
-    return DATA_MEMORY[REGISTER_FILE[Rs]]
+    return execute_sw(Rs, Rt)
 
 
 def liz(data_fields):
-    """LIS instruction with op_code 01001.  Source is
-       word_alligned
+    """LIZ instruction with op_code 10000
 
     Keyword arguments:
     data_fields -- the current instruction being parsed sans
@@ -370,30 +698,20 @@ def liz(data_fields):
     Return: int
     """
     (Rd, Imm8) = process_I_instruction(data_fields)
-    REGISTER_FILE[Rd] = Imm8.zfill(16)
-    int_value = Bits(bin=REGISTER_FILE[Rd]).int
-    update_register_statistics(Rd, int_value)
-    return REGISTER_FILE[Rd]
+    return execute_liz(Rd, int(Imm8, 2))
 
 
 def lis(data_fields):
-    """LIS instruction with op_code 01001.  Source is
-       word_alligned
+    """LIS instruction with op_code 10001
 
     Keyword arguments:
     data_fields -- the current instruction being parsed sans
                    the op_code [0:5]
 
     Return: int
-
-    NOTE: POSSIBLE ERROR DUE TO TWOs COMPLEMENT
     """
     (Rd, Imm8) = process_I_instruction(data_fields)
-    msb = Imm8[0]
-    REGISTER_FILE[Rd] = Imm8.rjust(16, msb)
-    int_value = Bits(bin=REGISTER_FILE[Rd]).int
-    update_register_statistics(Rd, int_value)
-    return REGISTER_FILE[Rd]
+    return execute_lis(Rd, int(Imm8, 2))
 
 
 def lui(data_fields):
@@ -404,15 +722,9 @@ def lui(data_fields):
                    the op_code [0:5]
 
     Return: int
-
-    NOTE: POSSIBLE ERROR DUE TO TWOs COMPLEMENT
     """
     (Rd, Imm8) = process_I_instruction(data_fields)
-    REGISTER_FILE[Rd] = ''.join([Imm8,
-                                 Bits(bin=REGISTER_FILE[Rd][8:16]).bin])
-    int_value = Bits(bin=REGISTER_FILE[Rd]).int
-    update_register_statistics(Rd, int_value)
-    return REGISTER_FILE[Rd]
+    return execute_lui(Rd, int(Imm8, 2))
 
 
 def branch_positive(data_fields, program_counter):
@@ -426,15 +738,7 @@ def branch_positive(data_fields, program_counter):
     Return: int
     """
     (Rd, Imm8) = process_I_instruction(data_fields)
-    check_value = Bits(bin=REGISTER_FILE[Rd]).int
-
-    if check_value > 0:
-        ls_imm8 = (Bits(bin=Imm8)).bin
-        z_ext = (ls_imm8).zfill(16)
-        ls_bin = Bits(bin=z_ext)
-        return int(ls_bin.int / WORD_SIZE)
-    else:
-        return program_counter + 1
+    return execute_bp(Rd, int(Imm8, 2), program_counter)
 
 
 def branch_negative(data_fields, program_counter):
@@ -449,15 +753,7 @@ def branch_negative(data_fields, program_counter):
 
     """
     (Rd, Imm8) = process_I_instruction(data_fields)
-    check_value = Bits(bin=REGISTER_FILE[Rd]).int
-
-    if check_value < 0:
-        ls_imm8 = (Bits(bin=Imm8)).bin
-        z_ext = (ls_imm8).zfill(16)
-        ls_bin = Bits(bin=z_ext)
-        return int(ls_bin.int / WORD_SIZE)
-    else:
-        return program_counter + 1
+    return execute_bn(Rd, int(Imm8, 2), program_counter)
 
 
 def branch_nzero(data_fields, program_counter):
@@ -471,15 +767,7 @@ def branch_nzero(data_fields, program_counter):
     Return: int
     """
     (Rd, Imm8) = process_I_instruction(data_fields)
-    check_value = Bits(bin=REGISTER_FILE[Rd]).int
-
-    if check_value is not 0:
-        ls_imm8 = (Bits(bin=Imm8)).bin
-        z_ext = (ls_imm8).zfill(16)
-        ls_bin = Bits(bin=z_ext)
-        return int(ls_bin.int / WORD_SIZE)
-    else:
-        return program_counter + 1
+    return execute_bx(Rd, int(Imm8, 2), program_counter)
 
 
 def branch_zero(data_fields, program_counter):
@@ -491,20 +779,9 @@ def branch_zero(data_fields, program_counter):
     program_counter -- the current value of PC
 
     Return: int
-
-    NOTE: UNSURE ABOUT RETURN PC+2
     """
     (Rd, Imm8) = process_I_instruction(data_fields)
-    check_value = Bits(bin=REGISTER_FILE[Rd]).int
-
-    if check_value is 0:
-        print(Imm8)
-        ls_imm8 = (Bits(bin=Imm8)).bin
-        z_ext = (ls_imm8).zfill(16)
-        ls_bin = Bits(bin=z_ext)
-        return int(ls_bin.int / WORD_SIZE)
-    else:
-        return program_counter + 1
+    return execute_bz(Rd, int(Imm8, 2), program_counter)
 
 
 def jump_register(data_fields, program_counter):
@@ -518,7 +795,7 @@ def jump_register(data_fields, program_counter):
     Return: int
     """
     (Rd, Rs, Rt) = process_R_instruction(data_fields)
-    return int(Bits(bin=REGISTER_FILE[Rs]).int)
+    return execute_jr(Rs, program_counter)
 
 
 def jump_and_link_register(data_fields, program_counter):
@@ -532,36 +809,23 @@ def jump_and_link_register(data_fields, program_counter):
     Return: int
     """
     (Rd, Rs, Rt) = process_R_instruction(data_fields)
-
-    int_value = program_counter + 1
-
-    REGISTER_FILE[Rd] = Bits(
-        int=int_value,
-        length=16).bin
-
-    update_register_statistics(Rd, int_value)
-
-    return int((Bits(bin=REGISTER_FILE[Rs]).int / 2))
+    return execute_jalr(Rd, Rs, program_counter)
 
 
 def jump_immediate(Imm11, program_counter):
-    """JIMM instruction with op_code 10011
+    """JIMM instruction with op_code 11000
 
     Keyword arguments:
-    data_fields -- the current instruction being parsed sans
-                   the op_code [0:5]
+    Imm11 -- the 11 bit immediate of the instruction
     program_counter -- the current value of PC
 
     Return: int
     """
-    pc_bits = Bits(int=program_counter * 2, length=16).bin
-    ls_imm = Bits(bin=Imm11)
-    cat_bits = ''.join([pc_bits[0:5], ls_imm.bin])
-    return int(Bits(bin=cat_bits).int / WORD_SIZE)
+    return execute_j(int(Imm11, 2), program_counter)
 
 
 def put_register(data_fields):
-    """PUT instruction with op_code 10011
+    """PUT instruction with op_code 01110
 
     Keyword arguments:
     data_fields -- the current instruction being parsed sans
@@ -570,181 +834,718 @@ def put_register(data_fields):
     Return: int
     """
     (Rd, Rs, Rt) = process_R_instruction(data_fields)
-    int_value = get_register_stats(Rs)
-    return REGISTER_FILE[Rs]
+    return execute_put(Rs)
+
+
+# HANDLERS
+# The engine calls the handlers with the operands decode_input
+# extracted, in the order of their isa operand format.
+HANDLERS = {'add': execute_add,
+            'sub': execute_sub,
+            'and': execute_and,
+            'nor': execute_nor,
+            'div': execute_div,
+            'mul': execute_mul,
+            'mod': execute_mod,
+            'exp': execute_exp,
+            'lw': execute_lw,
+            'sw': execute_sw,
+            'liz': execute_liz,
+            'lis': execute_lis,
+            'lui': execute_lui,
+            'bp': execute_bp,
+            'bn': execute_bn,
+            'bx': execute_bx,
+            'bz': execute_bz,
+            'jr': execute_jr,
+            'jalr': execute_jalr,
+            'j': execute_j,
+            'put': execute_put}
+
+
+def write_statistics(output_file, display=True):
+    """Writes the statistics dictionary to the output
+       file and optionally displays it
+
+       Keyword arguments:
+       output_file -- output file for simulation statistics
+       display -- pretty print the statistics when True
+
+       Return: None
+    """
+    with open(output_file, 'w') as ofp:
+        json.dump(STATISTICS_DICT, ofp)
+
+    if display:
+        pprint(STATISTICS_DICT)
+
+
+def load_address(Rd, Rs):
+    """Gets the word address an LW instruction loads from
+
+    Keyword arguments:
+    Rd, Rs -- register names
+
+    Return: int
+    """
+    return int(REGISTER_FILE[Rs], 2)
 
 
-def xsim(config_file, input_file, output_file):
+def store_address(Rs, Rt):
+    """Gets the word address an SW instruction stores to
+
+    Keyword arguments:
+    Rs, Rt -- register names
+
+    Return: int
+    """
+    return int(REGISTER_FILE[Rs], 2)
+
+
+def read_registers():
+    """Reads the register words for a full state trace
+
+       Keyword arguments:
+       None
+
+       Return: List
+    """
+    return [int(REGISTER_FILE['r{}'.format(register)], 2)
+            for register in range(8)]
+
+
+def capture_checkpoint(program_counter, instruction_count, clock_cycles,
+                       op_counts):
+    """Captures the architectural state between two
+       instructions
+
+       Keyword arguments:
+       program_counter -- PC of the next instruction
+       instruction_count -- number of instructions executed
+       clock_cycles -- number of cycles simulated
+       op_counts -- list of counts indexed by stat slot
+
+       Return: Checkpoint
+    """
+    register_stats = [get_register_stats('r{}'.format(register))
+                      for register in range(8)]
+
+    return xsim_checkpoint.Checkpoint(program_counter, instruction_count,
+                                      clock_cycles, op_counts,
+                                      read_registers(), register_stats,
+                                      DATA_MEMORY)
+
+
+def restore_checkpoint(checkpoint):
+    """Restores the register file, the register statistics
+       and data memory of a checkpoint
+
+       Keyword arguments:
+       checkpoint -- Checkpoint to resume from
+
+       Return: None
+    """
+    for register in range(8):
+        register_name = 'r{}'.format(register)
+        REGISTER_FILE[register_name] = format(
+            checkpoint.registers[register], '016b')
+        update_register_statistics(register_name,
+                                   checkpoint.register_stats[register])
+    DATA_MEMORY[:] = checkpoint.memory
+
+
+def simulate(latency_dict, input_file, engine='bitstring', trace=None,
+             memory_image=None, resume=None, stop_instruction=None,
+             stop_pc=None, checkpoint_file=None, watchdog=None,
+             profile=None, cache=None, branches=None, pipeline=None,
+             bbv=None):
     """Run the simulation of the X isa for given
-       configuration and input file and maintain stats
+       latencies and input file and maintain stats.  The run
+       stops before the instruction at stop_pc or once
+       stop_instruction instructions have executed and the
+       state is then written to checkpoint_file.  A run
+       aborted by the watchdog or by a PC outside instruction
+       memory keeps the statistics so far with an abort
+       record.
 
        Keyword arguments:
-       config_file -- JSON file containing latency configurations
+       latency_dict -- dictionary of opcode latencies
        input_file -- list of instructions and comments in ASCII Hex
-       output_file -- output file for simulation statistics
+       engine -- 'bitstring', 'int' or 'jit' execution engine
+       trace -- TraceSink recording retired instructions or None
+       memory_image -- binary image preloaded into data memory or None
+       resume -- Checkpoint to resume from or None
+       stop_instruction -- instruction count to stop at or None
+       stop_pc -- PC to stop at or None
+       checkpoint_file -- file receiving the state when stopped or None
+       watchdog -- Watchdog holding the budgets of the run or None
+       profile -- Profile counting the control flow of the run or None
+       cache -- CacheHierarchy timing the loads and stores or None
+       branches -- BranchPredictors predicting the branches or None
+       pipeline -- Pipeline timing the run in order or None
+       bbv -- BasicBlockVectors collecting interval vectors or None
 
-       Return: None
+       Return: Dictionary
     """
-    latency_dict = configure_latency(config_file)
-    instruction_memory = parse_input(input_file)
+    if engine in ('int', 'jit'):
+        instruction_memory = xsim_int.parse_input(input_file)
+        if engine == 'jit':
+            run_engine = xsim_jit.simulate
+        else:
+            run_engine = xsim_int.simulate
+        statistics = run_engine(latency_dict, instruction_memory, trace,
+                                memory_image, resume, stop_instruction,
+                                stop_pc, checkpoint_file, watchdog, profile,
+                                cache, branches, pipeline, bbv)
+        STATISTICS_DICT.clear()
+        STATISTICS_DICT.update(statistics)
+        return STATISTICS_DICT
+
+    binary_memory = parse_input(input_file)
+    instruction_memory = decode_input(binary_memory)
     init_statistics_dict()
     init_register_file()
+    xsim_memory.clear_memory(DATA_MEMORY)
+    if memory_image is not None:
+        xsim_memory.load_image(DATA_MEMORY, memory_image)
     program_counter = 0
     clock_cycles = 0
     instruction_count = 0
 
+    dispatch_table = isa.build_dispatch_table(HANDLERS, latency_dict)
+    op_counts = [0] * len(isa.STAT_NAMES)
+
+    if resume is not None:
+        restore_checkpoint(resume)
+        program_counter = resume.program_counter
+        clock_cycles = resume.clock_cycles
+        instruction_count = resume.instruction_count
+        op_counts[:] = resume.op_counts
+        if trace is not None:
+            trace.cycles = clock_cycles
+
+    # stall cycles the timing models added to the latencies
+    stalls = [0]
+    max_stall = 0
+    for model in (cache, branches):
+        if model is not None:
+            model.start(stalls)
+            max_stall += model.max_stall
+
+    # the penalty of a branch is charged before the profile and
+    # the basic block vectors see it transfer
+    if branches is not None:
+        dispatch_table = branches.predicted_dispatch_table(dispatch_table)
+    if profile is not None:
+        profile.start([op_code for (op_code, _) in instruction_memory],
+                      dispatch_table, program_counter)
+        dispatch_table = profile.profiled_dispatch_table(dispatch_table)
+    if bbv is not None:
+        bbv.start([op_code for (op_code, _) in instruction_memory],
+                  dispatch_table, program_counter, stalls)
+        dispatch_table = bbv.bbv_dispatch_table(dispatch_table)
+    if cache is not None:
+        dispatch_table = cache.cached_dispatch_table(dispatch_table,
+                                                     load_address,
+                                                     store_address)
+    if pipeline is not None:
+        pipeline.start([int(instruction, 2) for instruction in binary_memory],
+                       dispatch_table)
+        dispatch_table = pipeline.pipelined_dispatch_table(dispatch_table)
+    if trace is not None:
+        trace.register_reader = read_registers
+        trace.stalls = stalls
+        dispatch_table = xsim_trace.traced_dispatch_table(dispatch_table,
+                                                          trace)
+    if stop_instruction is not None:
+        stop_instruction = max(stop_instruction, instruction_count)
+    if watchdog is not None:
+        watchdog.start(xsim_watchdog.max_latency(dispatch_table, max_stall),
+                       instruction_count)
+    limit = xsim_watchdog.run_limit(stop_instruction, watchdog,
+                                    instruction_count, clock_cycles)
+    stopped = False
+    abort = None
+    program_size = len(instruction_memory)
+
     while True:
-        current_instruction = instruction_memory[program_counter]
-        op_code = current_instruction[0:5]
-        data_fields = current_instruction[5:16]
-        instruction_count += 1
+        if instruction_count == limit:
+            if instruction_count == stop_instruction:
+                stopped = True
+                break
+            abort = watchdog.check(program_counter, instruction_count,
+                                   clock_cycles + stalls[0])
+            if abort is not None:
+                break
+            limit = xsim_watchdog.run_limit(stop_instruction, watchdog,
+                                            instruction_count,
+                                            clock_cycles + stalls[0])
+        if program_counter == stop_pc:
+            stopped = True
+            break
 
-        if op_code == '00000':
-            add_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['add']
-            STATISTICS_DICT['stats'][0]['add'] += 1
-            print('ADD')
-        elif op_code == '00001':
-            sub_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['sub']
-            STATISTICS_DICT['stats'][0]['sub'] += 1
-            print('SUB')
-        elif op_code == '00010':
-            and_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['and']
-            STATISTICS_DICT['stats'][0]['and'] += 1
-            print('AND')
-        elif op_code == '00011':
-            nor_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['nor']
-            STATISTICS_DICT['stats'][0]['nor'] += 1
-            print('NOR')
-        elif op_code == '00100':
-            div_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['div']
-            STATISTICS_DICT['stats'][0]['div'] += 1
-            print('DIV')
-        elif op_code == '00101':
-            mul_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['mul']
-            STATISTICS_DICT['stats'][0]['mul'] += 1
-            print('MUL')
-        elif op_code == '00110':
-            mod_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['mod']
-            STATISTICS_DICT['stats'][0]['mod'] += 1
-            print('MOD')
-        elif op_code == '00111':
-            exp_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['exp']
-            STATISTICS_DICT['stats'][0]['exp'] += 1
-            print('EXP')
-        elif op_code == '01000':
-            load_word(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['lw'] += 1
-            print('LW')
-        elif op_code == '01001':
-            store_word(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['sw'] += 1
-            print('SW')
-        elif op_code == '10000':
-            liz(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['liz'] += 1
-            print('LIZ')
-        elif op_code == '10001':
-            lis(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['lis'] += 1
-            print('LIS')
-        elif op_code == '10010':
-            lui(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['lui'] += 1
-            print('LUI')
-        elif op_code == '10100':
-            program_counter = branch_positive(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['bp'] += 1
-            print('BP')
-        elif op_code == '10101':
-            program_counter = branch_negative(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['bn'] += 1
-            print('BN')
-        elif op_code == '10110':
-            program_counter = branch_nzero(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['bx'] += 1
-            print('BX')
-        elif op_code == '10111':
-            program_counter = branch_zero(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['bz'] += 1
-            print('BZ')
-        elif op_code == '01100':
-            program_counter = jump_register(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['jr'] += 1
-            print('JR')
-        elif op_code == '10011':
-            program_counter = jump_and_link_register(
-                data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['jalr'] += 1
-            print('JALR')
-        elif op_code == '11000':
-            program_counter = jump_immediate(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['j'] += 1
-            print('J')
-        elif op_code == '01101':
-            print('HALT')
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['halt'] += 1
+        if not 0 <= program_counter < program_size:
+            abort = xsim_watchdog.ABORT_PC
             break
-        elif op_code == '01110':
-            put_register(data_fields)
-            print('PUT')
-            clock_cycles += 1
-            program_counter += 1
-            STATISTICS_DICT['stats'][0]['put'] += 1
-        else:
-            print('ERROR: UNRECOGNZIED OPCODE {}'.format(op_code),
-                  file=sys.stderr)
+        (op_code, operands) = instruction_memory[program_counter]
+        instruction_count += 1
+        entry = dispatch_table[op_code]
+
+        if entry is None:
+            print('ERROR: UNRECOGNZIED OPCODE {}'.format(
+                format(op_code, '05b')), file=sys.stderr)
             break
 
+        (handler, latency, stat_slot, control_flow, _) = entry
+        clock_cycles += latency
+        op_counts[stat_slot] += 1
+
+        if handler is None:
+            if trace is not None:
+                trace.record(program_counter, op_code, latency)
+            break
+        elif control_flow:
+            program_counter = handler(*operands, program_counter)
+        else:
+            handler(*operands)
+            program_counter += 1
+    clock_cycles += stalls[0]
+
+    if abort != xsim_watchdog.ABORT_PC:
+        if profile is not None:
+            profile.finish(program_counter, not stopped and abort is None)
+        if pipeline is not None:
+            pipeline.finish(program_counter, not stopped and abort is None)
+        if bbv is not None:
+            bbv.finish(program_counter, not stopped and abort is None)
+    if profile is not None:
+        for model in (cache, branches):
+            if model is not None:
+                profile.add_stalls(model.pc_stalls)
+
+    if stopped and checkpoint_file is not None:
+        xsim_checkpoint.write_checkpoint(checkpoint_file, capture_checkpoint(
+            program_counter, instruction_count, clock_cycles, op_counts))
+
+    STATISTICS_DICT['stats'][0].update(isa.counts_to_stats(op_counts))
     STATISTICS_DICT['stats'][0]['instructions'] = instruction_count
     STATISTICS_DICT['stats'][0]['cycles'] = clock_cycles
+    if cache is not None:
+        cache.add_statistics(STATISTICS_DICT)
+    if branches is not None:
+        branches.add_statistics(STATISTICS_DICT)
+    if pipeline is not None:
+        pipeline.add_statistics(STATISTICS_DICT)
+    if abort is not None:
+        STATISTICS_DICT['abort'] = xsim_watchdog.abort_record(
+            abort, program_counter)
+
+    return STATISTICS_DICT
+
+
+class XSim:
+    """XSim Class owning the registers, data memory, program
+    and statistics of one simulation.  Nothing is shared
+    between instances, so any number of simulations can run
+    in one process or in threads.  Programs run on the
+    integer engine, with their loads and stores timed by a
+    CacheHierarchy, their branches predicted by
+    BranchPredictors, their instructions timed by a Pipeline
+    and their basic block vectors collected by
+    BasicBlockVectors when they are given.
+    """
 
-    with open(output_file, 'w') as ofp:
-        json.dump(STATISTICS_DICT, ofp)
+    def __init__(self, latency_dict=None, cache=None, branches=None,
+                 pipeline=None, bbv=None):
+        self.latencies = {name: 1 for name in isa.CONFIGURABLE_OPS}
+        if latency_dict is not None:
+            self.latencies.update(latency_dict)
+        self.machine = xsim_int.Machine()
+        self.dispatch_table = isa.build_dispatch_table(self.machine.handlers,
+                                                       self.latencies)
+        # stall cycles the timing models added to the latencies
+        self.stalls = [0]
+        # the penalty of a branch is charged before the basic
+        # block vectors see it transfer
+        self.branches = branches
+        if branches is not None:
+            branches.start(self.stalls)
+            self.dispatch_table = branches.predicted_dispatch_table(
+                self.dispatch_table)
+        self.bbv = bbv
+        if bbv is not None:
+            self.dispatch_table = bbv.bbv_dispatch_table(self.dispatch_table)
+        self.cache = cache
+        if cache is not None:
+            cache.start(self.stalls)
+            self.dispatch_table = cache.cached_dispatch_table(
+                self.dispatch_table, self.machine.load_address,
+                self.machine.store_address)
+        self.pipeline = pipeline
+        if pipeline is not None:
+            self.dispatch_table = pipeline.pipelined_dispatch_table(
+                self.dispatch_table)
+        self.program = []
+        self.program_counter = None
+        self.op_counts = [0] * len(isa.STAT_NAMES)
+        self.instruction_count = 0
+        self.clock_cycles = 0
+        self.end = None
+
+    def load_program(self, instruction_memory, memory_image=None):
+        """Loads a program and clears the machine and the
+        statistics
 
-    pprint(STATISTICS_DICT)
+        Keyword arguments:
+        instruction_memory -- list of 16 bit instruction words
+        memory_image -- binary image preloaded into data memory or None
+
+        Returns: None
+        """
+        self.machine.reset()
+        if memory_image is not None:
+            xsim_memory.load_image(self.machine.data_memory, memory_image)
+        self.program = xsim_int.decode_program(instruction_memory,
+                                               self.machine.handlers)
+        if self.pipeline is not None:
+            self.pipeline.start(instruction_memory, self.dispatch_table)
+        self.stalls[0] = 0
+        if self.bbv is not None:
+            self.bbv.start([record[0] for record in self.program],
+                           self.dispatch_table, 0, self.stalls)
+        self.program_counter = 0
+        self.op_counts = [0] * len(isa.STAT_NAMES)
+        self.instruction_count = 0
+        self.clock_cycles = 0
+        self.end = None
+
+    def step(self):
+        """Executes the next instruction
 
-if __name__ == '__main__':
+        Keyword arguments:
+        None
 
-    if len(sys.argv) is not 4:
-        print("Usage: ./xsim inputfile configfile outputstatsfile")
-        exit(1)
+        Returns: PC of the next instruction or None once the
+                 program has ended
+        """
+        self.run(1)
+        if self.end is not None:
+            return None
+        return self.program_counter
 
-    INPUT_FILE = sys.argv[1]
-    CONFIG_FILE = sys.argv[2]
-    OUTPUT_FILE = sys.argv[3]
+    def run(self, max_instructions=None):
+        """Executes the program until it ends or until
+        max_instructions instructions have executed.  A
+        program that has ended executes nothing.
+
+        Keyword arguments:
+        max_instructions -- number of instructions to execute
+                            or None to run to the end
+
+        Returns: Number of instructions executed
+        """
+        if self.program_counter is None:
+            raise ValueError('no program is loaded')
+        if self.end is not None:
+            return 0
+        if max_instructions is None:
+            max_instructions = -1
+
+        (self.program_counter, executed, cycles, self.end) = xsim_int.execute(
+            self.program, self.dispatch_table, self.program_counter,
+            self.op_counts, max_instructions)
+        self.instruction_count += executed
+        self.clock_cycles += cycles
+        if self.end in (xsim_int.END_HALT, xsim_int.END_UNRECOGNIZED):
+            if self.pipeline is not None:
+                self.pipeline.finish(self.program_counter, True)
+            if self.bbv is not None:
+                self.bbv.finish(self.program_counter, True)
+
+        return executed
+
+    def stats(self):
+        """Builds the statistics of the run so far in the
+        layout of the statistics file.  A run that left
+        instruction memory has an abort record.
+
+        Keyword arguments:
+        None
+
+        Returns: Dictionary
+        """
+        statistics = self.machine.build_statistics(
+            self.op_counts, self.instruction_count,
+            self.clock_cycles + self.stalls[0])
+        if self.cache is not None:
+            self.cache.add_statistics(statistics)
+        if self.branches is not None:
+            self.branches.add_statistics(statistics)
+        if self.pipeline is not None:
+            self.pipeline.add_statistics(statistics)
+        if self.end == xsim_watchdog.ABORT_PC:
+            statistics['abort'] = xsim_watchdog.abort_record(
+                self.end, self.program_counter)
+
+        return statistics
+
+
+def xsim(config_file, input_file, output_file, engine='bitstring',
+         trace=None, display=True, memory_image=None, memory_dump=None,
+         resume_file=None, stop_instruction=None, stop_pc=None,
+         checkpoint_file=None, watchdog=None, profile=None, cache=None,
+         branches=None, pipeline=None, bbv=None):
+    """Run the simulation of the X isa for given
+       configuration and input file and maintain stats
+
+       Keyword arguments:
+       config_file -- JSON file containing latency configurations
+       input_file -- list of instructions and comments in ASCII Hex
+       output_file -- output file for simulation statistics
+       engine -- 'bitstring', 'int' or 'jit' execution engine
+       trace -- TraceSink recording retired instructions or None
+       display -- pretty print the statistics when True
+       memory_image -- binary image preloaded into data memory or None
+       memory_dump -- file receiving the final data memory or None
+       resume_file -- checkpoint file to resume from or None
+       stop_instruction -- instruction count to stop at or None
+       stop_pc -- PC to stop at or None
+       checkpoint_file -- file receiving the state when stopped or None
+       watchdog -- Watchdog holding the budgets of the run or None
+       profile -- Profile counting the control flow of the run or None
+       cache -- CacheHierarchy timing the loads and stores or None
+       branches -- BranchPredictors predicting the branches or None
+       pipeline -- Pipeline timing the run in order or None
+       bbv -- BasicBlockVectors collecting interval vectors or None
+
+       Return: None
+    """
+    latency_dict = configure_latency(config_file)
+    resume = None
+    if resume_file is not None:
+        resume = xsim_checkpoint.read_checkpoint(resume_file)
+    simulate(latency_dict, input_file, engine, trace, memory_image, resume,
+             stop_instruction, stop_pc, checkpoint_file, watchdog, profile,
+             cache, branches, pipeline, bbv)
+
+    if 'abort' in STATISTICS_DICT:
+        print('ABORTED: {} at PC {}'.format(
+            STATISTICS_DICT['abort'][0]['reason'],
+            STATISTICS_DICT['abort'][0]['pc']), file=sys.stderr)
+    write_statistics(output_file, display)
+
+    if memory_dump is not None:
+        if engine in ('int', 'jit'):
+            xsim_memory.dump_image(xsim_int.DATA_MEMORY, memory_dump)
+        else:
+            xsim_memory.dump_image(DATA_MEMORY, memory_dump)
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments
+
+       Keyword arguments:
+       argv -- list of command line arguments sans program name
+
+       Return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog='./xsim',
+        usage='./xsim inputfile configfile outputstatsfile [options]')
+    parser.add_argument('input_file')
+    parser.add_argument('config_file')
+    parser.add_argument('output_file')
+    parser.add_argument('--engine', choices=['bitstring', 'int', 'jit'],
+                        default='bitstring',
+                        help='execution engine: bitstring registers, '
+                             'integer registers, or integer registers '
+                             'with compiled basic blocks '
+                             '(default: bitstring)')
+    parser.add_argument('--trace', choices=sorted(xsim_trace.TRACE_LEVELS),
+                        default='off',
+                        help='trace every retired instruction by opcode '
+                             'or with the full register state '
+                             '(default: off)')
+    parser.add_argument('--trace-file',
+                        help='file receiving the trace '
+                             '(default: outputstatsfile with a .trace '
+                             'extension)')
+    parser.add_argument('--trace-format', choices=xsim_trace.TRACE_FORMATS,
+                        default='jsonl',
+                        help='JSON lines or packed binary records '
+                             '(default: jsonl)')
+    parser.add_argument('--quiet', action='store_true',
+                        help='do not display the statistics when the '
+                             'run ends')
+    parser.add_argument('--memory-image',
+                        help='binary image of little-endian 16 bit words '
+                             'loaded into data memory from address 0')
+    parser.add_argument('--memory-dump',
+                        help='file receiving the final 64K words of data '
+                             'memory as little-endian 16 bit words')
+    parser.add_argument('--stop-instruction', type=int,
+                        help='stop once this many instructions have '
+                             'executed')
+    parser.add_argument('--stop-pc', type=int,
+                        help='stop before executing the instruction at '
+                             'this PC')
+    parser.add_argument('--checkpoint',
+                        help='file receiving the architectural state when '
+                             'the run stops at --stop-instruction or '
+                             '--stop-pc')
+    parser.add_argument('--resume',
+                        help='checkpoint file to resume the run from')
+    parser.add_argument('--max-instructions', type=int,
+                        help='abort once this many instructions have '
+                             'executed')
+    parser.add_argument('--max-cycles', type=int,
+                        help='abort once this many cycles have been '
+                             'simulated')
+    parser.add_argument('--timeout', type=float,
+                        help='abort after this many seconds of wall clock '
+                             'time')
+    parser.add_argument('--progress', type=int, metavar='N',
+                        help='write a progress record every N '
+                             'instructions')
+    parser.add_argument('--progress-file',
+                        help='file receiving the progress records as JSON '
+                             'lines (default: stderr)')
+    parser.add_argument('--profile', action='store_true',
+                        help='count the executions and cycles of every PC '
+                             'and basic block and the outcomes of every '
+                             'branch')
+    parser.add_argument('--profile-file',
+                        help='file receiving the profile report '
+                             '(default: outputstatsfile with a .profile.json '
+                             'or .profile.csv extension)')
+    parser.add_argument('--profile-format',
+                        choices=xsim_profile.PROFILE_FORMATS, default='json',
+                        help='blocks and PCs as JSON or one CSV row per PC '
+                             '(default: json)')
+    parser.add_argument('--cache', metavar='CACHE_CONFIG',
+                        help='JSON configuration of cache levels timing '
+                             'every load and store')
+    parser.add_argument('--predictor', action='append', metavar='SPEC',
+                        help='branch predictor to evaluate: static-taken, '
+                             'static-not-taken, bimodal:<entries> or '
+                             'gshare:<entries>:<history bits>.  Repeat to '
+                             'compare predictors, the first one times the '
+                             'run')
+    parser.add_argument('--mispredict-penalty', type=int,
+                        default=xsim_branch.DEFAULT_PENALTY,
+                        help='cycles added by each misprediction of the '
+                             'first predictor (default: %(default)s)')
+    parser.add_argument('--bbv', type=int, metavar='N',
+                        help='collect a basic block vector every N '
+                             'instructions for xsim_simpoint')
+    parser.add_argument('--bbv-file',
+                        help='file receiving the vectors as JSON lines '
+                             '(default: outputstatsfile with a .bbv '
+                             'extension)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='time the run on a five stage in-order '
+                             'pipeline and report its cycles and stalls')
+    parser.add_argument('--no-forwarding', action='store_true',
+                        help='time the pipeline without forwarding paths')
+    parser.add_argument('--branch-bubbles', type=int,
+                        default=xsim_pipeline.BRANCH_BUBBLES,
+                        help='pipeline cycles lost by each taken branch or '
+                             'jump (default: %(default)s)')
+
+    args = parser.parse_args(argv)
+    if (args.checkpoint is not None and args.stop_instruction is None and
+            args.stop_pc is None):
+        parser.error('--checkpoint needs --stop-instruction or --stop-pc')
+    if args.bbv is not None and args.bbv <= 0:
+        parser.error('--bbv needs a positive interval')
+    if ((args.no_forwarding or
+         args.branch_bubbles != xsim_pipeline.BRANCH_BUBBLES) and
+            not args.pipeline):
+        parser.error('--no-forwarding and --branch-bubbles need --pipeline')
+
+    return args
+
+
+if __name__ == '__main__':
 
-    xsim(CONFIG_FILE, INPUT_FILE, OUTPUT_FILE)
+    ARGS = parse_arguments(sys.argv[1:])
+
+    TRACE = None
+    if ARGS.trace != 'off':
+        TRACE_FILE = ARGS.trace_file
+        if TRACE_FILE is None:
+            TRACE_FILE = '.'.join([os.path.splitext(ARGS.output_file)[0],
+                                   'trace'])
+        TRACE = xsim_trace.TraceSink(TRACE_FILE,
+                                     xsim_trace.TRACE_LEVELS[ARGS.trace],
+                                     ARGS.trace_format)
+
+    WATCHDOG = None
+    PROGRESS_OUT = sys.stderr
+    if ARGS.progress is not None and ARGS.progress_file is not None:
+        PROGRESS_OUT = open(ARGS.progress_file, 'w')
+    if (ARGS.max_instructions is not None or ARGS.max_cycles is not None or
+            ARGS.timeout is not None or ARGS.progress is not None):
+        WATCHDOG = xsim_watchdog.Watchdog(ARGS.max_instructions,
+                                          ARGS.max_cycles, ARGS.timeout,
+                                          ARGS.progress, PROGRESS_OUT)
+
+    PROFILE = None
+    if ARGS.profile:
+        PROFILE = xsim_profile.Profile()
+
+    CACHE = None
+    if ARGS.cache is not None:
+        try:
+            CACHE = xsim_cache.load_cache_config(ARGS.cache)
+        except (KeyError, ValueError) as error:
+            print('ERROR: invalid cache configuration {}: {}'.format(
+                ARGS.cache, error), file=sys.stderr)
+            exit(1)
+
+    BRANCHES = None
+    if ARGS.predictor is not None:
+        try:
+            BRANCHES = xsim_branch.BranchPredictors(
+                [xsim_branch.make_predictor(spec) for spec in ARGS.predictor],
+                ARGS.mispredict_penalty)
+        except ValueError as error:
+            print('ERROR: {}'.format(error), file=sys.stderr)
+            exit(1)
+
+    PIPELINE = None
+    if ARGS.pipeline:
+        PIPELINE = xsim_pipeline.Pipeline(not ARGS.no_forwarding,
+                                          ARGS.branch_bubbles)
+
+    BBV = None
+    if ARGS.bbv is not None:
+        BBV = xsim_bbv.BasicBlockVectors(ARGS.bbv)
+
+    try:
+        xsim(ARGS.config_file, ARGS.input_file, ARGS.output_file,
+             engine=ARGS.engine, trace=TRACE, display=not ARGS.quiet,
+             memory_image=ARGS.memory_image, memory_dump=ARGS.memory_dump,
+             resume_file=ARGS.resume, stop_instruction=ARGS.stop_instruction,
+             stop_pc=ARGS.stop_pc, checkpoint_file=ARGS.checkpoint,
+             watchdog=WATCHDOG, profile=PROFILE, cache=CACHE,
+             branches=BRANCHES, pipeline=PIPELINE, bbv=BBV)
+        if PROFILE is not None:
+            PROFILE_FILE = ARGS.profile_file
+            if PROFILE_FILE is None:
+                PROFILE_FILE = '.'.join([
+                    os.path.splitext(ARGS.output_file)[0], 'profile',
+                    ARGS.profile_format])
+            xsim_profile.write_report(PROFILE.report(), PROFILE_FILE,
+                                      ARGS.profile_format)
+        if BBV is not None:
+            BBV_FILE = ARGS.bbv_file
+            if BBV_FILE is None:
+                BBV_FILE = '.'.join([os.path.splitext(ARGS.output_file)[0],
+                                     'bbv'])
+            xsim_bbv.write_vectors(BBV, BBV_FILE)
+    finally:
+        if TRACE is not None:
+            TRACE.close()
+        if PROGRESS_OUT is not sys.stderr:
+            PROGRESS_OUT.close()
@@ -0,0 +1,167 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_batch
+Course:  CS2410
+
+Batch runner for every input file against every latency
+configuration.  Jobs run in a pool of worker processes that
+import the simulator once and are reused for every job, and all
+statistics are written to one aggregated JSON file.
+"""
+
+import os
+import sys
+import copy
+import glob
+import json
+import time
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+
+import xsim
+import xsim_watchdog
+
+
+def expand_patterns(patterns):
+    """Expands a list of file names and glob patterns
+
+       Keyword arguments:
+       patterns -- list of file names or glob patterns
+
+       Return: List of file names in order without duplicates
+    """
+    file_names = []
+
+    for pattern in patterns:
+        for file_name in sorted(glob.glob(pattern)):
+            if file_name not in file_names:
+                file_names.append(file_name)
+
+    return file_names
+
+
+def load_manifest(manifest_file):
+    """Reads a batch manifest.  The manifest is a JSON object
+       with an 'inputs' and a 'configs' list of file names or
+       glob patterns.
+
+       Keyword arguments:
+       manifest_file -- JSON manifest file
+
+       Return: Tuple(list of input files, list of config files)
+    """
+    with open(manifest_file) as manifest:
+        manifest_values = json.load(manifest)
+
+    return (expand_patterns(manifest_values['inputs']),
+            expand_patterns(manifest_values['configs']))
+
+
+def run_job(job):
+    """Runs one simulation in a worker process
+
+       Keyword arguments:
+       job -- Tuple(input file, config file, engine, budgets)
+
+       Return: Dictionary of the job and its statistics, or the
+               error that stopped it
+    """
+    (input_file, config_file, engine, budgets) = job
+    result = {'input': input_file, 'config': config_file}
+
+    watchdog = None
+    if any(budget is not None for budget in budgets):
+        watchdog = xsim_watchdog.Watchdog(*budgets)
+
+    try:
+        latency_dict = xsim.configure_latency(config_file)
+        # simulate returns the module statistics dictionary, which
+        # the next job in this worker refills
+        result['statistics'] = copy.deepcopy(
+            xsim.simulate(latency_dict, input_file, engine,
+                          watchdog=watchdog))
+    except Exception as error:
+        result['error'] = '{}: {}'.format(type(error).__name__, error)
+
+    return result
+
+
+def run_batch(input_files, config_files, engine='jit', workers=None,
+              budgets=(None, None, None)):
+    """Runs every input file against every config file.  Jobs
+       that exceed a budget keep their statistics so far with
+       an abort record.
+
+       Keyword arguments:
+       input_files -- list of instruction files
+       config_files -- list of latency configuration files
+       engine -- 'bitstring', 'int' or 'jit' execution engine
+       workers -- number of worker processes, all cores if None
+       budgets -- Tuple(max instructions, max cycles, timeout in
+                  seconds) of every job, None for no budget
+
+       Return: List of job results in input major order
+    """
+    jobs = [(input_file, config_file, engine, budgets)
+            for input_file in input_files
+            for config_file in config_files]
+    workers = workers or os.cpu_count()
+    chunk_size = max(1, len(jobs) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_job, jobs, chunksize=chunk_size))
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments
+
+       Keyword arguments:
+       argv -- list of command line arguments sans program name
+
+       Return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog='./xsim_batch',
+        usage='./xsim_batch manifest outputfile [options]')
+    parser.add_argument('manifest_file')
+    parser.add_argument('output_file')
+    parser.add_argument('--engine', choices=['bitstring', 'int', 'jit'],
+                        default='jit',
+                        help='execution engine (default: jit)')
+    parser.add_argument('--workers', type=int,
+                        help='number of worker processes '
+                             '(default: number of cores)')
+    parser.add_argument('--max-instructions', type=int,
+                        help='abort a job once this many instructions have '
+                             'executed')
+    parser.add_argument('--max-cycles', type=int,
+                        help='abort a job once this many cycles have been '
+                             'simulated')
+    parser.add_argument('--timeout', type=float,
+                        help='abort a job after this many seconds')
+
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+
+    ARGS = parse_arguments(sys.argv[1:])
+    (INPUT_FILES, CONFIG_FILES) = load_manifest(ARGS.manifest_file)
+
+    START = time.perf_counter()
+    RESULTS = run_batch(INPUT_FILES, CONFIG_FILES, ARGS.engine, ARGS.workers,
+                        (ARGS.max_instructions, ARGS.max_cycles,
+                         ARGS.timeout))
+    ELAPSED = time.perf_counter() - START
+
+    with open(ARGS.output_file, 'w') as OFP:
+        json.dump(RESULTS, OFP)
+
+    FAILED = sum(1 for result in RESULTS if 'error' in result)
+    ABORTED = sum(1 for result in RESULTS
+                  if 'abort' in result.get('statistics', {}))
+    print('{} jobs ({} failed, {} aborted) in {:.2f}s: {:.1f} jobs/s'.format(
+        len(RESULTS), FAILED, ABORTED, ELAPSED,
+        len(RESULTS) / max(ELAPSED, 1e-9)))
@@ -0,0 +1,223 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_bbv
+Course:  CS2410
+
+Basic block vectors of a run, one per interval of about N
+instructions, for SimPoint style phase analysis by xsim_simpoint.
+A vector counts the instructions executed in every basic block
+during the interval.  A block is named by the PC it was entered at
+and runs straight to the next control flow instruction, so only
+the control flow handlers are wrapped, and the compiled blocks of
+the JIT report the same transfers.  An interval ends with the
+block that reaches N instructions, so intervals can be a block
+longer than N.
+
+Every interval is written as one JSON line:
+
+   {"interval": 0, "start": 0, "instructions": 100000,
+    "cycles": 131072, "blocks": [[pc, instructions], ...]}
+
+where start is the number of instructions executed before it and
+cycles are the latency cycles of its instructions plus the stall
+cycles charged while it ran.
+"""
+
+import json
+
+from collections import defaultdict
+
+import isa
+
+# DEFINES
+DEFAULT_INTERVAL = 100000
+
+
+class BasicBlockVectors:
+    """BasicBlockVectors Class that collects the basic block
+    vector of every interval of a run
+    """
+
+    def __init__(self, interval_size=DEFAULT_INTERVAL):
+        if interval_size <= 0:
+            raise ValueError('interval size must be positive')
+        self.interval_size = interval_size
+        self.intervals = []
+        # latency cycles of the instructions before every PC
+        self.cycle_prefix = [0]
+        self.block_start = 0
+        self.executed = 0
+        self.counts = defaultdict(int)
+        self.instructions = 0
+        self.cycles = 0
+        self.stalls = [0]
+        # stall cycles of the run when the interval started
+        self.interval_stalls = 0
+        self.transfer = self.build_transfer()
+
+    def start(self, op_codes, dispatch_table, program_counter, stalls=None):
+        """Records the latencies of a program and the PC the
+        run starts at
+
+        Keyword arguments:
+        op_codes -- op_code of every instruction in the program
+        dispatch_table -- op_code indexed dispatch table of the run
+        program_counter -- PC of the first instruction run
+        stalls -- single element list of the stall cycles of the
+                  run so far or None when nothing stalls
+
+        Returns: None
+        """
+        cycle_prefix = [0]
+        for op_code in op_codes:
+            entry = dispatch_table[op_code]
+            cycle_prefix.append(cycle_prefix[-1] +
+                                (entry[1] if entry is not None else 0))
+        self.cycle_prefix[:] = cycle_prefix
+        self.block_start = program_counter
+        self.stalls = stalls if stalls is not None else [0]
+        self.interval_stalls = self.stalls[0]
+
+    def build_transfer(self):
+        """Builds the function recording the block ended by a
+        control flow instruction
+
+        Keyword arguments:
+        None
+
+        Returns: function of the PC of the control flow
+                 instruction and the next PC
+        """
+        cycle_prefix = self.cycle_prefix
+        counts = self.counts
+        interval_size = self.interval_size
+
+        def transfer(program_counter, next_pc):
+            block_start = self.block_start
+            length = program_counter - block_start + 1
+            counts[block_start] += length
+            self.instructions += length
+            self.cycles += (cycle_prefix[program_counter + 1] -
+                            cycle_prefix[block_start])
+            self.block_start = next_pc
+            if self.instructions >= interval_size:
+                self.close_interval()
+
+        return transfer
+
+    def close_interval(self):
+        """Ends the current interval and starts the next one
+
+        Keyword arguments:
+        None
+
+        Returns: None
+        """
+        stalls = self.stalls[0]
+        self.intervals.append({
+            'interval': len(self.intervals),
+            'start': self.executed,
+            'instructions': self.instructions,
+            'cycles': self.cycles + stalls - self.interval_stalls,
+            'blocks': [[pc, instructions] for (pc, instructions)
+                       in sorted(self.counts.items())]})
+        self.executed += self.instructions
+        self.counts.clear()
+        self.instructions = 0
+        self.cycles = 0
+        self.interval_stalls = stalls
+
+    def bbv_dispatch_table(self, dispatch_table):
+        """Wraps the handlers of the control flow instructions
+        of a dispatch table so that they end the block they
+        finish.  Other entries are left as they are, even when
+        an earlier wrapper made them take the PC.
+
+        Keyword arguments:
+        dispatch_table -- op_code indexed dispatch table
+
+        Returns: List
+        """
+        bbv_table = list(dispatch_table)
+
+        for op_code, (_, _, control_flow) in isa.OPCODE_MAP.items():
+            entry = dispatch_table[op_code]
+            if not control_flow or entry is None or entry[0] is None:
+                continue
+
+            (handler, latency, stat_slot, _, operand_count) = entry
+            bbv_table[op_code] = (
+                self.bbv_control_flow(handler, operand_count), latency,
+                stat_slot, True, operand_count)
+
+        return bbv_table
+
+    def bbv_control_flow(self, handler, operand_count):
+        """Builds a handler for a control flow instruction that
+        ends its block
+
+        Keyword arguments:
+        handler -- handler returning the next PC
+        operand_count -- number of operands before the PC
+
+        Returns: function
+        """
+        transfer = self.transfer
+
+        if operand_count == 1:
+            def counted(operand, program_counter):
+                next_pc = handler(operand, program_counter)
+                transfer(program_counter, next_pc)
+                return next_pc
+        else:
+            def counted(first, second, program_counter):
+                next_pc = handler(first, second, program_counter)
+                transfer(program_counter, next_pc)
+                return next_pc
+
+        return counted
+
+    def finish(self, program_counter, executed):
+        """Ends the last block and interval of a run
+
+        Keyword arguments:
+        program_counter -- PC of the last instruction reached
+        executed -- True when that instruction ran (HALT or an
+                    unrecognized op_code), False when the run
+                    stopped before it
+
+        Returns: None
+        """
+        if not executed:
+            program_counter -= 1
+        if program_counter >= self.block_start:
+            self.transfer(program_counter, program_counter + 1)
+        if self.instructions:
+            self.close_interval()
+
+
+def write_vectors(bbv, bbv_file):
+    """Writes the interval vectors of a run as JSON lines
+
+       Keyword arguments:
+       bbv -- BasicBlockVectors of the run
+       bbv_file -- file receiving the vectors
+
+       Return: None
+    """
+    with open(bbv_file, 'w') as ofp:
+        for interval in bbv.intervals:
+            ofp.write(json.dumps(interval) + '\n')
+
+
+def load_vectors(bbv_file):
+    """Reads the interval vectors written by write_vectors
+
+       Keyword arguments:
+       bbv_file -- file holding the vectors
+
+       Return: List of Dictionary
+    """
+    with open(bbv_file) as ifp:
+        return [json.loads(line) for line in ifp if line.strip()]
@@ -0,0 +1,323 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_branch
+Course:  CS2410
+
+Branch predictor models evaluated on every conditional branch of a
+run.  Any number of predictors run side by side on the same branch
+outcomes so they can be compared in one simulation.  The first
+predictor times the run: each of its mispredictions adds the
+misprediction penalty to the running stall count of the run as the
+branch retires, so the cycle budgets, the trace, the profile and the
+basic block vectors all include it.  The others are only reported.
+
+Predictors are named by a spec:
+
+   static-taken, static-not-taken   always predict one direction
+   bimodal:<entries>                2 bit counters indexed by PC
+   gshare:<entries>:<history bits>  2 bit counters indexed by PC
+                                    xor the global branch history
+
+A branch is taken when it leaves the fall through PC.  Without
+predictors the engines run unchanged.
+"""
+
+from collections import defaultdict
+from array import array
+
+import isa
+
+# DEFINES
+CONDITIONAL_BRANCHES = ['bp', 'bn', 'bx', 'bz']
+DEFAULT_PENALTY = 2
+
+# 2 bit counters start weakly taken
+COUNTER_INIT = 2
+COUNTER_MAX = 3
+
+
+class StaticPredictor:
+    """StaticPredictor Class that always predicts the same
+    direction
+    """
+
+    def __init__(self, taken):
+        self.name = 'static-taken' if taken else 'static-not-taken'
+        self.taken = taken
+        self.mispredictions = defaultdict(int)
+
+    def branch(self, program_counter, taken):
+        """Predicts a branch and learns its outcome
+
+        Keyword arguments:
+        program_counter -- PC of the branch
+        taken -- True when the branch was taken
+
+        Returns: True when the branch was mispredicted
+        """
+        if taken != self.taken:
+            self.mispredictions[program_counter] += 1
+            return True
+        return False
+
+
+class BimodalPredictor:
+    """BimodalPredictor Class that predicts each branch from
+    a 2 bit saturating counter selected by its PC
+    """
+
+    def __init__(self, entries):
+        self.name = 'bimodal:{}'.format(entries)
+        self.mask = entries - 1
+        self.counters = array('B', [COUNTER_INIT]) * entries
+        self.mispredictions = defaultdict(int)
+
+    def branch(self, program_counter, taken):
+        """Predicts a branch and learns its outcome
+
+        Keyword arguments:
+        program_counter -- PC of the branch
+        taken -- True when the branch was taken
+
+        Returns: True when the branch was mispredicted
+        """
+        index = program_counter & self.mask
+        counter = self.counters[index]
+
+        mispredicted = (counter >= COUNTER_INIT) != taken
+        if mispredicted:
+            self.mispredictions[program_counter] += 1
+        if taken:
+            if counter < COUNTER_MAX:
+                self.counters[index] = counter + 1
+        elif counter:
+            self.counters[index] = counter - 1
+        return mispredicted
+
+
+class GsharePredictor:
+    """GsharePredictor Class that predicts each branch from
+    a 2 bit saturating counter selected by its PC xor the
+    outcomes of the latest branches
+    """
+
+    def __init__(self, entries, history_bits):
+        self.name = 'gshare:{}:{}'.format(entries, history_bits)
+        self.mask = entries - 1
+        self.history_mask = (1 << history_bits) - 1
+        self.history = 0
+        self.counters = array('B', [COUNTER_INIT]) * entries
+        self.mispredictions = defaultdict(int)
+
+    def branch(self, program_counter, taken):
+        """Predicts a branch and learns its outcome
+
+        Keyword arguments:
+        program_counter -- PC of the branch
+        taken -- True when the branch was taken
+
+        Returns: True when the branch was mispredicted
+        """
+        index = (program_counter ^ self.history) & self.mask
+        counter = self.counters[index]
+
+        mispredicted = (counter >= COUNTER_INIT) != taken
+        if mispredicted:
+            self.mispredictions[program_counter] += 1
+        if taken:
+            if counter < COUNTER_MAX:
+                self.counters[index] = counter + 1
+        elif counter:
+            self.counters[index] = counter - 1
+        self.history = ((self.history << 1) | taken) & self.history_mask
+        return mispredicted
+
+
+def make_predictor(spec):
+    """Builds a predictor from its spec
+
+       Keyword arguments:
+       spec -- predictor spec such as 'bimodal:1024'
+
+       Return: predictor
+    """
+    fields = spec.split(':')
+    kind = fields[0]
+
+    try:
+        sizes = [int(field) for field in fields[1:]]
+    except ValueError:
+        raise ValueError('bad predictor sizes in {}'.format(spec))
+    if any(size <= 0 for size in sizes):
+        raise ValueError('predictor sizes must be positive in {}'.format(
+            spec))
+    if sizes and sizes[0] & (sizes[0] - 1):
+        raise ValueError('predictor entries must be a power of two in '
+                         '{}'.format(spec))
+
+    if kind in ('static-taken', 'static-not-taken') and not sizes:
+        return StaticPredictor(kind == 'static-taken')
+    if kind == 'bimodal' and len(sizes) == 1:
+        return BimodalPredictor(sizes[0])
+    if kind == 'gshare' and len(sizes) == 2:
+        return GsharePredictor(sizes[0], sizes[1])
+    raise ValueError('unknown predictor {}'.format(spec))
+
+
+class BranchPredictors:
+    """BranchPredictors Class that runs predictors side by
+    side on the conditional branches of a run
+    """
+
+    def __init__(self, predictors, penalty=DEFAULT_PENALTY):
+        self.predictors = predictors
+        self.penalty = penalty
+        self.executions = defaultdict(int)
+        self.taken = defaultdict(int)
+        # penalty cycles of every PC and the most one branch adds
+        self.pc_stalls = defaultdict(int)
+        self.max_stall = penalty if predictors else 0
+        self.stalls = [0]
+        self.branch = self.build_branch()
+
+    def start(self, stalls):
+        """Starts timing a run.  The penalty of every
+        misprediction of the first predictor is added to the
+        running stall count of the run as it happens.  Call
+        it before wrapping a dispatch table.
+
+        Keyword arguments:
+        stalls -- single element list of the stall cycles of
+                  the run so far
+
+        Returns: None
+        """
+        self.stalls = stalls
+        self.branch = self.build_branch()
+
+    def build_branch(self):
+        """Builds the function recording one branch outcome
+        in every predictor and charging the penalty of the
+        first one
+
+        Keyword arguments:
+        None
+
+        Returns: function of the branch PC and True when taken
+        """
+        predictors = tuple(predictor.branch for predictor in self.predictors)
+        executions = self.executions
+        taken_counts = self.taken
+        pc_stalls = self.pc_stalls
+        stalls = self.stalls
+        penalty = self.penalty
+
+        if not predictors:
+            def branch(program_counter, taken):
+                executions[program_counter] += 1
+                if taken:
+                    taken_counts[program_counter] += 1
+
+            return branch
+
+        (timing, others) = (predictors[0], predictors[1:])
+
+        def branch(program_counter, taken):
+            executions[program_counter] += 1
+            if taken:
+                taken_counts[program_counter] += 1
+            if timing(program_counter, taken) and penalty:
+                stalls[0] += penalty
+                pc_stalls[program_counter] += penalty
+            for predictor in others:
+                predictor(program_counter, taken)
+
+        return branch
+
+    def predicted_dispatch_table(self, dispatch_table):
+        """Wraps the conditional branch handlers of a dispatch
+        table so that they record their outcomes.  Other entries
+        are left as they are.
+
+        Keyword arguments:
+        dispatch_table -- op_code indexed dispatch table
+
+        Returns: List
+        """
+        predicted_table = list(dispatch_table)
+
+        for op_code, (name, _, _) in isa.OPCODE_MAP.items():
+            entry = dispatch_table[op_code]
+            if name not in CONDITIONAL_BRANCHES or entry is None:
+                continue
+
+            (handler, latency, stat_slot, control_flow, operand_count) = entry
+            predicted_table[op_code] = (self.predicted_branch(handler,
+                                                              operand_count),
+                                        latency, stat_slot, control_flow,
+                                        operand_count)
+
+        return predicted_table
+
+    def predicted_branch(self, handler, operand_count):
+        """Builds a branch handler that records whether the
+        branch was taken
+
+        Keyword arguments:
+        handler -- branch handler returning the next PC
+        operand_count -- number of operands before the PC
+
+        Returns: function
+        """
+        branch = self.branch
+
+        if operand_count == 1:
+            def predicted(operand, program_counter):
+                next_pc = handler(operand, program_counter)
+                branch(program_counter, next_pc != program_counter + 1)
+                return next_pc
+        else:
+            def predicted(first, second, program_counter):
+                next_pc = handler(first, second, program_counter)
+                branch(program_counter, next_pc != program_counter + 1)
+                return next_pc
+
+        return predicted
+
+    def add_statistics(self, statistics):
+        """Adds the accuracy of every predictor to the statistics
+        of a run.  The penalty cycles of the first predictor are
+        already in its cycles.
+
+        Keyword arguments:
+        statistics -- statistics dictionary of the run
+
+        Returns: None
+        """
+        branch_count = sum(self.executions.values())
+        records = []
+
+        for predictor in self.predictors:
+            mispredictions = sum(predictor.mispredictions.values())
+            branches = []
+            for program_counter in sorted(self.executions):
+                executions = self.executions[program_counter]
+                missed = predictor.mispredictions.get(program_counter, 0)
+                branches.append({'pc': program_counter,
+                                 'executions': executions,
+                                 'taken': self.taken.get(program_counter, 0),
+                                 'mispredictions': missed,
+                                 'accuracy': round(1 - missed / executions,
+                                                   6)})
+            records.append({'predictor': predictor.name,
+                            'branches': branch_count,
+                            'mispredictions': mispredictions,
+                            'accuracy': round(
+                                1 - mispredictions / max(branch_count, 1),
+                                6),
+                            'penalty_cycles': mispredictions * self.penalty,
+                            'pcs': branches})
+
+        statistics['branch'] = [{'penalty': self.penalty,
+                                 'predictors': records}]
@@ -0,0 +1,351 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_cache
+Course:  CS2410
+
+Memory timing model of set-associative cache levels in front of the
+data memory.  Loads and stores look up the levels in order with the
+word address they really access, each level costing its latency
+until one hits, and a miss in every level costs the memory latency
+on top.  That latency replaces the one cycle LW and SW otherwise
+take.  The cycles past that one cycle are stall cycles, added to
+the running stall count of the run as the access happens so the
+cycle budgets, the trace, the profile and the basic block vectors
+all include them.  Levels are write-allocate and a missing line is
+filled in every level it missed.
+
+The tags and replacement stamps of a level are kept in flat arrays,
+one slot per way of every set, so a lookup is a search of a short
+slice of an array.  Without a cache the engines run unchanged.
+
+A cache configuration is a JSON file such as:
+
+   {"levels": [{"name": "L1", "size": 1024, "associativity": 2,
+                "line_size": 16, "latency": 1, "replacement": "lru"},
+               {"name": "L2", "size": 8192, "associativity": 4,
+                "line_size": 32, "latency": 6}],
+    "memory_latency": 40}
+"""
+
+import json
+import random
+
+from array import array
+from collections import defaultdict
+
+import isa
+import xsim_memory
+
+# DEFINES
+REPLACEMENT_POLICIES = ['lru', 'fifo', 'random']
+
+# Cycles of LW and SW already counted by the engines
+ACCESS_LATENCY = 1
+
+DEFAULT_MEMORY_LATENCY = 40
+
+
+def power_of_two(value):
+    """Checks whether a value is a positive power of two
+
+       Keyword arguments:
+       value -- int to check
+
+       Return: Boolean
+    """
+    return value > 0 and value & (value - 1) == 0
+
+
+class CacheLevel:
+    """CacheLevel Class that holds the tag store of one
+    set-associative cache level and counts its hits and
+    misses
+    """
+
+    def __init__(self, name, size, associativity, line_size, latency,
+                 replacement='lru'):
+        if not (power_of_two(size) and power_of_two(associativity) and
+                power_of_two(line_size)):
+            raise ValueError('{}: size, associativity and line size must be '
+                             'powers of two'.format(name))
+        if size < associativity * line_size:
+            raise ValueError('{}: size is smaller than one set'.format(name))
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError('{}: unknown replacement policy {}'.format(
+                name, replacement))
+
+        self.name = name
+        self.size = size
+        self.associativity = associativity
+        self.line_size = line_size
+        self.latency = latency
+        self.replacement = replacement
+        self.set_count = size // (associativity * line_size)
+        self.line_bits = line_size.bit_length() - 1
+        self.set_bits = self.set_count.bit_length() - 1
+        self.way_bits = associativity.bit_length() - 1
+        self.set_mask = self.set_count - 1
+        self.tags = array('q', [-1]) * (self.set_count * associativity)
+        self.stamps = array('Q', [0]) * (self.set_count * associativity)
+        # hits and misses
+        self.counts = [0, 0]
+        self.lookup = self.build_lookup()
+
+    def build_lookup(self):
+        """Builds the lookup function of the level.  A lookup
+        fills the line on a miss, replacing an empty way or
+        else the way chosen by the replacement policy.  The
+        level state is bound into the function rather than read
+        from attributes on every access, and a repeated lookup
+        of the line looked up last is a hit without a search.
+
+        Keyword arguments:
+        None
+
+        Returns: function of a byte address returning True on
+                 a hit
+        """
+        tags = self.tags
+        stamps = self.stamps
+        counts = self.counts
+        associativity = self.associativity
+        line_bits = self.line_bits
+        set_bits = self.set_bits
+        set_mask = self.set_mask
+        way_bits = self.way_bits
+        lru = self.replacement == 'lru'
+        choose_way = None
+        if self.replacement == 'random':
+            choose_way = random.Random(0).randrange
+        clock = 0
+        last_line = -1
+
+        def lookup(byte_address):
+            nonlocal clock, last_line
+            line = byte_address >> line_bits
+            if line == last_line:
+                counts[0] += 1
+                return True
+
+            last_line = line
+            tag = line >> set_bits
+            first = (line & set_mask) << way_bits
+            last = first + associativity
+            clock += 1
+
+            try:
+                way = tags.index(tag, first, last)
+            except ValueError:
+                counts[1] += 1
+                ages = stamps[first:last]
+                if choose_way is not None and 0 not in ages:
+                    way = first + choose_way(associativity)
+                else:
+                    way = first + ages.index(min(ages))
+                tags[way] = tag
+                stamps[way] = clock
+                return False
+
+            counts[0] += 1
+            if lru:
+                stamps[way] = clock
+            return True
+
+        return lookup
+
+    def statistics(self):
+        """Builds the statistics of the level
+
+        Keyword arguments:
+        None
+
+        Returns: Dictionary
+        """
+        (hits, misses) = self.counts
+        accesses = hits + misses
+        return {'level': self.name,
+                'size': self.size,
+                'associativity': self.associativity,
+                'line_size': self.line_size,
+                'replacement': self.replacement,
+                'accesses': accesses,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / max(accesses, 1), 6)}
+
+
+class CacheHierarchy:
+    """CacheHierarchy Class that times the data memory
+    accesses of a run through its cache levels
+    """
+
+    def __init__(self, levels, memory_latency=DEFAULT_MEMORY_LATENCY):
+        self.levels = levels
+        self.memory_latency = memory_latency
+        # memory accesses and cycles spent past the one cycle
+        # of every access
+        self.counts = [0, 0]
+        # stall cycles of every PC and the most one access adds
+        self.pc_stalls = defaultdict(int)
+        self.max_stall = max(sum(level.latency for level in levels) +
+                             memory_latency - ACCESS_LATENCY, 0)
+        self.stalls = [0]
+        self.access = self.build_access()
+
+    def start(self, stalls):
+        """Starts timing a run.  Stall cycles are added to the
+        running stall count of the run as they happen.  Call
+        it before wrapping a dispatch table.
+
+        Keyword arguments:
+        stalls -- single element list of the stall cycles of
+                  the run so far
+
+        Returns: None
+        """
+        self.stalls = stalls
+        self.access = self.build_access()
+
+    def build_access(self):
+        """Builds the function timing one load or store.  The
+        levels are looked up in order until one hits.
+
+        Keyword arguments:
+        None
+
+        Returns: function of the PC of the instruction and the
+                 word address it accesses, returning the cycles
+                 the access takes
+        """
+        levels = tuple((level.lookup, level.latency)
+                       for level in self.levels)
+        counts = self.counts
+        pc_stalls = self.pc_stalls
+        stalls = self.stalls
+        memory_latency = self.memory_latency
+        word_bytes = xsim_memory.WORD_BYTES
+
+        def access(program_counter, address):
+            byte_address = address * word_bytes
+            latency = 0
+            for (lookup, level_latency) in levels:
+                latency += level_latency
+                if lookup(byte_address):
+                    break
+            else:
+                latency += memory_latency
+                counts[0] += 1
+            stall = latency - ACCESS_LATENCY
+            if stall:
+                counts[1] += stall
+                stalls[0] += stall
+                pc_stalls[program_counter] += stall
+            return latency
+
+        return access
+
+    def cached_dispatch_table(self, dispatch_table, load_address,
+                              store_address):
+        """Wraps the LW and SW handlers of a dispatch table so
+        that they time their access.  The wrapped entries take
+        the PC, to charge the stall to it, and are marked as
+        control flow.  Other entries are left as they are.
+
+        Keyword arguments:
+        dispatch_table -- op_code indexed dispatch table
+        load_address -- function of the LW operands giving the
+                        word address loaded
+        store_address -- function of the SW operands giving the
+                         word address stored to
+
+        Returns: List
+        """
+        cached_table = list(dispatch_table)
+
+        for op_code, (name, _, _) in isa.OPCODE_MAP.items():
+            entry = dispatch_table[op_code]
+            if name not in ('lw', 'sw') or entry is None:
+                continue
+
+            (handler, latency, stat_slot, control_flow, operand_count) = entry
+            if name == 'lw':
+                address = load_address
+            else:
+                address = store_address
+            cached_table[op_code] = (self.cached_access(handler, address,
+                                                        control_flow),
+                                     latency, stat_slot, True,
+                                     operand_count)
+
+        return cached_table
+
+    def cached_access(self, handler, address, control_flow):
+        """Builds a handler that times the access of a load or
+        store before running it.  LW and SW take two operands
+        and the built handler takes the PC after them and
+        returns the next one, as the handler does when an
+        earlier wrapper made it a control flow one.
+
+        Keyword arguments:
+        handler -- LW or SW handler
+        address -- function of the handler operands giving the
+                   word address accessed
+        control_flow -- True when the handler takes the PC
+
+        Returns: function
+        """
+        access = self.access
+
+        if control_flow:
+            def cached(first, second, program_counter):
+                access(program_counter, address(first, second))
+                return handler(first, second, program_counter)
+        else:
+            def cached(first, second, program_counter):
+                access(program_counter, address(first, second))
+                handler(first, second)
+                return program_counter + 1
+
+        return cached
+
+    def add_statistics(self, statistics):
+        """Adds the statistics of every level to the statistics
+        of a run.  The stall cycles are already in its cycles.
+
+        Keyword arguments:
+        statistics -- statistics dictionary of the run
+
+        Returns: None
+        """
+        (memory_accesses, stall_cycles) = self.counts
+        statistics['cache'] = [{
+            'levels': [level.statistics() for level in self.levels],
+            'memory_accesses': memory_accesses,
+            'memory_latency': self.memory_latency,
+            'stall_cycles': stall_cycles}]
+
+
+def load_cache_config(config_file):
+    """Builds a cache hierarchy from a JSON configuration
+
+       Keyword arguments:
+       config_file -- JSON file describing the levels
+
+       Return: CacheHierarchy
+    """
+    with open(config_file) as configuration:
+        config_values = json.load(configuration)
+
+    levels = []
+    for (position, level) in enumerate(config_values.get('levels', [])):
+        levels.append(CacheLevel(level.get('name',
+                                           'L{}'.format(position + 1)),
+                                 level['size'],
+                                 level.get('associativity', 1),
+                                 level['line_size'],
+                                 level.get('latency', 1),
+                                 level.get('replacement', 'lru')))
+
+    return CacheHierarchy(levels, config_values.get('memory_latency',
+                                                    DEFAULT_MEMORY_LATENCY))
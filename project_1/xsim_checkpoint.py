@@ -0,0 +1,115 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_checkpoint
+Course:  CS2410
+
+Architectural checkpoints of an xsim run.  A checkpoint holds the
+PC, the instruction and cycle counts, the opcode counts, the
+register words and the register values reported in the statistics,
+and the data memory.  Checkpoints are engine independent so a run
+stopped by one engine can be resumed by any other.
+"""
+
+import json
+import struct
+import sys
+import zlib
+
+from array import array
+
+import isa
+import xsim_memory
+
+# DEFINES
+CHECKPOINT_MAGIC = b'XCKP'
+CHECKPOINT_VERSION = 1
+
+# Checkpoint layout: a header of PC, instruction count and cycles,
+# the opcode counts in stat slot order, the 8 register words, the
+# length prefixed JSON of the register statistics and finally the
+# zlib compressed data memory as little-endian words.
+CHECKPOINT_HEADER = struct.Struct('<4sBiQQ')
+CHECKPOINT_COUNTS = struct.Struct('<{}Q'.format(len(isa.STAT_NAMES)))
+CHECKPOINT_REGISTERS = struct.Struct('<8H')
+CHECKPOINT_LENGTH = struct.Struct('<I')
+
+
+class Checkpoint:
+    """Checkpoint Class that holds the architectural state
+    and statistics of a run between two instructions
+    """
+
+    def __init__(self, program_counter, instruction_count, clock_cycles,
+                 op_counts, registers, register_stats, memory):
+        self.program_counter = program_counter
+        self.instruction_count = instruction_count
+        self.clock_cycles = clock_cycles
+        self.op_counts = list(op_counts)
+        self.registers = list(registers)
+        self.register_stats = list(register_stats)
+        self.memory = array('H', memory)
+
+
+def write_checkpoint(checkpoint_file, checkpoint):
+    """Writes a checkpoint to a file
+
+       Keyword arguments:
+       checkpoint_file -- path of the checkpoint
+       checkpoint -- Checkpoint to write
+
+       Return: None
+    """
+    memory = array('H', checkpoint.memory)
+    if sys.byteorder == 'big':
+        memory.byteswap()
+    register_stats = json.dumps(checkpoint.register_stats).encode()
+
+    with open(checkpoint_file, 'wb') as ofp:
+        ofp.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION,
+                                         checkpoint.program_counter,
+                                         checkpoint.instruction_count,
+                                         checkpoint.clock_cycles))
+        ofp.write(CHECKPOINT_COUNTS.pack(*checkpoint.op_counts))
+        ofp.write(CHECKPOINT_REGISTERS.pack(*checkpoint.registers))
+        ofp.write(CHECKPOINT_LENGTH.pack(len(register_stats)))
+        ofp.write(register_stats)
+        ofp.write(zlib.compress(memory.tobytes()))
+
+
+def read_checkpoint(checkpoint_file):
+    """Reads a checkpoint from a file
+
+       Keyword arguments:
+       checkpoint_file -- path of the checkpoint
+
+       Return: Checkpoint
+    """
+    with open(checkpoint_file, 'rb') as ifp:
+        data = ifp.read()
+
+    (magic, version, program_counter, instruction_count,
+     clock_cycles) = CHECKPOINT_HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError('{} is not an xsim checkpoint'.format(
+            checkpoint_file))
+    offset = CHECKPOINT_HEADER.size
+
+    op_counts = CHECKPOINT_COUNTS.unpack_from(data, offset)
+    offset += CHECKPOINT_COUNTS.size
+    registers = CHECKPOINT_REGISTERS.unpack_from(data, offset)
+    offset += CHECKPOINT_REGISTERS.size
+    (stats_length,) = CHECKPOINT_LENGTH.unpack_from(data, offset)
+    offset += CHECKPOINT_LENGTH.size
+    register_stats = json.loads(data[offset:offset + stats_length].decode())
+    offset += stats_length
+
+    memory = array('H', zlib.decompress(data[offset:]))
+    if sys.byteorder == 'big':
+        memory.byteswap()
+    if len(memory) != xsim_memory.MEMORY_WORDS:
+        raise ValueError('{} holds {} words of memory'.format(
+            checkpoint_file, len(memory)))
+
+    return Checkpoint(program_counter, instruction_count, clock_cycles,
+                      op_counts, registers, register_stats, memory)
@@ -0,0 +1,1074 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_int
+Course:  CS2410
+
+Integer-native execution engine for the X isa.  Registers are
+kept as plain ints masked to 16 bits instead of '0'/'1' strings
+so that no bitstring objects are created while simulating.  The
+statistics produced are identical to the bitstring engine in
+xsim.py for every program that engine can run to completion.
+"""
+
+import sys
+
+import isa
+import packed_trace
+import xsim_checkpoint
+import xsim_memory
+import xsim_trace
+import xsim_watchdog
+
+# DEFINES
+WORD_SIZE = 1
+WORD_MASK = 0xFFFF
+SIGN_BIT = 0x8000
+WORD_MODULUS = 0x10000
+REGISTER_COUNT = 8
+
+# Reasons execute returns before its limit
+END_HALT = 'halt'
+END_STOP = 'stop'
+END_UNRECOGNIZED = 'unrecognized op_code'
+
+def parse_input(input_file):
+    """Loads the 16 bit instruction words of an ASCII hex
+       or packed input file
+
+       Keyword arguments:
+       input_file -- file containing instructions in ASCII hex
+                     or as a packed trace
+
+       Return: Sequence of int
+    """
+    return packed_trace.load_trace(input_file)
+
+
+def init_register_file():
+    """Initializes the integer register file, the
+       register values reported in the statistics and the
+       data memory.
+
+       Keyword arguments:
+       None
+
+       Return: None
+    """
+    MACHINE.reset()
+
+
+def to_signed(value):
+    """Interprets a 16 bit word as a two's complement integer
+
+       Keyword arguments:
+       value -- 16 bit unsigned word
+
+       Return: int
+    """
+    return value - WORD_MODULUS if value & SIGN_BIT else value
+
+
+def bounded_exp(base, exponent):
+    """Raises base to exponent keeping only the lower
+       16 bits of the result.  Modular pow is used so the
+       intermediate values never grow past the word size.
+       Negative exponents truncate toward zero.
+
+    Keyword arguments:
+    base -- signed base
+    exponent -- signed exponent
+
+    Return: int
+    """
+    if exponent >= 0:
+        return pow(base, exponent, WORD_MODULUS)
+    if base == 0:
+        raise ZeroDivisionError('0 cannot be raised to a negative power')
+    if base == 1 or (base == -1 and exponent % 2 == 0):
+        return 1
+    if base == -1:
+        return WORD_MASK
+    return 0
+
+
+def build_handlers(registers, register_stats, data_memory):
+    """Builds the instruction handlers of one machine.  The
+       handlers are closures over the lists of that machine
+       so any number of machines can run side by side.
+
+       Keyword arguments:
+       registers -- list of the 16 bit register words
+       register_stats -- list of the register values reported
+                         in the statistics
+       data_memory -- data memory array
+
+       Return: Dictionary of op name to handler
+    """
+    def add_instruction(rd, rs, rt):
+        """ADD instruction with op_code '00000'
+
+        Keyword arguments:
+        rd, rs, rt -- register numbers
+
+        Return: int
+        """
+        word = (registers[rs] + registers[rt]) & WORD_MASK
+        registers[rd] = word
+        register_stats[rd] = word - WORD_MODULUS if word & SIGN_BIT else word
+        return word
+
+    def sub_instruction(rd, rs, rt):
+        """SUB instruction with op_code '00001'
+
+        Keyword arguments:
+        rd, rs, rt -- register numbers
+
+        Return: int
+        """
+        word = (registers[rs] - registers[rt]) & WORD_MASK
+        registers[rd] = word
+        register_stats[rd] = word - WORD_MODULUS if word & SIGN_BIT else word
+        return word
+
+    def and_instruction(rd, rs, rt):
+        """AND instruction with op_code '00010'.  The statistics
+           record the result as a binary string like the
+           bitstring engine does.
+
+        Keyword arguments:
+        rd, rs, rt -- register numbers
+
+        Return: int
+        """
+        word = registers[rs] & registers[rt]
+        registers[rd] = word
+        register_stats[rd] = format(word, '016b')
+        return word
+
+    def nor_instruction(rd, rs, rt):
+        """NOR instruction with op_code '00011'.  The statistics
+           record the result as a binary string like the
+           bitstring engine does.
+
+        Keyword arguments:
+        rd, rs, rt -- register numbers
+
+        Return: int
+        """
+        word = ~(registers[rs] | registers[rt]) & WORD_MASK
+        registers[rd] = word
+        register_stats[rd] = format(word, '016b')
+        return word
+
+    def div_instruction(rd, rs, rt):
+        """DIV instruction with op_code '00100'.  The quotient
+           is truncated toward zero.
+
+        Keyword arguments:
+        rd, rs, rt -- register numbers
+
+        Return: int
+        """
+        dividend = to_signed(registers[rs])
+        divisor = to_signed(registers[rt])
+        quotient = abs(dividend) // abs(divisor)
+        if (dividend < 0) != (divisor < 0):
+            quotient = -quotient
+        word = quotient & WORD_MASK
+        registers[rd] = word
+        register_stats[rd] = to_signed(word)
+        return word
+
+    def mul_instruction(rd, rs, rt):
+        """MUL instruction with op_code '00101'.  Takes only
+           lower 16 bits of result, the statistics record the
+           full product like the bitstring engine does.
+
+        Keyword arguments:
+        rd, rs, rt -- register numbers
+
+        Return: int
+        """
+        product = to_signed(registers[rs]) * to_signed(registers[rt])
+        word = product & WORD_MASK
+        registers[rd] = word
+        register_stats[rd] = product
+        return word
+
+    def mod_instruction(rd, rs, rt):
+        """MOD instruction with op_code '00110'.
+
+        Keyword arguments:
+        rd, rs, rt -- register numbers
+
+        Return: int
+        """
+        word = ((to_signed(registers[rs]) % to_signed(registers[rt])) &
+                WORD_MASK)
+        registers[rd] = word
+        register_stats[rd] = to_signed(word)
+        return word
+
+    def exp_instruction(rd, rs, rt):
+        """EXP instruction with op_code '00111'.
+
+        Keyword arguments:
+        rd, rs, rt -- register numbers
+
+        Return: int
+        """
+        word = bounded_exp(to_signed(registers[rs]), to_signed(registers[rt]))
+        registers[rd] = word
+        register_stats[rd] = to_signed(word)
+        return word
+
+    def load_word(rd, rs):
+        """LW instruction with op_code 01000.  Source is
+           word_alligned, unwritten words read as 0
+
+        Keyword arguments:
+        rd, rs -- register numbers
+
+        Return: int
+        """
+        word = data_memory[registers[rs]]
+        registers[rd] = word
+        register_stats[rd] = word * 2
+        return word
+
+    def store_word(rs, rt):
+        """SW instruction with op_code 01001.  Source is
+           word_alligned
+
+        Keyword arguments:
+        rs, rt -- register numbers
+
+        Return: int
+        """
+        data_memory[registers[rs]] = registers[rt]
+        return registers[rt]
+
+    def liz(rd, imm8):
+        """LIZ instruction with op_code 10000.
+
+        Keyword arguments:
+        rd -- register number
+        imm8 -- 8 bit immediate
+
+        Return: int
+        """
+        registers[rd] = imm8
+        register_stats[rd] = imm8
+        return imm8
+
+    def lis(rd, imm8):
+        """LIS instruction with op_code 10001.  The immediate
+           is sign extended.
+
+        Keyword arguments:
+        rd -- register number
+        imm8 -- 8 bit immediate
+
+        Return: int
+        """
+        word = imm8 | 0xFF00 if imm8 & 0x80 else imm8
+        registers[rd] = word
+        register_stats[rd] = to_signed(word)
+        return word
+
+    def lui(rd, imm8):
+        """LUI instruction with op_code 10010
+
+        Keyword arguments:
+        rd -- register number
+        imm8 -- 8 bit immediate
+
+        Return: int
+        """
+        word = (imm8 << 8) | (registers[rd] & 0xFF)
+        registers[rd] = word
+        register_stats[rd] = to_signed(word)
+        return word
+
+    def branch_positive(rd, imm8, program_counter):
+        """BP instruction with op_code 10100
+
+        Keyword arguments:
+        rd -- register number
+        imm8 -- 8 bit immediate
+        program_counter -- the current value of PC
+
+        Return: int
+        """
+        if to_signed(registers[rd]) > 0:
+            return imm8 // WORD_SIZE
+        return program_counter + 1
+
+    def branch_negative(rd, imm8, program_counter):
+        """BN instruction with op_code 10101
+
+        Keyword arguments:
+        rd -- register number
+        imm8 -- 8 bit immediate
+        program_counter -- the current value of PC
+
+        Return: int
+        """
+        if registers[rd] & SIGN_BIT:
+            return imm8 // WORD_SIZE
+        return program_counter + 1
+
+    def branch_nzero(rd, imm8, program_counter):
+        """BX instruction with op_code 10110
+
+        Keyword arguments:
+        rd -- register number
+        imm8 -- 8 bit immediate
+        program_counter -- the current value of PC
+
+        Return: int
+        """
+        if registers[rd] != 0:
+            return imm8 // WORD_SIZE
+        return program_counter + 1
+
+    def branch_zero(rd, imm8, program_counter):
+        """BZ instruction with op_code 10111
+
+        Keyword arguments:
+        rd -- register number
+        imm8 -- 8 bit immediate
+        program_counter -- the current value of PC
+
+        Return: int
+        """
+        if registers[rd] == 0:
+            return imm8 // WORD_SIZE
+        return program_counter + 1
+
+    def jump_register(rs, program_counter):
+        """JR instruction with op_code 01100
+
+        Keyword arguments:
+        rs -- register number
+        program_counter -- the current value of PC
+
+        Return: int
+        """
+        return to_signed(registers[rs])
+
+    def jump_and_link_register(rd, rs, program_counter):
+        """JALR instruction with op_code 10011.  The link
+           register is written before the target is read.
+
+        Keyword arguments:
+        rd, rs -- register numbers
+        program_counter -- the current value of PC
+
+        Return: int
+        """
+        link_value = program_counter + 1
+        registers[rd] = link_value & WORD_MASK
+        register_stats[rd] = link_value
+        return int(to_signed(registers[rs]) / 2)
+
+    def jump_immediate(imm11, program_counter):
+        """J instruction with op_code 11000.  The upper 5 bits
+           of the byte address of PC are kept.
+
+        Keyword arguments:
+        imm11 -- 11 bit immediate
+        program_counter -- the current value of PC
+
+        Return: int
+        """
+        word = ((program_counter * 2) & 0xF800) | imm11
+        return to_signed(word) // WORD_SIZE
+
+    def put_register(rs):
+        """PUT instruction with op_code 01110
+
+        Keyword arguments:
+        rs -- register number
+
+        Return: int
+        """
+        return registers[rs]
+
+    return {'add': add_instruction,
+            'sub': sub_instruction,
+            'and': and_instruction,
+            'nor': nor_instruction,
+            'div': div_instruction,
+            'mul': mul_instruction,
+            'mod': mod_instruction,
+            'exp': exp_instruction,
+            'lw': load_word,
+            'sw': store_word,
+            'liz': liz,
+            'lis': lis,
+            'lui': lui,
+            'bp': branch_positive,
+            'bn': branch_negative,
+            'bx': branch_nzero,
+            'bz': branch_zero,
+            'jr': jump_register,
+            'jalr': jump_and_link_register,
+            'j': jump_immediate,
+            'put': put_register}
+
+
+class Machine:
+    """Machine Class holding the registers, the register
+    values reported in the statistics and the data memory of
+    one simulated X machine with the handlers bound to them
+    """
+
+    def __init__(self):
+        self.registers = [0] * REGISTER_COUNT
+        self.register_stats = [0] * REGISTER_COUNT
+        self.data_memory = xsim_memory.create_memory()
+        self.handlers = build_handlers(self.registers, self.register_stats,
+                                       self.data_memory)
+
+    def reset(self):
+        """Clears the registers, the register statistics
+        and the data memory
+
+        Keyword arguments:
+        None
+
+        Returns: None
+        """
+        for register in range(REGISTER_COUNT):
+            self.registers[register] = 0
+            self.register_stats[register] = 0
+        xsim_memory.clear_memory(self.data_memory)
+
+    def load_address(self, rd, rs):
+        """Gets the word address an LW instruction loads
+
+        Keyword arguments:
+        rd, rs -- register numbers
+
+        Returns: int
+        """
+        return self.registers[rs]
+
+    def store_address(self, rs, rt):
+        """Gets the word address an SW instruction stores to
+
+        Keyword arguments:
+        rs, rt -- register numbers
+
+        Returns: int
+        """
+        return self.registers[rs]
+
+    def read_registers(self):
+        """Reads the register words for a full state trace
+
+        Keyword arguments:
+        None
+
+        Returns: List
+        """
+        return list(self.registers)
+
+    def capture_checkpoint(self, program_counter, instruction_count,
+                           clock_cycles, op_counts):
+        """Captures the architectural state between two
+        instructions
+
+        Keyword arguments:
+        program_counter -- PC of the next instruction
+        instruction_count -- number of instructions executed
+        clock_cycles -- number of cycles simulated
+        op_counts -- list of counts indexed by stat slot
+
+        Returns: Checkpoint
+        """
+        return xsim_checkpoint.Checkpoint(program_counter, instruction_count,
+                                          clock_cycles, op_counts,
+                                          self.registers, self.register_stats,
+                                          self.data_memory)
+
+    def restore_checkpoint(self, checkpoint):
+        """Restores the registers and data memory of a
+        checkpoint
+
+        Keyword arguments:
+        checkpoint -- Checkpoint to resume from
+
+        Returns: None
+        """
+        self.registers[:] = checkpoint.registers
+        self.register_stats[:] = checkpoint.register_stats
+        self.data_memory[:] = checkpoint.memory
+
+    def build_statistics(self, op_counts, instruction_count, clock_cycles):
+        """Builds the statistics dictionary in the same layout
+        as the bitstring engine.
+
+        Keyword arguments:
+        op_counts -- list of counts indexed by stat slot
+        instruction_count -- number of instructions executed
+        clock_cycles -- number of cycles simulated
+
+        Returns: Dictionary
+        """
+        registers = {}
+        for register in range(REGISTER_COUNT):
+            registers['r{}'.format(register)] = self.register_stats[register]
+
+        stats = isa.counts_to_stats(op_counts)
+        stats['instructions'] = instruction_count
+        stats['cycles'] = clock_cycles
+
+        return {'registers': [registers], 'stats': [stats]}
+
+
+# GLOBALS
+# The machine run by simulate and the module level handlers
+MACHINE = Machine()
+REGISTERS = MACHINE.registers
+REGISTER_STATS = MACHINE.register_stats
+DATA_MEMORY = MACHINE.data_memory
+
+# HANDLERS
+HANDLERS = MACHINE.handlers
+add_instruction = HANDLERS['add']
+sub_instruction = HANDLERS['sub']
+and_instruction = HANDLERS['and']
+nor_instruction = HANDLERS['nor']
+div_instruction = HANDLERS['div']
+mul_instruction = HANDLERS['mul']
+mod_instruction = HANDLERS['mod']
+exp_instruction = HANDLERS['exp']
+load_word = HANDLERS['lw']
+store_word = HANDLERS['sw']
+liz = HANDLERS['liz']
+lis = HANDLERS['lis']
+lui = HANDLERS['lui']
+branch_positive = HANDLERS['bp']
+branch_negative = HANDLERS['bn']
+branch_nzero = HANDLERS['bx']
+branch_zero = HANDLERS['bz']
+jump_register = HANDLERS['jr']
+jump_and_link_register = HANDLERS['jalr']
+jump_immediate = HANDLERS['j']
+put_register = HANDLERS['put']
+
+
+def decode_instruction(word, handlers=HANDLERS):
+    """Decodes a 16 bit instruction word into a record
+       of its fields so the fields are only extracted once.
+
+       Keyword arguments:
+       word -- 16 bit instruction word
+       handlers -- handlers of the machine running the record
+
+       Return: Tuple(op_id, rd, rs, rt, imm8, imm11, handler, operands)
+               handler is None for HALT and unrecognized op_codes
+    """
+    op_id = word >> 11
+    fields = {'rd': (word >> 8) & 7,
+              'rs': (word >> 5) & 7,
+              'rt': (word >> 2) & 7,
+              'imm8': word & 0xFF,
+              'imm11': word & 0x7FF}
+
+    if op_id in isa.OPCODE_MAP:
+        (name, operand_format, _) = isa.OPCODE_MAP[op_id]
+        handler = handlers.get(name)
+        operands = tuple(fields[name] for name in operand_format.split())
+    else:
+        handler = None
+        operands = ()
+
+    return (op_id, fields['rd'], fields['rs'], fields['rt'],
+            fields['imm8'], fields['imm11'], handler, operands)
+
+
+def decode_program(instruction_memory, handlers=HANDLERS):
+    """Decodes every instruction word of a program once
+       at load time.
+
+       Keyword arguments:
+       instruction_memory -- list of 16 bit instruction words
+       handlers -- handlers of the machine running the program
+
+       Return: List
+    """
+    decoded = {}
+    program = []
+    for word in instruction_memory:
+        if word not in decoded:
+            decoded[word] = decode_instruction(word, handlers)
+        program.append(decoded[word])
+
+    return program
+
+
+def build_statistics(op_counts, instruction_count, clock_cycles):
+    """Builds the statistics dictionary in the same layout
+       as the bitstring engine.
+
+       Keyword arguments:
+       op_counts -- list of counts indexed by stat slot
+       instruction_count -- number of instructions executed
+       clock_cycles -- number of cycles simulated
+
+       Return: Dictionary
+    """
+    return MACHINE.build_statistics(op_counts, instruction_count,
+                                    clock_cycles)
+
+
+def read_registers():
+    """Reads the register words for a full state trace
+
+       Keyword arguments:
+       None
+
+       Return: List
+    """
+    return MACHINE.read_registers()
+
+
+def capture_checkpoint(program_counter, instruction_count, clock_cycles,
+                       op_counts):
+    """Captures the architectural state between two
+       instructions
+
+       Keyword arguments:
+       program_counter -- PC of the next instruction
+       instruction_count -- number of instructions executed
+       clock_cycles -- number of cycles simulated
+       op_counts -- list of counts indexed by stat slot
+
+       Return: Checkpoint
+    """
+    return MACHINE.capture_checkpoint(program_counter, instruction_count,
+                                      clock_cycles, op_counts)
+
+
+def restore_checkpoint(checkpoint):
+    """Restores the registers and data memory of a checkpoint
+
+       Keyword arguments:
+       checkpoint -- Checkpoint to resume from
+
+       Return: None
+    """
+    MACHINE.restore_checkpoint(checkpoint)
+
+
+def place_stop(program, stop_pc):
+    """Replaces the record at stop_pc with a STOP_OPCODE
+       record so a run stops there without checking the PC
+       of every instruction
+
+       Keyword arguments:
+       program -- list of decoded instruction records
+       stop_pc -- PC to stop at
+
+       Return: None
+    """
+    if 0 <= stop_pc < len(program):
+        program[stop_pc] = (isa.STOP_OPCODE, 0, 0, 0, 0, 0, None, ())
+
+
+def step(program, dispatch_table, program_counter, op_counts, trace=None):
+    """Executes the single instruction at program_counter
+
+       Keyword arguments:
+       program -- list of decoded instruction records
+       dispatch_table -- op_code indexed dispatch table
+       program_counter -- PC of the instruction
+       op_counts -- list of counts indexed by stat slot
+       trace -- TraceSink recording retired instructions or None
+
+       Return: Tuple(next PC or None when the program stops,
+                     cycles taken)
+    """
+    record = program[program_counter]
+    entry = dispatch_table[record[0]]
+
+    if entry is None:
+        print('ERROR: UNRECOGNZIED OPCODE {}'.format(
+            format(record[0], '05b')), file=sys.stderr)
+        return (None, 0)
+
+    (handler, latency, stat_slot, control_flow, _) = entry
+    op_counts[stat_slot] += 1
+
+    if handler is None:
+        if trace is not None:
+            trace.record(program_counter, record[0], latency)
+        return (None, latency)
+    elif control_flow:
+        return (handler(*record[7], program_counter), latency)
+
+    handler(*record[7])
+    return (program_counter + 1, latency)
+
+
+def execute(program, dispatch_table, program_counter, op_counts, limit=-1,
+            trace=None):
+    """Executes instructions from program_counter until the
+       program ends or limit instructions have executed
+
+       Keyword arguments:
+       program -- list of decoded instruction records
+       dispatch_table -- op_code indexed dispatch table
+       program_counter -- PC of the first instruction
+       op_counts -- list of counts indexed by stat slot
+       limit -- number of instructions to execute, -1 for no limit
+       trace -- TraceSink recording retired instructions or None
+
+       Return: Tuple(PC of the next or last instruction,
+                     instructions executed, cycles taken,
+                     END_HALT, END_STOP, END_UNRECOGNIZED or
+                     ABORT_PC when the program ended, otherwise
+                     None)
+    """
+    instruction_count = 0
+    clock_cycles = 0
+    program_size = len(program)
+
+    while instruction_count != limit:
+        if not 0 <= program_counter < program_size:
+            return (program_counter, instruction_count, clock_cycles,
+                    xsim_watchdog.ABORT_PC)
+        record = program[program_counter]
+        entry = dispatch_table[record[0]]
+
+        if entry is None:
+            if record[0] == isa.STOP_OPCODE:
+                return (program_counter, instruction_count,
+                        clock_cycles, END_STOP)
+            print('ERROR: UNRECOGNZIED OPCODE {}'.format(
+                format(record[0], '05b')), file=sys.stderr)
+            return (program_counter, instruction_count + 1,
+                    clock_cycles, END_UNRECOGNIZED)
+
+        (handler, latency, stat_slot, control_flow, _) = entry
+        instruction_count += 1
+        clock_cycles += latency
+        op_counts[stat_slot] += 1
+
+        if handler is None:
+            if trace is not None:
+                trace.record(program_counter, record[0], latency)
+            return (program_counter, instruction_count, clock_cycles,
+                    END_HALT)
+        elif control_flow:
+            program_counter = handler(*record[7], program_counter)
+        else:
+            handler(*record[7])
+            program_counter += 1
+
+    return (program_counter, instruction_count, clock_cycles, None)
+
+
+def transfer_targets(program):
+    """Finds the PC every branch and J of a program transfers
+       to.  Their targets are fixed, so the entries of a target
+       follow from how often the instruction was taken.
+
+       Keyword arguments:
+       program -- list of decoded instruction records
+
+       Return: List of Tuple(pc, target)
+    """
+    targets = []
+    for program_counter, record in enumerate(program):
+        name = isa.OPCODE_MAP.get(record[0], ('', '', False))[0]
+        if name in ('bp', 'bn', 'bx', 'bz'):
+            targets.append((program_counter, record[4] // WORD_SIZE))
+        elif name == 'j':
+            word = ((program_counter * 2) & 0xF800) | record[5]
+            targets.append((program_counter, to_signed(word) // WORD_SIZE))
+
+    return targets
+
+
+def profiled_jumps(dispatch_table, entries):
+    """Wraps the JR and JALR handlers of a dispatch table so
+       that they count the entries of the PC they jump to, the
+       only transfers without a fixed target.  Other entries
+       are left as they are.
+
+       Keyword arguments:
+       dispatch_table -- op_code indexed dispatch table
+       entries -- list of the entries of every PC
+
+       Return: List
+    """
+    profiled_table = list(dispatch_table)
+
+    for op_code, (name, _, _) in isa.OPCODE_MAP.items():
+        entry = dispatch_table[op_code]
+        if name not in ('jr', 'jalr') or entry is None:
+            continue
+
+        (handler, latency, stat_slot, control_flow, operand_count) = entry
+        profiled_table[op_code] = (count_entries(handler, operand_count,
+                                                 entries),
+                                   latency, stat_slot, control_flow,
+                                   operand_count)
+
+    return profiled_table
+
+
+def count_entries(handler, operand_count, entries):
+    """Builds a jump handler that counts the entries of the
+       PC it jumps to
+
+       Keyword arguments:
+       handler -- jump handler returning the next PC
+       operand_count -- number of operands before the PC
+       entries -- list of the entries of every PC
+
+       Return: function
+    """
+    length = len(entries)
+
+    if operand_count == 1:
+        def counted(operand, program_counter):
+            next_pc = handler(operand, program_counter)
+            if next_pc != program_counter + 1 and 0 <= next_pc < length:
+                entries[next_pc] += 1
+            return next_pc
+    else:
+        def counted(first, second, program_counter):
+            next_pc = handler(first, second, program_counter)
+            if next_pc != program_counter + 1 and 0 <= next_pc < length:
+                entries[next_pc] += 1
+            return next_pc
+
+    return counted
+
+
+def execute_profiled(program, dispatch_table, program_counter, op_counts,
+                     profile, limit=-1, trace=None):
+    """Executes instructions as execute does and counts how
+       often every control flow instruction is taken in a
+       profile, one counter per transfer.  The entries of the
+       PCs jumped to are counted by the handlers of JR and JALR
+       (profiled_jumps) and added from the fixed targets of the
+       others when the run ends (transfer_targets).
+
+       Keyword arguments:
+       program -- list of decoded instruction records
+       dispatch_table -- op_code indexed dispatch table
+       program_counter -- PC of the first instruction
+       op_counts -- list of counts indexed by stat slot
+       profile -- Profile counting the control flow of the run
+       limit -- number of instructions to execute, -1 for no limit
+       trace -- TraceSink recording retired instructions or None
+
+       Return: Tuple as for execute
+    """
+    instruction_count = 0
+    clock_cycles = 0
+    program_size = len(program)
+    taken = profile.taken
+
+    while instruction_count != limit:
+        if not 0 <= program_counter < program_size:
+            return (program_counter, instruction_count, clock_cycles,
+                    xsim_watchdog.ABORT_PC)
+        record = program[program_counter]
+        entry = dispatch_table[record[0]]
+
+        if entry is None:
+            if record[0] == isa.STOP_OPCODE:
+                return (program_counter, instruction_count,
+                        clock_cycles, END_STOP)
+            print('ERROR: UNRECOGNZIED OPCODE {}'.format(
+                format(record[0], '05b')), file=sys.stderr)
+            return (program_counter, instruction_count + 1,
+                    clock_cycles, END_UNRECOGNIZED)
+
+        (handler, latency, stat_slot, control_flow, _) = entry
+        instruction_count += 1
+        clock_cycles += latency
+        op_counts[stat_slot] += 1
+
+        if handler is None:
+            if trace is not None:
+                trace.record(program_counter, record[0], latency)
+            return (program_counter, instruction_count, clock_cycles,
+                    END_HALT)
+        elif control_flow:
+            next_pc = handler(*record[7], program_counter)
+            if next_pc != program_counter + 1:
+                taken[program_counter] += 1
+            program_counter = next_pc
+        else:
+            handler(*record[7])
+            program_counter += 1
+
+    return (program_counter, instruction_count, clock_cycles, None)
+
+
+def simulate(latency_dict, instruction_memory, trace=None,
+             memory_image=None, resume=None, stop_instruction=None,
+             stop_pc=None, checkpoint_file=None, watchdog=None,
+             profile=None, cache=None, branches=None, pipeline=None,
+             bbv=None):
+    """Run the simulation of the X isa on integer
+       instruction words and maintain stats.  The run stops
+       before the instruction at stop_pc or once
+       stop_instruction instructions have executed and the
+       state is then written to checkpoint_file.  A run
+       aborted by the watchdog or by a PC outside instruction
+       memory returns the statistics so far with an abort
+       record.
+
+       Keyword arguments:
+       latency_dict -- dictionary of opcode latencies
+       instruction_memory -- list of 16 bit instruction words
+       trace -- TraceSink recording retired instructions or None
+       memory_image -- binary image preloaded into data memory or None
+       resume -- Checkpoint to resume from or None
+       stop_instruction -- instruction count to stop at or None
+       stop_pc -- PC to stop at or None
+       checkpoint_file -- file receiving the state when stopped or None
+       watchdog -- Watchdog holding the budgets of the run or None
+       profile -- Profile counting the control flow of the run or None
+       cache -- CacheHierarchy timing the loads and stores or None
+       branches -- BranchPredictors predicting the branches or None
+       pipeline -- Pipeline timing the run in order or None
+       bbv -- BasicBlockVectors collecting interval vectors or None
+
+       Return: Dictionary
+    """
+    init_register_file()
+    if memory_image is not None:
+        xsim_memory.load_image(DATA_MEMORY, memory_image)
+    program = decode_program(instruction_memory)
+    dispatch_table = isa.build_dispatch_table(HANDLERS, latency_dict)
+    op_counts = [0] * len(isa.STAT_NAMES)
+    program_counter = 0
+    clock_cycles = 0
+    instruction_count = 0
+
+    if resume is not None:
+        restore_checkpoint(resume)
+        program_counter = resume.program_counter
+        clock_cycles = resume.clock_cycles
+        instruction_count = resume.instruction_count
+        op_counts[:] = resume.op_counts
+        if trace is not None:
+            trace.cycles = clock_cycles
+
+    # stall cycles the timing models added to the latencies
+    stalls = [0]
+    max_stall = 0
+    for model in (cache, branches):
+        if model is not None:
+            model.start(stalls)
+            max_stall += model.max_stall
+
+    if profile is not None:
+        profile.start([record[0] for record in program], dispatch_table,
+                      program_counter)
+        dispatch_table = profiled_jumps(dispatch_table, profile.entries)
+    # the penalty of a branch is charged before the basic block
+    # vectors see it transfer
+    if branches is not None:
+        dispatch_table = branches.predicted_dispatch_table(dispatch_table)
+    if bbv is not None:
+        bbv.start([record[0] for record in program], dispatch_table,
+                  program_counter, stalls)
+        dispatch_table = bbv.bbv_dispatch_table(dispatch_table)
+    if cache is not None:
+        dispatch_table = cache.cached_dispatch_table(dispatch_table,
+                                                     MACHINE.load_address,
+                                                     MACHINE.store_address)
+    if pipeline is not None:
+        pipeline.start(instruction_memory, dispatch_table)
+        dispatch_table = pipeline.pipelined_dispatch_table(dispatch_table)
+    if trace is not None:
+        trace.register_reader = read_registers
+        trace.stalls = stalls
+        dispatch_table = xsim_trace.traced_dispatch_table(dispatch_table,
+                                                          trace)
+    if stop_instruction is not None:
+        stop_instruction = max(stop_instruction, instruction_count)
+    if stop_pc is not None:
+        place_stop(program, stop_pc)
+    if watchdog is not None:
+        watchdog.start(xsim_watchdog.max_latency(dispatch_table, max_stall),
+                       instruction_count)
+    end = None
+    abort = None
+
+    while end is None:
+        limit = xsim_watchdog.run_limit(stop_instruction, watchdog,
+                                        instruction_count,
+                                        clock_cycles + stalls[0])
+        if limit is not None:
+            limit -= instruction_count
+        else:
+            limit = -1
+
+        if profile is not None:
+            (program_counter, executed, cycles, end) = execute_profiled(
+                program, dispatch_table, program_counter, op_counts,
+                profile, limit, trace)
+        else:
+            (program_counter, executed, cycles, end) = execute(
+                program, dispatch_table, program_counter, op_counts, limit,
+                trace)
+        instruction_count += executed
+        clock_cycles += cycles
+
+        if end is None:
+            if instruction_count == stop_instruction:
+                end = END_STOP
+                break
+            abort = watchdog.check(program_counter, instruction_count,
+                                   clock_cycles + stalls[0])
+            if abort is not None:
+                break
+        elif end == xsim_watchdog.ABORT_PC:
+            abort = end
+    stopped = end == END_STOP
+    clock_cycles += stalls[0]
+    if profile is not None:
+        for (source, target) in transfer_targets(program):
+            if 0 <= target < len(program):
+                profile.entries[target] += profile.taken[source]
+
+    if abort != xsim_watchdog.ABORT_PC:
+        if profile is not None:
+            profile.finish(program_counter, not stopped and abort is None)
+        if pipeline is not None:
+            pipeline.finish(program_counter, not stopped and abort is None)
+        if bbv is not None:
+            bbv.finish(program_counter, not stopped and abort is None)
+    if profile is not None:
+        for model in (cache, branches):
+            if model is not None:
+                profile.add_stalls(model.pc_stalls)
+
+    if stopped and checkpoint_file is not None:
+        xsim_checkpoint.write_checkpoint(checkpoint_file, capture_checkpoint(
+            program_counter, instruction_count, clock_cycles, op_counts))
+
+    statistics = build_statistics(op_counts, instruction_count, clock_cycles)
+    if cache is not None:
+        cache.add_statistics(statistics)
+    if branches is not None:
+        branches.add_statistics(statistics)
+    if pipeline is not None:
+        pipeline.add_statistics(statistics)
+    if abort is not None:
+        statistics['abort'] = xsim_watchdog.abort_record(abort,
+                                                         program_counter)
+    return statistics
@@ -0,0 +1,580 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_jit
+Course:  CS2410
+
+Basic block translation cache for the integer engine.  Every
+basic block (a run of instructions ending in a branch, jump or
+HALT) is compiled once into a generated Python function that
+executes the whole block.  Compiled blocks are cached by their
+entry PC and opcode counts and cycles are added up in bulk from
+the number of times each block ran.
+"""
+
+import re
+import sys
+
+import isa
+import xsim_checkpoint
+import xsim_int
+import xsim_memory
+import xsim_trace
+import xsim_watchdog
+from xsim_int import (REGISTERS, REGISTER_STATS, WORD_SIZE, bounded_exp,
+                      to_signed)
+
+# DEFINES
+MAX_BLOCK_LENGTH = 256
+
+# Source of the expression reading register n as a signed value
+SIGNED = '((r{0} ^ 0x8000) - 0x8000)'
+
+# Registers used and assigned by a line of generated source
+REGISTER_USE = re.compile(r'\br([0-7])\b')
+REGISTER_ASSIGN = re.compile(r'^r([0-7]) = ')
+
+
+def divide(dividend, divisor):
+    """Signed division truncated toward zero, returns the
+       16 bit word of the quotient
+
+       Keyword arguments:
+       dividend -- signed dividend
+       divisor -- signed divisor
+
+       Return: int
+    """
+    quotient = abs(dividend) // abs(divisor)
+    if (dividend < 0) != (divisor < 0):
+        quotient = -quotient
+    return quotient & 0xFFFF
+
+
+class BasicBlock:
+    """A compiled basic block and the totals it adds to the
+    statistics every time it runs
+    """
+
+    def __init__(self, block_id, function, op_counts, cycles, length,
+                 exit_pc):
+        self.block_id = block_id
+        self.function = function
+        self.op_counts = op_counts
+        self.cycles = cycles
+        self.length = length
+        self.exit_pc = exit_pc
+
+
+def translate_instruction(record, lines, stat_writes):
+    """Appends the source for a non control flow instruction.
+       Registers are held in the locals r0 to r7.
+
+       Keyword arguments:
+       record -- decoded instruction record
+       lines -- list of source lines of the block
+       stat_writes -- dictionary of register to the source of
+                      its statistics value, last write wins
+
+       Return: None
+    """
+    (op_id, rd, rs, rt, imm8, _, _, _) = record
+    name = isa.OPCODE_MAP[op_id][0]
+    signed_rs = SIGNED.format(rs)
+    signed_rt = SIGNED.format(rt)
+    signed_rd = SIGNED.format(rd)
+
+    if name == 'add':
+        lines.append('r{} = (r{} + r{}) & 0xFFFF'.format(rd, rs, rt))
+        stat_writes[rd] = signed_rd
+    elif name == 'sub':
+        lines.append('r{} = (r{} - r{}) & 0xFFFF'.format(rd, rs, rt))
+        stat_writes[rd] = signed_rd
+    elif name == 'and':
+        lines.append('r{} = r{} & r{}'.format(rd, rs, rt))
+        stat_writes[rd] = "format(r{}, '016b')".format(rd)
+    elif name == 'nor':
+        lines.append('r{} = ~(r{} | r{}) & 0xFFFF'.format(rd, rs, rt))
+        stat_writes[rd] = "format(r{}, '016b')".format(rd)
+    elif name == 'div':
+        lines.append('r{} = divide({}, {})'.format(rd, signed_rs, signed_rt))
+        stat_writes[rd] = signed_rd
+    elif name == 'mul':
+        product = 'p{}'.format(len(lines))
+        lines.append('{} = {} * {}'.format(product, signed_rs, signed_rt))
+        lines.append('r{} = {} & 0xFFFF'.format(rd, product))
+        stat_writes[rd] = product
+    elif name == 'mod':
+        lines.append('r{} = ({} % {}) & 0xFFFF'.format(rd, signed_rs,
+                                                       signed_rt))
+        stat_writes[rd] = signed_rd
+    elif name == 'exp':
+        lines.append('r{} = bounded_exp({}, {})'.format(rd, signed_rs,
+                                                        signed_rt))
+        stat_writes[rd] = signed_rd
+    elif name == 'lw':
+        lines.append('r{} = M[r{}]'.format(rd, rs))
+        stat_writes[rd] = 'r{} * 2'.format(rd)
+    elif name == 'sw':
+        lines.append('M[r{}] = r{}'.format(rs, rt))
+    elif name == 'liz':
+        lines.append('r{} = {}'.format(rd, imm8))
+        stat_writes[rd] = str(imm8)
+    elif name == 'lis':
+        word = imm8 | 0xFF00 if imm8 & 0x80 else imm8
+        lines.append('r{} = {}'.format(rd, word))
+        stat_writes[rd] = str(to_signed(word))
+    elif name == 'lui':
+        lines.append('r{} = {} | (r{} & 0xFF)'.format(rd, imm8 << 8, rd))
+        stat_writes[rd] = signed_rd
+
+
+def translate_terminator(record, program_counter, lines, stat_writes):
+    """Appends the source for the control flow instruction
+       ending a block
+
+       Keyword arguments:
+       record -- decoded instruction record
+       program_counter -- PC of the instruction
+       lines -- list of source lines of the block
+       stat_writes -- dictionary of register to the source of
+                      its statistics value, last write wins
+
+       Return: Tuple(source of the branch condition or None,
+                     branch target, source of the next PC expression)
+    """
+    (op_id, rd, rs, _, imm8, imm11, _, _) = record
+    name = isa.OPCODE_MAP[op_id][0]
+    target = imm8 // WORD_SIZE
+    condition = None
+
+    if name == 'bp':
+        condition = '{} > 0'.format(SIGNED.format(rd))
+    elif name == 'bn':
+        condition = 'r{} & 0x8000'.format(rd)
+    elif name == 'bx':
+        condition = 'r{}'.format(rd)
+    elif name == 'bz':
+        condition = 'r{} == 0'.format(rd)
+
+    if condition is not None:
+        next_pc = '{} if {} else {}'.format(target, condition,
+                                            program_counter + 1)
+    elif name == 'jr':
+        next_pc = SIGNED.format(rs)
+    elif name == 'jalr':
+        lines.append('r{} = {}'.format(rd, (program_counter + 1) & 0xFFFF))
+        stat_writes[rd] = str(program_counter + 1)
+        next_pc = 'int({} / 2)'.format(SIGNED.format(rs))
+    elif name == 'j':
+        word = ((program_counter * 2) & 0xF800) | imm11
+        next_pc = str(to_signed(word) // WORD_SIZE)
+    else:
+        next_pc = 'None'
+
+    return (condition, target, next_pc)
+
+
+def trace_line(program_counter, op_code, latency, trace):
+    """Builds the source recording an instruction in the
+       trace sink
+
+       Keyword arguments:
+       program_counter -- PC of the instruction
+       op_code -- op_code of the instruction
+       latency -- cycles taken by the instruction
+       trace -- TraceSink recording retired instructions
+
+       Return: String
+    """
+    if trace.level == xsim_trace.TRACE_FULL:
+        return 'T({}, {}, {}, ({}))'.format(
+            program_counter, op_code, latency,
+            ', '.join('r{}'.format(register) for register in range(8)))
+    return 'T({}, {}, {})'.format(program_counter, op_code, latency)
+
+
+def compile_block(program, entry_pc, dispatch_table, block_id, trace=None,
+                  loop=True, profile=None, cache=None, branches=None,
+                  pipeline=None, bbv=None):
+    """Compiles the basic block starting at entry_pc into
+       a generated function.  A block whose conditional branch
+       jumps back to its own entry is compiled as a loop.
+
+       Keyword arguments:
+       program -- list of decoded instruction records
+       entry_pc -- PC of the first instruction in the block
+       dispatch_table -- op_code indexed dispatch table
+       block_id -- position of the block's execution counter
+       trace -- TraceSink recording retired instructions or None
+       loop -- compile self loops as loops when True, otherwise
+               every call runs the block once
+       profile -- Profile whose transfer counts the block adds to
+                  or None
+       cache -- CacheHierarchy timing the loads and stores or None
+       branches -- BranchPredictors predicting the branches or None
+       pipeline -- Pipeline timing the run in order or None
+       bbv -- BasicBlockVectors collecting interval vectors or None
+
+       Return: BasicBlock
+    """
+    lines = []
+    stat_writes = {}
+    op_counts = [0] * len(isa.STAT_NAMES)
+    cycles = 0
+    length = 0
+    condition = None
+    target = None
+    error = None
+    exit_pc = None
+    program_counter = entry_pc
+
+    while True:
+        record = program[program_counter]
+        entry = dispatch_table[record[0]]
+        length += 1
+
+        if entry is None:
+            error = 'ERROR: UNRECOGNZIED OPCODE {}'.format(
+                format(record[0], '05b'))
+            lines.append('print({!r}, file=sys.stderr)'.format(error))
+            next_pc = 'None'
+            exit_pc = program_counter
+            break
+
+        (_, latency, stat_slot, control_flow, _) = entry
+        cycles += latency
+        op_counts[stat_slot] += 1
+
+        if control_flow:
+            (condition, target, next_pc) = translate_terminator(
+                record, program_counter, lines, stat_writes)
+            if branches is not None and condition is not None:
+                taken = 'bool({})'.format(condition)
+                if target == program_counter + 1:
+                    taken = 'False'
+                lines.append('B({}, {})'.format(program_counter, taken))
+            if pipeline is not None and next_pc != 'None':
+                if condition is None:
+                    taken = '({}) != {}'.format(next_pc, program_counter + 1)
+                elif target == program_counter + 1:
+                    taken = 'False'
+                else:
+                    taken = 'bool({})'.format(condition)
+                lines.append('P({}, {})'.format(program_counter, taken))
+            if bbv is not None and next_pc != 'None':
+                lines.append('V({}, {})'.format(program_counter, next_pc))
+        else:
+            name = isa.OPCODE_MAP[record[0]][0]
+            if cache is not None and name in ('lw', 'sw'):
+                lines.append('K({}, r{})'.format(program_counter,
+                                                 record[2]))
+            translate_instruction(record, lines, stat_writes)
+            if pipeline is not None:
+                lines.append('P({}, False)'.format(program_counter))
+
+        if trace is not None:
+            lines.append(trace_line(program_counter, record[0], latency,
+                                    trace))
+
+        if control_flow:
+            exit_pc = program_counter
+            break
+
+        program_counter += 1
+
+        if length == MAX_BLOCK_LENGTH or program_counter == len(program):
+            next_pc = str(program_counter)
+            break
+
+    used = set()
+    for line in lines + [condition or '', next_pc]:
+        used.update(int(register) for register in REGISTER_USE.findall(line))
+    assigned = set()
+    for line in lines:
+        assigned.update(int(register)
+                        for register in REGISTER_ASSIGN.findall(line))
+
+    profiled = profile is not None and exit_pc is not None
+    body = ['r{0} = R[{0}]'.format(register) for register in sorted(used)]
+    if loop and condition is not None and target == entry_pc:
+        body.append('executions = 0')
+        body.append('while True:')
+        loop = ['executions += 1'] + lines
+        loop.append('if {}:\n    continue'.format(condition))
+        loop.append('break')
+        body.extend(indent(line) for line in loop)
+        if profiled:
+            # every run of the loop but the last jumps back
+            body.append('PT[{}] += executions - 1'.format(exit_pc))
+            body.append('PE[{}] += executions - 1'.format(entry_pc))
+        next_pc = str(program_counter + 1)
+        count = 'executions'
+    else:
+        body.extend(lines)
+        count = '1'
+        if profiled and condition is not None:
+            # a branch to its fall through PC is never counted as taken
+            if target != exit_pc + 1:
+                body.append('if {}:'.format(condition))
+                body.append('    PT[{}] += 1'.format(exit_pc))
+                if 0 <= target < len(program):
+                    body.append('    PE[{}] += 1'.format(target))
+                body.append('    next_pc = {}'.format(target))
+                body.append('else:')
+                body.append('    next_pc = {}'.format(exit_pc + 1))
+                next_pc = 'next_pc'
+        elif profiled and next_pc != 'None':
+            body.append('next_pc = {}'.format(next_pc))
+            body.append('if next_pc != {}:'.format(exit_pc + 1))
+            body.append('    PT[{}] += 1'.format(exit_pc))
+            body.append('    if 0 <= next_pc < {}:'.format(len(program)))
+            body.append('        PE[next_pc] += 1')
+            next_pc = 'next_pc'
+    body.extend('R[{0}] = r{0}'.format(register)
+                for register in sorted(assigned))
+    body.extend('S[{}] = {}'.format(register, stat_writes[register])
+                for register in sorted(stat_writes))
+    body.append('E[{}] += {}'.format(block_id, count))
+    body.append('return {}'.format(next_pc))
+
+    source = 'def block_{}():\n{}\n'.format(
+        block_id, '\n'.join(indent(line) for line in body))
+    namespace = {'R': REGISTERS,
+                 'S': REGISTER_STATS,
+                 'M': xsim_int.DATA_MEMORY,
+                 'E': BLOCK_EXECUTIONS,
+                 'T': trace.record if trace is not None else None,
+                 'PT': profile.taken if profile is not None else None,
+                 'PE': profile.entries if profile is not None else None,
+                 'K': cache.access if cache is not None else None,
+                 'B': branches.branch if branches is not None else None,
+                 'P': pipeline.retire if pipeline is not None else None,
+                 'V': bbv.transfer if bbv is not None else None,
+                 'divide': divide,
+                 'bounded_exp': bounded_exp,
+                 'sys': sys}
+    exec(source, namespace)
+
+    return BasicBlock(block_id, namespace['block_{}'.format(block_id)],
+                      op_counts, cycles, length, exit_pc)
+
+
+def indent(source):
+    """Indents every line of a piece of generated source
+
+       Keyword arguments:
+       source -- one or more lines of source
+
+       Return: String
+    """
+    return '\n'.join('    ' + line for line in source.split('\n'))
+
+
+# Number of times each compiled block ran, indexed by block id
+BLOCK_EXECUTIONS = []
+
+
+def simulate(latency_dict, instruction_memory, trace=None,
+             memory_image=None, resume=None, stop_instruction=None,
+             stop_pc=None, checkpoint_file=None, watchdog=None,
+             profile=None, cache=None, branches=None, pipeline=None,
+             bbv=None):
+    """Run the simulation of the X isa by executing
+       compiled basic blocks and maintain stats.  When a stop
+       or a watchdog is given blocks run once per call and the
+       instructions up to each stop or check are interpreted
+       one at a time.
+
+       Keyword arguments:
+       latency_dict -- dictionary of opcode latencies
+       instruction_memory -- list of 16 bit instruction words
+       trace -- TraceSink recording retired instructions or None
+       memory_image -- binary image preloaded into data memory or None
+       resume -- Checkpoint to resume from or None
+       stop_instruction -- instruction count to stop at or None
+       stop_pc -- PC to stop at or None
+       checkpoint_file -- file receiving the state when stopped or None
+       watchdog -- Watchdog holding the budgets of the run or None
+       profile -- Profile counting the control flow of the run or None
+       cache -- CacheHierarchy timing the loads and stores or None
+       branches -- BranchPredictors predicting the branches or None
+       pipeline -- Pipeline timing the run in order or None
+       bbv -- BasicBlockVectors collecting interval vectors or None
+
+       Return: Dictionary
+    """
+    xsim_int.init_register_file()
+    if memory_image is not None:
+        xsim_memory.load_image(xsim_int.DATA_MEMORY, memory_image)
+    program = xsim_int.decode_program(instruction_memory)
+    program_size = len(program)
+    dispatch_table = isa.build_dispatch_table(xsim_int.HANDLERS,
+                                              latency_dict)
+    del BLOCK_EXECUTIONS[:]
+    block_cache = {}
+    blocks = []
+    bounded = (stop_instruction is not None or stop_pc is not None or
+               watchdog is not None)
+    op_counts = [0] * len(isa.STAT_NAMES)
+    instruction_count = 0
+    clock_cycles = 0
+    program_counter = 0
+    stopped = False
+    abort = None
+
+    if resume is not None:
+        xsim_int.restore_checkpoint(resume)
+        program_counter = resume.program_counter
+        clock_cycles = resume.clock_cycles
+        instruction_count = resume.instruction_count
+        op_counts[:] = resume.op_counts
+        if trace is not None:
+            trace.cycles = clock_cycles
+
+    # stall cycles the timing models added to the latencies
+    stalls = [0]
+    max_stall = 0
+    for model in (cache, branches):
+        if model is not None:
+            model.start(stalls)
+            max_stall += model.max_stall
+
+    if profile is not None:
+        profile.start([record[0] for record in program], dispatch_table,
+                      program_counter)
+    if pipeline is not None:
+        pipeline.start(instruction_memory, dispatch_table)
+    if bbv is not None:
+        bbv.start([record[0] for record in program], dispatch_table,
+                  program_counter, stalls)
+    if trace is not None:
+        trace.stalls = stalls
+
+    if bounded:
+        step_table = dispatch_table
+        # the penalty of a branch is charged before the profile
+        # and the basic block vectors see it transfer
+        if branches is not None:
+            step_table = branches.predicted_dispatch_table(step_table)
+        if profile is not None:
+            step_table = profile.profiled_dispatch_table(step_table)
+        if bbv is not None:
+            step_table = bbv.bbv_dispatch_table(step_table)
+        if cache is not None:
+            step_table = cache.cached_dispatch_table(
+                step_table, xsim_int.MACHINE.load_address,
+                xsim_int.MACHINE.store_address)
+        if pipeline is not None:
+            step_table = pipeline.pipelined_dispatch_table(step_table)
+        if trace is not None:
+            trace.register_reader = xsim_int.read_registers
+            step_table = xsim_trace.traced_dispatch_table(step_table,
+                                                          trace)
+        if stop_instruction is not None:
+            stop_instruction = max(stop_instruction, instruction_count)
+        if watchdog is not None:
+            watchdog.start(xsim_watchdog.max_latency(dispatch_table,
+                                                     max_stall),
+                           instruction_count)
+        # Running totals of the instructions and latency cycles
+        # of every block and single step so far
+        executed = instruction_count
+        executed_cycles = clock_cycles
+        limit = xsim_watchdog.run_limit(stop_instruction, watchdog,
+                                        executed, executed_cycles)
+
+    while program_counter is not None:
+        if bounded:
+            if executed == limit:
+                if executed == stop_instruction:
+                    stopped = True
+                    break
+                abort = watchdog.check(program_counter, executed,
+                                       executed_cycles + stalls[0])
+                if abort is not None:
+                    break
+                limit = xsim_watchdog.run_limit(stop_instruction,
+                                                watchdog, executed,
+                                                executed_cycles + stalls[0])
+            if program_counter == stop_pc:
+                stopped = True
+                break
+
+        if not 0 <= program_counter < program_size:
+            abort = xsim_watchdog.ABORT_PC
+            break
+        block = block_cache.get(program_counter)
+        if block is None:
+            block = compile_block(program, program_counter,
+                                  dispatch_table, len(blocks), trace,
+                                  loop=not bounded, profile=profile,
+                                  cache=cache, branches=branches,
+                                  pipeline=pipeline, bbv=bbv)
+            blocks.append(block)
+            BLOCK_EXECUTIONS.append(0)
+            block_cache[program_counter] = block
+
+        if not bounded:
+            program_counter = block.function()
+        elif ((limit is not None and limit - executed < block.length) or
+              (stop_pc is not None and
+               0 < stop_pc - program_counter < block.length)):
+            last_pc = program_counter
+            (program_counter, latency) = xsim_int.step(
+                program, step_table, program_counter, op_counts, trace)
+            instruction_count += 1
+            clock_cycles += latency
+            executed += 1
+            executed_cycles += latency
+        else:
+            last_pc = block.exit_pc
+            program_counter = block.function()
+            executed += block.length
+            executed_cycles += block.cycles
+
+    if abort != xsim_watchdog.ABORT_PC:
+        if program_counter is not None:
+            (end_pc, end_executed) = (program_counter, False)
+        elif bounded:
+            (end_pc, end_executed) = (last_pc, True)
+        else:
+            (end_pc, end_executed) = (block.exit_pc, True)
+        if profile is not None:
+            profile.finish(end_pc, end_executed)
+        if pipeline is not None:
+            pipeline.finish(end_pc, end_executed)
+        if bbv is not None:
+            bbv.finish(end_pc, end_executed)
+    if profile is not None:
+        for model in (cache, branches):
+            if model is not None:
+                profile.add_stalls(model.pc_stalls)
+
+    for block in blocks:
+        executions = BLOCK_EXECUTIONS[block.block_id]
+        instruction_count += executions * block.length
+        clock_cycles += executions * block.cycles
+        for stat_slot, count in enumerate(block.op_counts):
+            op_counts[stat_slot] += executions * count
+    clock_cycles += stalls[0]
+
+    if stopped and checkpoint_file is not None:
+        xsim_checkpoint.write_checkpoint(checkpoint_file,
+                                         xsim_int.capture_checkpoint(
+                                             program_counter,
+                                             instruction_count,
+                                             clock_cycles, op_counts))
+
+    statistics = xsim_int.build_statistics(op_counts, instruction_count,
+                                           clock_cycles)
+    if cache is not None:
+        cache.add_statistics(statistics)
+    if branches is not None:
+        branches.add_statistics(statistics)
+    if pipeline is not None:
+        pipeline.add_statistics(statistics)
+    if abort is not None:
+        statistics['abort'] = xsim_watchdog.abort_record(abort,
+                                                         program_counter)
+    return statistics
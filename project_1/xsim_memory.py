@@ -0,0 +1,97 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_memory
+Course:  CS2410
+
+Flat data memory for the xsim engines.  Memory is one contiguous
+array of 64K unsigned 16 bit words indexed by the integer word
+address.  Initial contents can be loaded from a binary image of
+little-endian words and the final contents dumped the same way.
+"""
+
+import mmap
+import sys
+
+from array import array
+
+# DEFINES
+MEMORY_WORDS = 1 << 16
+WORD_BYTES = 2
+MEMORY_BYTES = MEMORY_WORDS * WORD_BYTES
+
+
+def create_memory():
+    """Creates a zero filled data memory
+
+       Keyword arguments:
+       None
+
+       Return: array
+    """
+    return array('H', bytes(MEMORY_BYTES))
+
+
+def clear_memory(memory):
+    """Zero fills a data memory in place so references held
+       by compiled code stay valid
+
+       Keyword arguments:
+       memory -- data memory array
+
+       Return: None
+    """
+    memoryview(memory).cast('B')[:] = bytes(MEMORY_BYTES)
+
+
+def load_image(memory, image_file):
+    """Loads a binary image of little-endian 16 bit words
+       into memory starting at address 0.  The image is mapped
+       rather than read so large images are copied only once.
+
+       Keyword arguments:
+       memory -- data memory array
+       image_file -- path of the binary image
+
+       Return: int number of words loaded
+    """
+    with open(image_file, 'rb') as image:
+        image.seek(0, 2)
+        image_bytes = image.tell()
+
+        if image_bytes % WORD_BYTES:
+            raise ValueError('memory image {} is not a whole number of '
+                             'words'.format(image_file))
+        if image_bytes > MEMORY_BYTES:
+            raise ValueError('memory image {} is larger than {} '
+                             'words'.format(image_file, MEMORY_WORDS))
+        if image_bytes == 0:
+            return 0
+
+        with mmap.mmap(image.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            memoryview(memory).cast('B')[:image_bytes] = data
+
+    image_words = image_bytes // WORD_BYTES
+    if sys.byteorder == 'big':
+        loaded = memory[:image_words]
+        loaded.byteswap()
+        memory[:image_words] = loaded
+
+    return image_words
+
+
+def dump_image(memory, dump_file):
+    """Dumps the whole memory as little-endian 16 bit words
+
+       Keyword arguments:
+       memory -- data memory array
+       dump_file -- path of the dump
+
+       Return: None
+    """
+    if sys.byteorder == 'big':
+        memory = array('H', memory)
+        memory.byteswap()
+
+    with open(dump_file, 'wb') as dump:
+        memory.tofile(dump)
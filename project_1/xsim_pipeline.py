@@ -0,0 +1,283 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_pipeline
+Course:  CS2410
+
+Timing of a run on a classic five stage in-order pipeline, IF, ID,
+EX, MEM and WB, computed from the instructions as they retire.
+Instructions issue from ID into EX in program order.  MUL, DIV, MOD
+and EXP each have a functional unit of their own and every other
+instruction uses the ALU.  A unit is not pipelined, so it is busy
+for the configured latency of its instruction.  Instructions in
+different units can overlap and complete out of order.
+
+An instruction waits in ID for:
+
+   raw         a source written by an instruction still in flight
+   load_use    the same when the source is loaded by LW
+   structural  its functional unit to be free
+   waw         an older write of its destination to complete
+
+With forwarding a result reaches EX the cycle after it is computed,
+or the cycle after MEM for a load.  Without forwarding it is read in
+ID in the cycle of WB.  Branches and jumps resolve at the end of EX
+and fetch continues down the fall through path, so every taken
+transfer costs branch bubbles ('control').  The register file has
+enough write ports for every unit.
+"""
+
+import isa
+
+# DEFINES
+STAGES = ['IF', 'ID', 'EX', 'MEM', 'WB']
+STALL_NAMES = ['raw', 'load_use', 'structural', 'waw', 'control']
+BRANCH_BUBBLES = 2
+
+# Registers each operation reads
+REGISTER_READS = {'add': 'rs rt', 'sub': 'rs rt', 'and': 'rs rt',
+                  'nor': 'rs rt', 'div': 'rs rt', 'mul': 'rs rt',
+                  'mod': 'rs rt', 'exp': 'rs rt', 'lw': 'rs', 'sw': 'rs rt',
+                  'lui': 'rd', 'bp': 'rd', 'bn': 'rd', 'bx': 'rd', 'bz': 'rd',
+                  'jr': 'rs', 'jalr': 'rs', 'put': 'rs'}
+
+# Operations writing rd
+REGISTER_WRITES = ['add', 'sub', 'and', 'nor', 'div', 'mul', 'mod', 'exp',
+                   'lw', 'liz', 'lis', 'lui', 'jalr']
+
+# Operations with a functional unit of their own, the rest use the ALU
+FUNCTIONAL_UNITS = ['alu', 'mul', 'div', 'mod', 'exp']
+
+
+def decode_timing(word, dispatch_table):
+    """Decodes what the pipeline needs to know about an
+       instruction
+
+       Keyword arguments:
+       word -- 16 bit instruction word
+       dispatch_table -- op_code indexed dispatch table of the run
+
+       Return: Tuple(destination register or -1, source registers,
+                     EX latency, functional unit, True for LW)
+    """
+    op_code = word >> 11
+    if op_code not in isa.OPCODE_MAP or dispatch_table[op_code] is None:
+        return (-1, (), 1, 0, False)
+
+    name = isa.OPCODE_MAP[op_code][0]
+    fields = {'rd': (word >> 8) & 7,
+              'rs': (word >> 5) & 7,
+              'rt': (word >> 2) & 7}
+    destination = fields['rd'] if name in REGISTER_WRITES else -1
+    sources = tuple(fields[field]
+                    for field in REGISTER_READS.get(name, '').split())
+    unit = FUNCTIONAL_UNITS.index(name) if name in FUNCTIONAL_UNITS else 0
+
+    return (destination, sources, dispatch_table[op_code][1], unit,
+            name == 'lw')
+
+
+class Pipeline:
+    """Pipeline Class that times the retired instructions of
+    a run on the in-order pipeline
+    """
+
+    def __init__(self, forwarding=True, branch_bubbles=BRANCH_BUBBLES):
+        self.forwarding = forwarding
+        self.branch_bubbles = branch_bubbles
+        self.timing = []
+        self.instructions = 0
+        # cycle the last instruction entered ID and EX
+        self.last_decode = 1
+        self.last_issue = 0
+        # first cycle the next instruction can be decoded after
+        # a taken branch
+        self.fetch_ready = 0
+        # cycle every functional unit is free again
+        self.unit_free = [0] * len(FUNCTIONAL_UNITS)
+        # cycle a register's value reaches EX, whether it is
+        # loaded and the WB cycle of its last write
+        self.ready = [0] * 8
+        self.loaded = [False] * 8
+        self.written = [0] * 8
+        self.last_write_back = 0
+        self.stalls = dict.fromkeys(STALL_NAMES, 0)
+        self.retire = self.build_retire()
+
+    def start(self, instruction_memory, dispatch_table):
+        """Decodes the timing of every instruction of a program
+
+        Keyword arguments:
+        instruction_memory -- list of 16 bit instruction words
+        dispatch_table -- op_code indexed dispatch table of the run
+
+        Returns: None
+        """
+        self.timing[:] = [decode_timing(word, dispatch_table)
+                          for word in instruction_memory]
+
+    def build_retire(self):
+        """Builds the function timing one retired instruction
+
+        Keyword arguments:
+        None
+
+        Returns: function of the PC of the instruction and True
+                 when it transferred control
+        """
+        timing = self.timing
+        unit_free = self.unit_free
+        ready = self.ready
+        loaded = self.loaded
+        written = self.written
+        stalls = self.stalls
+        branch_bubbles = self.branch_bubbles
+        # cycles from the end of EX until a result reaches EX
+        # of a consumer, for ALU results and for loads
+        if self.forwarding:
+            (result_delay, load_delay) = (1, 2)
+        else:
+            (result_delay, load_delay) = (3, 3)
+
+        def retire(program_counter, taken):
+            (destination, sources, latency, unit, load) = timing[
+                program_counter]
+            self.instructions += 1
+
+            decode = max(self.last_decode + 1, self.last_issue)
+            if self.fetch_ready > decode:
+                stalls['control'] += self.fetch_ready - decode
+                decode = self.fetch_ready
+
+            issue = decode + 1
+            if unit_free[unit] > issue:
+                stalls['structural'] += unit_free[unit] - issue
+                issue = unit_free[unit]
+
+            for source in sources:
+                if ready[source] > issue:
+                    if loaded[source]:
+                        stalls['load_use'] += ready[source] - issue
+                    else:
+                        stalls['raw'] += ready[source] - issue
+                    issue = ready[source]
+
+            execute_end = issue + latency - 1
+            if destination >= 0:
+                # the write back has to follow the older write
+                if written[destination] >= execute_end + 2:
+                    stalls['waw'] += written[destination] - execute_end - 1
+                    execute_end = written[destination] - 1
+                    issue = execute_end - latency + 1
+                written[destination] = execute_end + 2
+                loaded[destination] = load
+                if load:
+                    ready[destination] = execute_end + load_delay
+                else:
+                    ready[destination] = execute_end + result_delay
+
+            unit_free[unit] = execute_end + 1
+            if taken:
+                self.fetch_ready = execute_end + branch_bubbles
+            self.last_decode = decode
+            self.last_issue = issue
+            if execute_end + 2 > self.last_write_back:
+                self.last_write_back = execute_end + 2
+
+        return retire
+
+    def pipelined_dispatch_table(self, dispatch_table):
+        """Wraps every handler of a dispatch table so that it
+        retires its instruction into the pipeline.  Every
+        wrapped entry is marked as control flow so the handler
+        receives the PC and returns the next one.
+
+        Keyword arguments:
+        dispatch_table -- op_code indexed dispatch table
+
+        Returns: List
+        """
+        pipelined_table = []
+
+        for entry in dispatch_table:
+            if entry is None or entry[0] is None:
+                pipelined_table.append(entry)
+                continue
+
+            (handler, latency, stat_slot, control_flow, operand_count) = entry
+            if control_flow:
+                pipelined = self.pipelined_control_flow(handler)
+            else:
+                pipelined = self.pipelined_sequential(handler)
+            pipelined_table.append((pipelined, latency, stat_slot, True,
+                                    operand_count))
+
+        return pipelined_table
+
+    def pipelined_control_flow(self, handler):
+        """Builds a handler for a control flow instruction that
+        retires it with whether it transferred control
+
+        Keyword arguments:
+        handler -- handler returning the next PC
+
+        Returns: function
+        """
+        retire = self.retire
+
+        def pipelined(*operands):
+            next_pc = handler(*operands)
+            retire(operands[-1], next_pc != operands[-1] + 1)
+            return next_pc
+
+        return pipelined
+
+    def pipelined_sequential(self, handler):
+        """Builds a handler for an instruction that falls
+        through to the next PC that retires it
+
+        Keyword arguments:
+        handler -- handler that does not take the PC
+
+        Returns: function
+        """
+        retire = self.retire
+
+        def pipelined(*operands):
+            program_counter = operands[-1]
+            handler(*operands[:-1])
+            retire(program_counter, False)
+            return program_counter + 1
+
+        return pipelined
+
+    def finish(self, program_counter, executed):
+        """Retires the instruction a run ended at when it ran
+        (HALT or an unrecognized op_code)
+
+        Keyword arguments:
+        program_counter -- PC of the last instruction reached
+        executed -- True when that instruction ran
+
+        Returns: None
+        """
+        if executed:
+            self.retire(program_counter, False)
+
+    def add_statistics(self, statistics):
+        """Adds the pipeline cycles and stalls to the
+        statistics of a run
+
+        Keyword arguments:
+        statistics -- statistics dictionary of the run
+
+        Returns: None
+        """
+        statistics['pipeline'] = [{
+            'forwarding': self.forwarding,
+            'branch_bubbles': self.branch_bubbles,
+            'instructions': self.instructions,
+            'cycles': self.last_write_back,
+            'cpi': round(self.last_write_back / max(self.instructions, 1),
+                         6),
+            'stalls': dict(self.stalls)}]
@@ -0,0 +1,275 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_profile
+Course:  CS2410
+
+Execution profile of a guest program: executions and cycles of
+every PC and basic block and the taken and not taken counts of
+every branch.  Only control flow instructions are counted while
+the program runs.  Their handlers are wrapped, the int engine
+counts them in its loop and the compiled blocks of the JIT add to
+the same counters, to count where control went.  The executions
+of every other PC are recovered from that flow when the report is
+built.  When no profile is given nothing is wrapped, so the
+engines run unchanged.
+"""
+
+import csv
+import json
+
+import isa
+
+# DEFINES
+PROFILE_FORMATS = ['json', 'csv']
+BRANCH_NAMES = ['bp', 'bn', 'bx', 'bz']
+
+PC_FIELDS = ['pc', 'block', 'op', 'executions', 'cycles', 'taken',
+             'not_taken']
+
+
+class Profile:
+    """Profile Class that counts the control flow of a run
+    and builds its execution report
+    """
+
+    def __init__(self):
+        self.op_codes = []
+        self.latencies = []
+        self.taken = []
+        self.entries = []
+        self.stall_cycles = {}
+        self.start_pc = 0
+        self.end_pc = None
+        self.end_executed = False
+
+    def start(self, op_codes, dispatch_table, program_counter):
+        """Allocates the counters of a program and records
+        the PC the run starts at
+
+        Keyword arguments:
+        op_codes -- op_code of every instruction in the program
+        dispatch_table -- op_code indexed dispatch table of the run
+        program_counter -- PC of the first instruction run
+
+        Returns: None
+        """
+        length = len(op_codes)
+        self.op_codes = list(op_codes)
+        self.latencies = [dispatch_table[op_code][1]
+                          if dispatch_table[op_code] is not None else 0
+                          for op_code in self.op_codes]
+        self.taken = [0] * length
+        self.entries = [0] * length
+        self.stall_cycles = {}
+        self.start_pc = program_counter
+        self.end_pc = None
+        self.end_executed = False
+
+    def finish(self, program_counter, executed):
+        """Records the PC the run ended at
+
+        Keyword arguments:
+        program_counter -- PC of the last instruction reached
+        executed -- True when that instruction ran (HALT or an
+                    unrecognized op_code), False when the run
+                    stopped before it
+
+        Returns: None
+        """
+        self.end_pc = program_counter
+        self.end_executed = executed
+
+    def add_stalls(self, pc_stalls):
+        """Adds the stall cycles a timing model charged to the
+        PCs of the run to their cycles
+
+        Keyword arguments:
+        pc_stalls -- dictionary of PC to stall cycles
+
+        Returns: None
+        """
+        for program_counter, cycles in pc_stalls.items():
+            self.stall_cycles[program_counter] = (
+                self.stall_cycles.get(program_counter, 0) + cycles)
+
+    def profiled_dispatch_table(self, dispatch_table):
+        """Wraps the handlers of the control flow instructions
+        of a dispatch table so that they count where control
+        goes.  Other entries are left as they are, even when an
+        earlier wrapper made them take the PC.
+
+        Keyword arguments:
+        dispatch_table -- op_code indexed dispatch table
+
+        Returns: List
+        """
+        profiled_table = list(dispatch_table)
+
+        for op_code, (_, _, control_flow) in isa.OPCODE_MAP.items():
+            entry = dispatch_table[op_code]
+            if not control_flow or entry is None or entry[0] is None:
+                continue
+
+            (handler, latency, stat_slot, _, operand_count) = entry
+            profiled_table[op_code] = (
+                self.profile_control_flow(handler, operand_count), latency,
+                stat_slot, True, operand_count)
+
+        return profiled_table
+
+    def profile_control_flow(self, handler, operand_count):
+        """Builds a counting handler for a control flow
+        instruction.  Control flow handlers take the PC after
+        their operands and return the next PC.  Only transfers
+        are counted, so a branch that falls through costs one
+        comparison.
+
+        Keyword arguments:
+        handler -- handler returning the next PC
+        operand_count -- number of operands before the PC
+
+        Returns: function
+        """
+        taken = self.taken
+        entries = self.entries
+        length = len(entries)
+
+        if operand_count == 1:
+            def profiled(operand, program_counter):
+                next_pc = handler(operand, program_counter)
+                if next_pc != program_counter + 1:
+                    taken[program_counter] += 1
+                    if 0 <= next_pc < length:
+                        entries[next_pc] += 1
+                return next_pc
+        else:
+            def profiled(first, second, program_counter):
+                next_pc = handler(first, second, program_counter)
+                if next_pc != program_counter + 1:
+                    taken[program_counter] += 1
+                    if 0 <= next_pc < length:
+                        entries[next_pc] += 1
+                return next_pc
+
+        return profiled
+
+    def executions(self):
+        """Recovers the executions of every PC from the control
+        flow counts.  Control reaches a PC by falling through
+        from the previous one, by a transfer or by starting
+        there.
+
+        Keyword arguments:
+        None
+
+        Returns: List of int
+        """
+        executions = [0] * len(self.op_codes)
+        fall_through = 0
+
+        for program_counter, op_code in enumerate(self.op_codes):
+            reached = fall_through + self.entries[program_counter]
+            if program_counter == self.start_pc:
+                reached += 1
+            if program_counter == self.end_pc and not self.end_executed:
+                reached -= 1
+            executions[program_counter] = reached
+
+            fall_through = reached
+            if op_code in isa.OPCODE_MAP and isa.OPCODE_MAP[op_code][2]:
+                fall_through -= self.taken[program_counter]
+            if program_counter == self.end_pc and self.end_executed:
+                fall_through = 0
+
+        return executions
+
+    def block_leaders(self):
+        """Finds the first PC of every basic block.  Blocks
+        start where a run starts, after a control flow
+        instruction and wherever control was transferred to.
+
+        Keyword arguments:
+        None
+
+        Returns: Set of int
+        """
+        leaders = {0, self.start_pc}
+
+        for program_counter, op_code in enumerate(self.op_codes):
+            if self.entries[program_counter]:
+                leaders.add(program_counter)
+            if op_code in isa.OPCODE_MAP and isa.OPCODE_MAP[op_code][2]:
+                leaders.add(program_counter + 1)
+
+        return leaders
+
+    def report(self):
+        """Builds the profile report.  PCs and blocks that never
+        ran are left out and blocks are ordered by the cycles
+        spent in them.
+
+        Keyword arguments:
+        None
+
+        Returns: Dictionary
+        """
+        executions = self.executions()
+        leaders = self.block_leaders()
+        pcs = []
+        blocks = []
+        block = None
+
+        for program_counter, op_code in enumerate(self.op_codes):
+            if program_counter in leaders:
+                block = {'start': program_counter, 'end': program_counter,
+                         'executions': executions[program_counter],
+                         'instructions': 0, 'cycles': 0}
+                blocks.append(block)
+
+            count = executions[program_counter]
+            cycles = (count * self.latencies[program_counter] +
+                      self.stall_cycles.get(program_counter, 0))
+            block['end'] = program_counter
+            block['instructions'] += count
+            block['cycles'] += cycles
+            if not count:
+                continue
+
+            name = isa.OPCODE_MAP.get(op_code, ('?',))[0]
+            record = {'pc': program_counter, 'block': block['start'],
+                      'op': name, 'executions': count, 'cycles': cycles,
+                      'taken': None, 'not_taken': None}
+            if name in BRANCH_NAMES:
+                record['taken'] = self.taken[program_counter]
+                record['not_taken'] = count - self.taken[program_counter]
+            pcs.append(record)
+
+        total_cycles = sum(record['cycles'] for record in pcs)
+        blocks = [block for block in blocks if block['instructions']]
+        for block in blocks:
+            block['share'] = round(block['cycles'] / max(total_cycles, 1), 6)
+        blocks.sort(key=lambda block: (-block['cycles'], block['start']))
+
+        return {'cycles': total_cycles, 'blocks': blocks, 'pcs': pcs}
+
+
+def write_report(report, profile_file, profile_format='json'):
+    """Writes a profile report.  The CSV report has one row
+       per executed PC with the first PC of its block.
+
+       Keyword arguments:
+       report -- profile report from Profile.report
+       profile_file -- file receiving the report
+       profile_format -- 'json' or 'csv'
+
+       Return: None
+    """
+    if profile_format == 'csv':
+        with open(profile_file, 'w', newline='') as report_out:
+            writer = csv.DictWriter(report_out, fieldnames=PC_FIELDS)
+            writer.writeheader()
+            writer.writerows(report['pcs'])
+    else:
+        with open(profile_file, 'w') as report_out:
+            json.dump(report, report_out)
@@ -0,0 +1,333 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_simpoint
+Course:  CS2410
+
+SimPoint style phase analysis of the basic block vectors written by
+xsim --bbv.  Every vector is normalized to the fraction of its
+interval's instructions spent in each block and randomly projected
+to a few dimensions.  k-means then groups the intervals into
+phases, the number of phases being the smallest whose BIC score
+is within a threshold of the best one.  The interval closest to
+the centre of every phase represents it, weighted by the share of
+the instructions the phase executed.
+
+The manifest lists the representative intervals with the
+instruction they start at, so a detailed simulator can fast
+forward to each one, time it and weight its CPI.  The latency
+cycles in the vectors give the error of that estimate for the
+xsim timing model, which is stated in the manifest.
+"""
+
+import sys
+import json
+import argparse
+
+import numpy
+
+import xsim_bbv
+
+# DEFINES
+DEFAULT_MAX_K = 10
+DEFAULT_DIMENSIONS = 15
+DEFAULT_SEEDS = 5
+DEFAULT_BIC_THRESHOLD = 0.9
+MAX_ITERATIONS = 100
+
+
+def vector_matrix(intervals):
+    """Builds the matrix of normalized basic block vectors
+       with one row per interval and one column per block
+
+       Keyword arguments:
+       intervals -- list of interval vectors
+
+       Return: numpy array
+    """
+    block_pcs = sorted({pc for interval in intervals
+                        for (pc, _) in interval['blocks']})
+    column = {pc: position for position, pc in enumerate(block_pcs)}
+    matrix = numpy.zeros((len(intervals), len(block_pcs)))
+
+    for row, interval in enumerate(intervals):
+        for (pc, instructions) in interval['blocks']:
+            matrix[row, column[pc]] = instructions
+        matrix[row] /= max(interval['instructions'], 1)
+
+    return matrix
+
+
+def random_projection(matrix, dimensions, rng):
+    """Projects the rows of a matrix onto random directions
+
+       Keyword arguments:
+       matrix -- numpy array with one row per interval
+       dimensions -- number of dimensions projected onto
+       rng -- numpy random Generator
+
+       Return: numpy array
+    """
+    projection = rng.uniform(-1.0, 1.0, (matrix.shape[1], dimensions))
+    return matrix.dot(projection)
+
+
+def squared_distances(points, centers):
+    """Computes the squared distance of every point to every
+       center
+
+       Keyword arguments:
+       points -- numpy array with one row per point
+       centers -- numpy array with one row per center
+
+       Return: numpy array of points by centers
+    """
+    return ((points[:, numpy.newaxis, :] -
+             centers[numpy.newaxis, :, :]) ** 2).sum(axis=2)
+
+
+def kmeans(points, k, rng):
+    """Clusters points with k-means from a k-means++ start
+
+       Keyword arguments:
+       points -- numpy array with one row per point
+       k -- number of clusters
+       rng -- numpy random Generator
+
+       Return: Tuple(centers, cluster of every point, distortion)
+    """
+    centers = points[[rng.integers(len(points))]]
+    while len(centers) < k:
+        nearest = squared_distances(points, centers).min(axis=1)
+        if nearest.sum() == 0:
+            choice = rng.integers(len(points))
+        else:
+            choice = rng.choice(len(points), p=nearest / nearest.sum())
+        centers = numpy.vstack([centers, points[choice]])
+
+    labels = None
+    for _ in range(MAX_ITERATIONS):
+        distances = squared_distances(points, centers)
+        new_labels = distances.argmin(axis=1)
+        if labels is not None and (new_labels == labels).all():
+            break
+        labels = new_labels
+        for cluster in range(k):
+            members = points[labels == cluster]
+            if len(members):
+                centers[cluster] = members.mean(axis=0)
+            else:
+                # restart an empty cluster at the farthest point
+                farthest = distances.min(axis=1).argmax()
+                centers[cluster] = points[farthest]
+
+    distances = squared_distances(points, centers)
+    labels = distances.argmin(axis=1)
+    distortion = distances[numpy.arange(len(points)), labels].sum()
+
+    return (centers, labels, distortion)
+
+
+def bic_score(points, centers, labels):
+    """Scores a clustering with the Bayesian Information
+       Criterion of Pelleg and Moore, as SimPoint does
+
+       Keyword arguments:
+       points -- numpy array with one row per point
+       centers -- numpy array with one row per center
+       labels -- cluster of every point
+
+       Return: float
+    """
+    (count, dimensions) = points.shape
+    k = len(centers)
+    distortion = ((points - centers[labels]) ** 2).sum()
+    variance = max(distortion / max(count - k, 1), 1e-12)
+
+    likelihood = 0.0
+    for cluster in range(k):
+        size = (labels == cluster).sum()
+        if not size:
+            continue
+        likelihood += (size * numpy.log(size) - size * numpy.log(count) -
+                       size / 2 * numpy.log(2 * numpy.pi) -
+                       size * dimensions / 2 * numpy.log(variance) -
+                       (size - k) / 2)
+    parameters = k - 1 + dimensions * k + 1
+
+    return likelihood - parameters / 2 * numpy.log(count)
+
+
+def choose_clustering(points, max_k, seeds, bic_threshold, rng):
+    """Clusters points for every k up to max_k and picks the
+       smallest k whose BIC score reaches the threshold of the
+       range of scores
+
+       Keyword arguments:
+       points -- numpy array with one row per point
+       max_k -- largest number of clusters tried
+       seeds -- k-means runs per k, the least distortion wins
+       bic_threshold -- fraction of the BIC range to reach
+       rng -- numpy random Generator
+
+       Return: Tuple(centers, cluster of every point)
+    """
+    clusterings = []
+
+    for k in range(1, min(max_k, len(points)) + 1):
+        runs = [kmeans(points, k, rng) for _ in range(seeds)]
+        (centers, labels, _) = min(runs, key=lambda run: run[2])
+        clusterings.append((centers, labels,
+                            bic_score(points, centers, labels)))
+
+    scores = [score for (_, _, score) in clusterings]
+    (low, high) = (min(scores), max(scores))
+    for (centers, labels, score) in clusterings:
+        if score >= low + bic_threshold * (high - low):
+            return (centers, labels)
+
+
+def pick_simpoints(intervals, points, centers, labels):
+    """Picks the interval closest to the center of every
+       cluster and weights it by the instructions of its cluster
+
+       Keyword arguments:
+       intervals -- list of interval vectors
+       points -- numpy array with one row per interval
+       centers -- numpy array with one row per center
+       labels -- cluster of every interval
+
+       Return: List of Dictionary
+    """
+    distances = squared_distances(points, centers)
+    total = sum(interval['instructions'] for interval in intervals)
+    simpoints = []
+
+    for cluster in range(len(centers)):
+        members = numpy.flatnonzero(labels == cluster)
+        if not len(members):
+            continue
+        chosen = members[distances[members, cluster].argmin()]
+        interval = intervals[chosen]
+        weight = sum(intervals[member]['instructions']
+                     for member in members) / total
+        simpoints.append({'interval': interval['interval'],
+                          'start': interval['start'],
+                          'instructions': interval['instructions'],
+                          'cluster': cluster,
+                          'members': len(members),
+                          'weight': round(weight, 6)})
+
+    return sorted(simpoints, key=lambda simpoint: simpoint['start'])
+
+
+def estimate_cpi(simpoints, interval_cpis):
+    """Estimates the CPI of a whole program from the CPI of
+       its representative intervals
+
+       Keyword arguments:
+       simpoints -- simpoints of a manifest
+       interval_cpis -- dictionary of interval number to the CPI
+                        measured for it
+
+       Return: float
+    """
+    return sum(simpoint['weight'] * interval_cpis[simpoint['interval']]
+               for simpoint in simpoints)
+
+
+def build_manifest(intervals, max_k=DEFAULT_MAX_K,
+                   dimensions=DEFAULT_DIMENSIONS, seeds=DEFAULT_SEEDS,
+                   bic_threshold=DEFAULT_BIC_THRESHOLD, seed=0):
+    """Picks the representative intervals of a program and
+       states the error of estimating its xsim CPI from them
+
+       Keyword arguments:
+       intervals -- list of interval vectors
+       max_k -- largest number of phases tried
+       dimensions -- dimensions of the random projection
+       seeds -- k-means runs per number of phases
+       bic_threshold -- fraction of the BIC range to reach
+       seed -- seed of the projection and of k-means
+
+       Return: Dictionary
+    """
+    if not intervals:
+        raise ValueError('no interval vectors')
+
+    rng = numpy.random.default_rng(seed)
+    points = random_projection(vector_matrix(intervals), dimensions, rng)
+    (centers, labels) = choose_clustering(points, max_k, seeds,
+                                          bic_threshold, rng)
+    simpoints = pick_simpoints(intervals, points, centers, labels)
+
+    instructions = sum(interval['instructions'] for interval in intervals)
+    cycles = sum(interval['cycles'] for interval in intervals)
+    interval_cpis = {interval['interval']:
+                     interval['cycles'] / interval['instructions']
+                     for interval in intervals}
+    cpi = cycles / instructions
+    estimate = estimate_cpi(simpoints, interval_cpis)
+
+    return {'intervals': len(intervals),
+            'instructions': instructions,
+            'dimensions': dimensions,
+            'seed': seed,
+            'k': len(simpoints),
+            'simpoints': simpoints,
+            'xsim_cpi': round(cpi, 6),
+            'xsim_cpi_estimate': round(estimate, 6),
+            'xsim_cpi_error': round(abs(estimate - cpi) / cpi, 6)}
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments
+
+       Keyword arguments:
+       argv -- list of command line arguments sans program name
+
+       Return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog='./xsim_simpoint',
+        usage='./xsim_simpoint bbvfile manifestfile [options]')
+    parser.add_argument('bbv_file',
+                        help='interval vectors written by xsim --bbv')
+    parser.add_argument('manifest_file')
+    parser.add_argument('--max-k', type=int, default=DEFAULT_MAX_K,
+                        help='largest number of phases tried '
+                             '(default: %(default)s)')
+    parser.add_argument('--dimensions', type=int,
+                        default=DEFAULT_DIMENSIONS,
+                        help='dimensions of the random projection '
+                             '(default: %(default)s)')
+    parser.add_argument('--seeds', type=int, default=DEFAULT_SEEDS,
+                        help='k-means runs per number of phases '
+                             '(default: %(default)s)')
+    parser.add_argument('--bic-threshold', type=float,
+                        default=DEFAULT_BIC_THRESHOLD,
+                        help='fraction of the BIC range the chosen number '
+                             'of phases reaches (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed (default: %(default)s)')
+
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+
+    ARGS = parse_arguments(sys.argv[1:])
+
+    try:
+        MANIFEST = build_manifest(xsim_bbv.load_vectors(ARGS.bbv_file),
+                                  ARGS.max_k, ARGS.dimensions, ARGS.seeds,
+                                  ARGS.bic_threshold, ARGS.seed)
+    except ValueError as error:
+        print('ERROR: {}'.format(error), file=sys.stderr)
+        exit(1)
+
+    with open(ARGS.manifest_file, 'w') as MANIFEST_OUT:
+        json.dump(MANIFEST, MANIFEST_OUT, indent=1)
+    print('{} simpoints, estimated xsim CPI {} of {} ({:.2%} error)'.format(
+        MANIFEST['k'], MANIFEST['xsim_cpi_estimate'], MANIFEST['xsim_cpi'],
+        MANIFEST['xsim_cpi_error']))
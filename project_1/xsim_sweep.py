@@ -0,0 +1,202 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_sweep
+Course:  CS2410
+
+Latency sweeps in one pass.  The cycle count of a run is the sum
+of every opcode count times its latency, so a program is simulated
+once to get its opcode histogram and every latency configuration
+is then scored at once as a matrix-vector product.
+"""
+
+import sys
+import csv
+import json
+import argparse
+
+import numpy
+
+import isa
+import xsim_int
+import xsim_jit
+
+# DEFINES
+RESULT_FORMATS = ['csv', 'json']
+RESULT_FIELDS = (['config'] + isa.CONFIGURABLE_OPS +
+                 ['instructions', 'cycles'])
+
+
+def op_histogram(instruction_memory, engine='jit', memory_image=None):
+    """Simulates a program once and collects how many times
+       each opcode retired.  A run that aborts, for example by
+       leaving instruction memory, is not a complete program and
+       raises ValueError.
+
+       Keyword arguments:
+       instruction_memory -- list of 16 bit instruction words
+       engine -- 'int' or 'jit' execution engine
+       memory_image -- binary image preloaded into data memory or None
+
+       Return: Tuple(numpy array of counts indexed by stat slot,
+                     number of instructions executed)
+    """
+    unit_latency = dict.fromkeys(isa.CONFIGURABLE_OPS, 1)
+
+    if engine == 'jit':
+        statistics = xsim_jit.simulate(unit_latency, instruction_memory,
+                                       memory_image=memory_image)
+    else:
+        statistics = xsim_int.simulate(unit_latency, instruction_memory,
+                                       memory_image=memory_image)
+
+    if 'abort' in statistics:
+        raise ValueError('run aborted at PC {}: {}'.format(
+            statistics['abort'][0]['pc'], statistics['abort'][0]['reason']))
+
+    stats = statistics['stats'][0]
+    histogram = numpy.array([stats[name] for name in isa.STAT_NAMES],
+                            dtype=numpy.int64)
+
+    return (histogram, stats['instructions'])
+
+
+def load_configurations(config_files):
+    """Reads latency configurations.  A file holds either one
+       configuration object or a list of them.  Latencies that
+       are not given default to 1.
+
+       Keyword arguments:
+       config_files -- list of JSON configuration files
+
+       Return: List of Tuple(name, latency dictionary)
+    """
+    configurations = []
+
+    for config_file in config_files:
+        with open(config_file) as configuration:
+            config_values = json.load(configuration)
+
+        if isinstance(config_values, list):
+            named_values = [('{}[{}]'.format(config_file, position), values)
+                            for position, values in enumerate(config_values)]
+        else:
+            named_values = [(config_file, config_values)]
+
+        for (name, values) in named_values:
+            latency_values = dict.fromkeys(isa.CONFIGURABLE_OPS, 1)
+            latency_values.update(values)
+            configurations.append((name, latency_values))
+
+    return configurations
+
+
+def latency_matrix(configurations):
+    """Builds the matrix of per opcode latencies with one row
+       per configuration and one column per stat slot
+
+       Keyword arguments:
+       configurations -- list of Tuple(name, latency dictionary)
+
+       Return: numpy array
+    """
+    matrix = numpy.ones((len(configurations), len(isa.STAT_NAMES)),
+                        dtype=numpy.int64)
+
+    for name in isa.CONFIGURABLE_OPS:
+        stat_slot = isa.STAT_NAMES.index(name)
+        matrix[:, stat_slot] = [latency_values[name]
+                                for (_, latency_values) in configurations]
+
+    return matrix
+
+
+def sweep(instruction_memory, configurations, engine='jit',
+          memory_image=None):
+    """Scores every configuration against one run of a program
+
+       Keyword arguments:
+       instruction_memory -- list of 16 bit instruction words
+       configurations -- list of Tuple(name, latency dictionary)
+       engine -- 'int' or 'jit' execution engine
+       memory_image -- binary image preloaded into data memory or None
+
+       Return: List of result rows as dictionaries
+    """
+    (histogram, instruction_count) = op_histogram(instruction_memory,
+                                                  engine, memory_image)
+    cycles = latency_matrix(configurations).dot(histogram)
+
+    results = []
+    for ((name, latency_values), config_cycles) in zip(configurations,
+                                                       cycles):
+        row = {'config': name}
+        for op_name in isa.CONFIGURABLE_OPS:
+            row[op_name] = latency_values[op_name]
+        row['instructions'] = instruction_count
+        row['cycles'] = int(config_cycles)
+        results.append(row)
+
+    return results
+
+
+def write_results(output_file, results, result_format='csv'):
+    """Writes the results table
+
+       Keyword arguments:
+       output_file -- file receiving the table
+       results -- list of result rows as dictionaries
+       result_format -- 'csv' or 'json'
+
+       Return: None
+    """
+    with open(output_file, 'w', newline='') as ofp:
+        if result_format == 'json':
+            json.dump(results, ofp)
+        else:
+            writer = csv.DictWriter(ofp, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments
+
+       Keyword arguments:
+       argv -- list of command line arguments sans program name
+
+       Return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog='./xsim_sweep',
+        usage='./xsim_sweep inputfile outputfile configfile... [options]')
+    parser.add_argument('input_file')
+    parser.add_argument('output_file')
+    parser.add_argument('config_files', nargs='+',
+                        help='JSON files of one configuration or a list '
+                             'of configurations')
+    parser.add_argument('--engine', choices=['int', 'jit'], default='jit',
+                        help='engine collecting the opcode histogram '
+                             '(default: jit)')
+    parser.add_argument('--format', choices=RESULT_FORMATS, default='csv',
+                        dest='result_format',
+                        help='results table format (default: csv)')
+    parser.add_argument('--memory-image',
+                        help='binary image of little-endian 16 bit words '
+                             'loaded into data memory from address 0')
+
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+
+    ARGS = parse_arguments(sys.argv[1:])
+
+    try:
+        RESULTS = sweep(xsim_int.parse_input(ARGS.input_file),
+                        load_configurations(ARGS.config_files),
+                        ARGS.engine, ARGS.memory_image)
+    except ValueError as error:
+        print('ERROR: {}'.format(error), file=sys.stderr)
+        exit(1)
+    write_results(ARGS.output_file, RESULTS, ARGS.result_format)
@@ -0,0 +1,185 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_trace
+Course:  CS2410
+
+Level controlled trace of retired instructions.  Records are
+written through a large buffer either as JSON lines or as packed
+binary records.  When tracing is off no sink is created and the
+engines run without any trace code in their loops.
+"""
+
+import json
+import struct
+
+import isa
+
+# DEFINES
+TRACE_OFF = 0
+TRACE_OPCODE = 1
+TRACE_FULL = 2
+
+TRACE_LEVELS = {'off': TRACE_OFF,
+                'opcode': TRACE_OPCODE,
+                'full': TRACE_FULL}
+
+TRACE_FORMATS = ['jsonl', 'binary']
+
+BUFFER_SIZE = 1 << 20
+
+# Binary trace layout: a header followed by one record per retired
+# instruction of PC, op_code and cycles, plus the 8 registers at
+# the full level.
+BINARY_MAGIC = b'XTRC'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sBB')
+BINARY_OPCODE_RECORD = struct.Struct('<iBQ')
+BINARY_FULL_RECORD = struct.Struct('<iBQ8H')
+
+# JSON lines layout of the same records
+JSONL_OPCODE_RECORD = '{{"pc": {}, "op": "{}", "cycles": {}}}\n'
+JSONL_FULL_RECORD = '{{"pc": {}, "op": "{}", "cycles": {}, "regs": {}}}\n'
+
+
+class TraceSink:
+    """TraceSink Class that buffers trace records of retired
+    instructions and writes them to a file
+    """
+
+    def __init__(self, trace_file, level, trace_format='jsonl'):
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError('unknown trace format {}'.format(trace_format))
+
+        self.level = level
+        self.trace_format = trace_format
+        self.cycles = 0
+        self.register_reader = None
+        # stall cycles of the run so far, added to the latency
+        # cycles of every record
+        self.stalls = [0]
+
+        if trace_format == 'binary':
+            self.trace_out = open(trace_file, 'wb', buffering=BUFFER_SIZE)
+            self.trace_out.write(BINARY_HEADER.pack(BINARY_MAGIC,
+                                                    BINARY_VERSION, level))
+        else:
+            self.trace_out = open(trace_file, 'w', buffering=BUFFER_SIZE)
+
+        self.names = {}
+        for op_code, (name, _, _) in isa.OPCODE_MAP.items():
+            self.names[op_code] = name
+
+    def record(self, program_counter, op_code, latency, registers=None):
+        """Records a retired instruction with the cycles of
+        the run so far, stalls included
+
+        Keyword arguments:
+        program_counter -- PC of the instruction
+        op_code -- op_code of the instruction
+        latency -- cycles taken by the instruction
+        registers -- the 8 register words after the instruction,
+                     read from the register_reader if not given
+
+        Returns: None
+        """
+        self.cycles += latency
+        cycles = self.cycles + self.stalls[0]
+
+        if self.level == TRACE_FULL and registers is None:
+            registers = self.register_reader()
+
+        if self.trace_format == 'binary':
+            if self.level == TRACE_FULL:
+                self.trace_out.write(BINARY_FULL_RECORD.pack(
+                    program_counter, op_code, cycles, *registers))
+            else:
+                self.trace_out.write(BINARY_OPCODE_RECORD.pack(
+                    program_counter, op_code, cycles))
+        elif self.level == TRACE_FULL:
+            self.trace_out.write(JSONL_FULL_RECORD.format(
+                program_counter, self.names[op_code], cycles,
+                json.dumps(list(registers))))
+        else:
+            self.trace_out.write(JSONL_OPCODE_RECORD.format(
+                program_counter, self.names[op_code], cycles))
+
+    def close(self):
+        """Flushes the buffered records and closes the trace file
+
+        Keyword arguments:
+        None
+
+        Returns: None
+        """
+        self.trace_out.close()
+
+
+def traced_dispatch_table(dispatch_table, sink):
+    """Wraps every handler of a dispatch table so that it
+       records the instruction in the sink.  Every wrapped
+       entry is marked as control flow so the handler receives
+       the PC and returns the next one.
+
+       Keyword arguments:
+       dispatch_table -- op_code indexed dispatch table
+       sink -- TraceSink receiving the records
+
+       Return: List
+    """
+    traced_table = []
+
+    for op_code, entry in enumerate(dispatch_table):
+        if entry is None or entry[0] is None:
+            traced_table.append(entry)
+            continue
+
+        (handler, latency, stat_slot, control_flow, operand_count) = entry
+        if control_flow:
+            traced = trace_control_flow(handler, op_code, latency, sink)
+        else:
+            traced = trace_sequential(handler, op_code, latency, sink)
+        traced_table.append((traced, latency, stat_slot, True,
+                             operand_count))
+
+    return traced_table
+
+
+def trace_control_flow(handler, op_code, latency, sink):
+    """Builds a traced handler for a control flow instruction
+
+       Keyword arguments:
+       handler -- handler returning the next PC
+       op_code -- op_code of the instruction
+       latency -- cycles taken by the instruction
+       sink -- TraceSink receiving the records
+
+       Return: function
+    """
+    def traced(*operands):
+        next_pc = handler(*operands)
+        sink.record(operands[-1], op_code, latency)
+        return next_pc
+
+    return traced
+
+
+def trace_sequential(handler, op_code, latency, sink):
+    """Builds a traced handler for an instruction that falls
+       through to the next PC
+
+       Keyword arguments:
+       handler -- handler that does not take the PC
+       op_code -- op_code of the instruction
+       latency -- cycles taken by the instruction
+       sink -- TraceSink receiving the records
+
+       Return: function
+    """
+    def traced(*operands):
+        program_counter = operands[-1]
+        handler(*operands[:-1])
+        sink.record(program_counter, op_code, latency)
+        return program_counter + 1
+
+    return traced
@@ -0,0 +1,176 @@
+#!/usr/bin/python
+"""
+Project: xsim simulator
+Module:  xsim_watchdog
+Course:  CS2410
+
+Instruction and cycle budgets, a wall clock timeout and progress
+records for xsim runs.  The engines never test the watchdog per
+instruction.  They run until the instruction count the watchdog
+asks to be called back at and only then check it, so the budgets
+are exact and an unbounded run costs nothing.
+"""
+
+import json
+import time
+
+# DEFINES
+# Instructions between two checks of the wall clock
+CHECK_INTERVAL = 1 << 16
+
+# Abort reasons
+ABORT_INSTRUCTIONS = 'instruction budget'
+ABORT_CYCLES = 'cycle budget'
+ABORT_TIMEOUT = 'timeout'
+ABORT_PC = 'PC outside instruction memory'
+
+
+class Watchdog:
+    """Watchdog Class that holds the budgets of a run and
+    writes its progress records
+    """
+
+    def __init__(self, max_instructions=None, max_cycles=None, timeout=None,
+                 progress_interval=None, progress_out=None):
+        self.max_instructions = max_instructions
+        self.max_cycles = max_cycles
+        self.timeout = timeout
+        self.progress_interval = progress_interval
+        self.progress_out = progress_out
+        self.max_latency = 1
+        self.start_time = 0
+        self.last_time = 0
+        self.last_instructions = 0
+
+    def start(self, max_latency, instruction_count):
+        """Starts the clock of a run
+
+        Keyword arguments:
+        max_latency -- largest latency of any instruction
+        instruction_count -- instructions executed before the run
+
+        Returns: None
+        """
+        self.max_latency = max_latency
+        self.start_time = time.perf_counter()
+        self.last_time = self.start_time
+        self.last_instructions = instruction_count
+
+    def next_check(self, instruction_count, clock_cycles):
+        """Gets the instruction count the engine has to check
+        the watchdog at.  Every instruction takes at least one
+        and at most max_latency cycles, so stopping after
+        remaining cycles / max_latency instructions never runs
+        past the cycle budget.
+
+        Keyword arguments:
+        instruction_count -- instructions executed so far
+        clock_cycles -- cycles simulated so far
+
+        Returns: int
+        """
+        limits = []
+
+        if self.max_instructions is not None:
+            limits.append(max(self.max_instructions, instruction_count))
+        if self.max_cycles is not None:
+            remaining = self.max_cycles - clock_cycles
+            limits.append(instruction_count +
+                          max(0, remaining // self.max_latency) +
+                          (0 < remaining < self.max_latency))
+        if self.timeout is not None:
+            limits.append(instruction_count + CHECK_INTERVAL)
+        if self.progress_interval is not None:
+            limits.append((instruction_count // self.progress_interval + 1) *
+                          self.progress_interval)
+
+        return min(limits)
+
+    def check(self, program_counter, instruction_count, clock_cycles):
+        """Writes a progress record when one is due and checks
+        the budgets
+
+        Keyword arguments:
+        program_counter -- PC of the next instruction
+        instruction_count -- instructions executed so far
+        clock_cycles -- cycles simulated so far
+
+        Returns: String reason to abort the run or None
+        """
+        now = time.perf_counter()
+
+        if (self.progress_interval is not None and
+                instruction_count % self.progress_interval == 0 and
+                instruction_count != self.last_instructions):
+            interval_time = max(now - self.last_time, 1e-9)
+            self.progress_out.write(json.dumps({
+                'instructions': instruction_count,
+                'cycles': clock_cycles,
+                'pc': program_counter,
+                'elapsed': round(now - self.start_time, 6),
+                'instructions_per_second': round(
+                    (instruction_count - self.last_instructions) /
+                    interval_time)}) + '\n')
+            self.progress_out.flush()
+            self.last_time = now
+            self.last_instructions = instruction_count
+
+        if (self.max_instructions is not None and
+                instruction_count >= self.max_instructions):
+            return ABORT_INSTRUCTIONS
+        if self.max_cycles is not None and clock_cycles >= self.max_cycles:
+            return ABORT_CYCLES
+        if (self.timeout is not None and
+                now - self.start_time >= self.timeout):
+            return ABORT_TIMEOUT
+
+        return None
+
+
+def max_latency(dispatch_table, max_stall=0):
+    """Gets the largest number of cycles one instruction of
+       a dispatch table can take
+
+       Keyword arguments:
+       dispatch_table -- op_code indexed dispatch table
+       max_stall -- most stall cycles the timing models can add
+                    to one instruction
+
+       Return: int
+    """
+    return max([entry[1] for entry in dispatch_table if entry is not None] +
+               [1]) + max_stall
+
+
+def run_limit(stop_instruction, watchdog, instruction_count, clock_cycles):
+    """Gets the instruction count an engine runs to before
+       it stops or checks the watchdog
+
+       Keyword arguments:
+       stop_instruction -- instruction count to stop at or None
+       watchdog -- Watchdog of the run or None
+       instruction_count -- instructions executed so far
+       clock_cycles -- cycles simulated so far
+
+       Return: int or None when the run is unbounded
+    """
+    limit = stop_instruction
+    if watchdog is not None:
+        check = watchdog.next_check(instruction_count, clock_cycles)
+        if limit is None or check < limit:
+            limit = check
+
+    return limit
+
+
+def abort_record(reason, program_counter):
+    """Builds the record of an aborted run added to its
+       statistics
+
+       Keyword arguments:
+       reason -- reason the run was aborted
+       program_counter -- PC of the next instruction
+
+       Return: List
+    """
+    return [{'reason': reason, 'pc': program_counter}]
@@ -8,6 +8,7 @@ Date: 23 October 2016
 import sys
 import pytest
 from xsim import *
+import packed_trace
 
 from bitstring import Bits
 
@@ -757,3 +758,25 @@ def test_sw_instruction():
     return_value = store_word(store_word_fields)
 
     assert expected_value == return_value 
+
+
+def test_tomsim_trace_formats(tmp_path):
+    """Tests that the hex and packed tomsim traces hold the
+       same instructions and leave out resolved branches
+    """
+    config_file = 'configs/config_1.json'
+    input_file = str(tmp_path / 'loop.txt')
+    # r1 = 1, r2 = 2, loop: r2 = r2 - r1, bp r2 loop, halt
+    with open(input_file, 'w') as loop:
+        loop.write('\n'.join(['8101', '8202', '0A44', 'A202', '6800']))
+    hex_file = str(tmp_path / 'loop.t')
+    packed_file = str(tmp_path / 'loop.xpt')
+
+    xsim(config_file, input_file, None, hex_file)
+    xsim(config_file, input_file, None, packed_file, 'packed')
+
+    with open(hex_file) as hex_trace:
+        assert (['8101', '8202', '0A44', '0A44', '6800'] ==
+                hex_trace.read().split())
+    assert ([0x8101, 0x8202, 0x0A44, 0x0A44, 0x6800] ==
+            list(packed_trace.read_packed(packed_file)))
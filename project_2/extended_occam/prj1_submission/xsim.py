@@ -6,40 +6,98 @@ Author:  Cyrus Ramavarapu
 Date:    22 October 2016
 """
 
+import os
 import sys
 import json
+import struct
+import argparse
 
 from pprint import pprint
 from bitstring import Bits
 
+# packed_trace.py is shared with xsim and tomsim and lives in
+# project_1
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, os.pardir, os.pardir, 'project_1'))
+
+import packed_trace
+
 # DEFINES
 WORD_SIZE = 1
 
+# Branches and jumps are resolved here and left out of the
+# tomsim trace
+INVALID_OPCODES = ['10100', '10110', '10111', '01100', '10011', '11000']
+TRACE_FORMATS = ['hex', 'packed']
+BUFFER_SIZE = 1 << 20
+PACKED_WORD = struct.Struct('<H')
+
 # GLOBALS
 REGISTER_FILE = {}
 DATA_MEMORY = {}
 STATISTICS_DICT = {}
 
 
-def create_tom_sim_trace(opcode, instruction, outfile):
+class TomsimTrace:
+    """TomsimTrace Class that buffers the retired instructions
+    tomsim can simulate and writes them as a hex or packed trace
     """
-    Prints out instructions for tomsim from
-    xsim hex
-    
-    Keyword arguments:
-    opcode -- opcode for the instruction
-    instruction -- hex version of the instruction
-    outfile -- the outfile name 
-    
-    Returns: None 
-    """
-    invalid_opcodes = ['10100', '10110', '10111', '01100', '10011', '11000']      
-    hex_instruction = hex(int(instruction, 2))[2:].upper().zfill(4)   
-   
-    if opcode not in invalid_opcodes:
-        with open(outfile, 'a') as trace_out:
-            print(hex_instruction, file=trace_out)     
-    
+
+    def __init__(self, trace_file, trace_format='hex'):
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError('unknown trace format {}'.format(trace_format))
+
+        self.trace_format = trace_format
+        self.trace_out = open(trace_file, 'wb', buffering=BUFFER_SIZE)
+
+        if trace_format == 'packed':
+            self.trace_out.write(packed_trace.PACKED_HEADER.pack(
+                packed_trace.PACKED_MAGIC, packed_trace.PACKED_VERSION, 0))
+
+    def encode(self, instruction):
+        """Encodes an instruction as its trace record once so
+        recording it is a single buffered write
+
+        Keyword arguments:
+        instruction -- binary string of the instruction
+
+        Returns: bytes or None for instructions tomsim does not
+                 simulate
+        """
+        if instruction[0:5] in INVALID_OPCODES:
+            return None
+        if self.trace_format == 'packed':
+            return PACKED_WORD.pack(int(instruction, 2))
+        return '{:04X}\n'.format(int(instruction, 2)).encode()
+
+    def record(self, trace_record):
+        """Records a retired instruction
+
+        Keyword arguments:
+        trace_record -- record of the instruction from encode
+
+        Returns: None
+        """
+        self.trace_out.write(trace_record)
+
+    def close(self):
+        """Flushes the buffered records, fills in the instruction
+        count of a packed trace and closes the trace file
+
+        Keyword arguments:
+        None
+
+        Returns: None
+        """
+        if self.trace_format == 'packed':
+            trace_bytes = self.trace_out.tell()
+            self.trace_out.seek(0)
+            self.trace_out.write(packed_trace.PACKED_HEADER.pack(
+                packed_trace.PACKED_MAGIC, packed_trace.PACKED_VERSION,
+                (trace_bytes - packed_trace.PACKED_HEADER.size) //
+                PACKED_WORD.size))
+        self.trace_out.close()
+
 
 def configure_latency(config_file):
     """Configures the latencies for the processor simulation
@@ -594,7 +652,8 @@ def put_register(data_fields):
     return REGISTER_FILE[Rs]
 
 
-def xsim(config_file, input_file, output_file):
+def xsim(config_file, input_file, output_file, trace_file=None,
+         trace_format='hex'):
     """Run the simulation of the X isa for given
        configuration and input file and maintain stats
 
@@ -602,6 +661,8 @@ def xsim(config_file, input_file, output_file):
        config_file -- JSON file containing latency configurations
        input_file -- list of instructions and comments in ASCII Hex
        output_file -- output file for simulation statistics
+       trace_file -- file for the tomsim trace, no trace if None
+       trace_format -- 'hex' or 'packed' tomsim trace
 
        Return: None
     """
@@ -613,143 +674,156 @@ def xsim(config_file, input_file, output_file):
     clock_cycles = 0
     instruction_count = 0
 
-    while True:
-        current_instruction = instruction_memory[program_counter]
-        op_code = current_instruction[0:5]
-        data_fields = current_instruction[5:16]
-        instruction_count += 1
-    
-        create_tom_sim_trace(op_code, current_instruction, output_file) 
-
-        if op_code == '00000':
-            add_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['add']
-            STATISTICS_DICT['stats'][0]['add'] += 1
-            print('ADD')
-        elif op_code == '00001':
-            sub_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['sub']
-            STATISTICS_DICT['stats'][0]['sub'] += 1
-            print('SUB')
-        elif op_code == '00010':
-            and_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['and']
-            STATISTICS_DICT['stats'][0]['and'] += 1
-            print('AND')
-        elif op_code == '00011':
-            nor_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['nor']
-            STATISTICS_DICT['stats'][0]['nor'] += 1
-            print('NOR')
-        elif op_code == '00100':
-            div_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['div']
-            STATISTICS_DICT['stats'][0]['div'] += 1
-            print('DIV')
-        elif op_code == '00101':
-            mul_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['mul']
-            STATISTICS_DICT['stats'][0]['mul'] += 1
-            print('MUL')
-        elif op_code == '00110':
-            mod_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['mod']
-            STATISTICS_DICT['stats'][0]['mod'] += 1
-            print('MOD')
-        elif op_code == '00111':
-            exp_instruction(data_fields)
-            program_counter += 1
-            clock_cycles += latency_dict['exp']
-            STATISTICS_DICT['stats'][0]['exp'] += 1
-            print('EXP')
-        elif op_code == '01000':
-            load_word(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['lw'] += 1
-            print('LW')
-        elif op_code == '01001':
-            store_word(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['sw'] += 1
-            print('SW')
-        elif op_code == '10000':
-            liz(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['liz'] += 1
-            print('LIZ')
-        elif op_code == '10001':
-            lis(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['lis'] += 1
-            print('LIS')
-        elif op_code == '10010':
-            lui(data_fields)
-            program_counter += 1
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['lui'] += 1
-            print('LUI')
-        elif op_code == '10100':
-            program_counter = branch_positive(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['bp'] += 1
-            print('BP')
-        elif op_code == '10101':
-            program_counter = branch_negative(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['bn'] += 1
-            print('BN')
-        elif op_code == '10110':
-            program_counter = branch_nzero(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['bx'] += 1
-            print('BX')
-        elif op_code == '10111':
-            program_counter = branch_zero(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['bz'] += 1
-            print('BZ')
-        elif op_code == '01100':
-            program_counter = jump_register(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['jr'] += 1
-            print('JR')
-        elif op_code == '10011':
-            program_counter = jump_and_link_register(
-                data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['jalr'] += 1
-            print('JALR')
-        elif op_code == '11000':
-            program_counter = jump_immediate(data_fields, program_counter)
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['j'] += 1
-            print('J')
-        elif op_code == '01101':
-            print('HALT')
-            clock_cycles += 1
-            STATISTICS_DICT['stats'][0]['halt'] += 1
-            break
-        elif op_code == '01110':
-            put_register(data_fields) 
-            print('PUT')
-            clock_cycles += 1
-            program_counter += 1
-            STATISTICS_DICT['stats'][0]['put'] += 1
-        else:
-            print('ERROR: UNRECOGNZIED OPCODE {}'.format(op_code),
-                  file=sys.stderr)
-            break
+    trace = None
+    if trace_file is not None:
+        trace = TomsimTrace(trace_file, trace_format)
+        trace_records = [trace.encode(instruction)
+                         for instruction in instruction_memory]
+
+    try:
+        while True:
+            current_instruction = instruction_memory[program_counter]
+            op_code = current_instruction[0:5]
+            data_fields = current_instruction[5:16]
+            instruction_count += 1
+
+            if trace is not None:
+                trace_record = trace_records[program_counter]
+                if trace_record is not None:
+                    trace.record(trace_record)
+
+            if op_code == '00000':
+                add_instruction(data_fields)
+                program_counter += 1
+                clock_cycles += latency_dict['add']
+                STATISTICS_DICT['stats'][0]['add'] += 1
+                print('ADD')
+            elif op_code == '00001':
+                sub_instruction(data_fields)
+                program_counter += 1
+                clock_cycles += latency_dict['sub']
+                STATISTICS_DICT['stats'][0]['sub'] += 1
+                print('SUB')
+            elif op_code == '00010':
+                and_instruction(data_fields)
+                program_counter += 1
+                clock_cycles += latency_dict['and']
+                STATISTICS_DICT['stats'][0]['and'] += 1
+                print('AND')
+            elif op_code == '00011':
+                nor_instruction(data_fields)
+                program_counter += 1
+                clock_cycles += latency_dict['nor']
+                STATISTICS_DICT['stats'][0]['nor'] += 1
+                print('NOR')
+            elif op_code == '00100':
+                div_instruction(data_fields)
+                program_counter += 1
+                clock_cycles += latency_dict['div']
+                STATISTICS_DICT['stats'][0]['div'] += 1
+                print('DIV')
+            elif op_code == '00101':
+                mul_instruction(data_fields)
+                program_counter += 1
+                clock_cycles += latency_dict['mul']
+                STATISTICS_DICT['stats'][0]['mul'] += 1
+                print('MUL')
+            elif op_code == '00110':
+                mod_instruction(data_fields)
+                program_counter += 1
+                clock_cycles += latency_dict['mod']
+                STATISTICS_DICT['stats'][0]['mod'] += 1
+                print('MOD')
+            elif op_code == '00111':
+                exp_instruction(data_fields)
+                program_counter += 1
+                clock_cycles += latency_dict['exp']
+                STATISTICS_DICT['stats'][0]['exp'] += 1
+                print('EXP')
+            elif op_code == '01000':
+                load_word(data_fields)
+                program_counter += 1
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['lw'] += 1
+                print('LW')
+            elif op_code == '01001':
+                store_word(data_fields)
+                program_counter += 1
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['sw'] += 1
+                print('SW')
+            elif op_code == '10000':
+                liz(data_fields)
+                program_counter += 1
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['liz'] += 1
+                print('LIZ')
+            elif op_code == '10001':
+                lis(data_fields)
+                program_counter += 1
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['lis'] += 1
+                print('LIS')
+            elif op_code == '10010':
+                lui(data_fields)
+                program_counter += 1
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['lui'] += 1
+                print('LUI')
+            elif op_code == '10100':
+                program_counter = branch_positive(data_fields, program_counter)
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['bp'] += 1
+                print('BP')
+            elif op_code == '10101':
+                program_counter = branch_negative(data_fields, program_counter)
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['bn'] += 1
+                print('BN')
+            elif op_code == '10110':
+                program_counter = branch_nzero(data_fields, program_counter)
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['bx'] += 1
+                print('BX')
+            elif op_code == '10111':
+                program_counter = branch_zero(data_fields, program_counter)
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['bz'] += 1
+                print('BZ')
+            elif op_code == '01100':
+                program_counter = jump_register(data_fields, program_counter)
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['jr'] += 1
+                print('JR')
+            elif op_code == '10011':
+                program_counter = jump_and_link_register(
+                    data_fields, program_counter)
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['jalr'] += 1
+                print('JALR')
+            elif op_code == '11000':
+                program_counter = jump_immediate(data_fields, program_counter)
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['j'] += 1
+                print('J')
+            elif op_code == '01101':
+                print('HALT')
+                clock_cycles += 1
+                STATISTICS_DICT['stats'][0]['halt'] += 1
+                break
+            elif op_code == '01110':
+                put_register(data_fields) 
+                print('PUT')
+                clock_cycles += 1
+                program_counter += 1
+                STATISTICS_DICT['stats'][0]['put'] += 1
+            else:
+                print('ERROR: UNRECOGNZIED OPCODE {}'.format(op_code),
+                      file=sys.stderr)
+                break
+    finally:
+        if trace is not None:
+            trace.close()
 
     STATISTICS_DICT['stats'][0]['instructions'] = instruction_count
     STATISTICS_DICT['stats'][0]['cycles'] = clock_cycles
@@ -759,14 +833,39 @@ def xsim(config_file, input_file, output_file):
 
     pprint(STATISTICS_DICT)
 
+def parse_arguments(argv):
+    """Parses the command line arguments
+
+       Keyword arguments:
+       argv -- list of command line arguments sans program name
+
+       Return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog='./xsim',
+        usage='./xsim inputfile configfile outputstatsfile [options]')
+    parser.add_argument('input_file')
+    parser.add_argument('config_file')
+    parser.add_argument('output_file')
+    parser.add_argument('--trace-file',
+                        help='tomsim trace file (default: outputstatsfile)')
+    parser.add_argument('--trace-format', choices=TRACE_FORMATS,
+                        default='hex',
+                        help='hex lines or packed 16 bit words '
+                             '(default: hex)')
+    parser.add_argument('--no-trace', action='store_true',
+                        help='do not write a tomsim trace')
+
+    return parser.parse_args(argv)
+
+
 if __name__ == '__main__':
 
-    if len(sys.argv) is not 4:
-        print("Usage: ./xsim inputfile configfile outputstatsfile")
-        exit(1)
+    ARGS = parse_arguments(sys.argv[1:])
 
-    INPUT_FILE = sys.argv[1]
-    CONFIG_FILE = sys.argv[2]
-    OUTPUT_FILE = sys.argv[3]
+    TRACE_FILE = ARGS.trace_file or ARGS.output_file
+    if ARGS.no_trace:
+        TRACE_FILE = None
 
-    xsim(CONFIG_FILE, INPUT_FILE, OUTPUT_FILE)
+    xsim(ARGS.config_file, ARGS.input_file, ARGS.output_file, TRACE_FILE,
+         ARGS.trace_format)
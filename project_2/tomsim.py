@@ -6,13 +6,26 @@ Author:  Cyrus Ramavarapu
 Date:    19 November 2016
 """
 
+import os
 import sys
 import json
+import argparse
 
+from heapq import heapify, heappop, heappush
+from collections import Counter, defaultdict, deque
+from itertools import islice
+from operator import itemgetter
 from pprint import pprint
 from PipeEvent import PipeEvent
 from FunctionalUnit import FunctionalUnit
 
+# packed_trace.py is shared with xsim and lives in project_1
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'project_1'))
+
+import packed_trace
+import xsim_stream
+
 
 # DEFINES
 BUSY = 1
@@ -55,8 +68,27 @@ REGISTER_FILE = {'r0': 0,
                  'r6': 0,
                  'r7': 0}
 
-# EVENT QUEUE
-EVENT_QUEUE = []
+# EVENT QUEUES
+# Every stage holds (end cycle, issue cycle, event) entries.  Read
+# operand events wait in a heap until the cycle their operands are
+# checked, executing events in a heap until their execution ends and
+# write operand events write back on the next cycle.  At most one
+# instruction issues per cycle, so the issue cycle keeps events of
+# the same end cycle in program order.
+READ_OPERANDS = []
+EXECUTING = []
+WRITING = []
+
+# Number of executing events of every original destination register
+EXEC_DESTS = Counter()
+
+# WAKEUP LISTS
+# Operand slots (event, 1 or 2) of the read operand events waiting on
+# every renamed register, filled at issue
+WAKEUP = defaultdict(list)
+
+# Decoded instructions waiting to issue
+LOOKAHEAD = 64
 
 # OPCODE MAPPING
 
@@ -76,6 +108,40 @@ OPCODE_MAP = {'00000': 'add',
               '01101': 'halt',
               '01110': 'put'}
 
+# Reservation station and functional unit class of every operation
+OPCODE_CLASS = {'add': 'INT',
+                'sub': 'INT',
+                'nor': 'INT',
+                'and': 'INT',
+                'lis': 'INT',
+                'liz': 'INT',
+                'lui': 'INT',
+                'put': 'INT',
+                'halt': 'INT',
+                'div': 'DIV',
+                'exp': 'DIV',
+                'mod': 'DIV',
+                'mul': 'MULT',
+                'lw': 'LD',
+                'sw': 'ST'}
+
+# Reservation stations and functional units of every class
+RES_STATIONS = {'INT': INT_RS,
+                'DIV': DIV_RS,
+                'MULT': MULT_RS,
+                'LD': LD_RS,
+                'ST': ST_RS}
+FUNC_UNITS = {'INT': INTEGER,
+              'DIV': DIVIDER,
+              'MULT': MULTIPLIER,
+              'LD': LOAD,
+              'ST': STORE}
+
+# Bitmasks of the free reservation stations and functional units of
+# every class, bit i set when position i is FREE
+FREE_RS = dict.fromkeys(RES_STATIONS, 0)
+FREE_UNITS = dict.fromkeys(FUNC_UNITS, 0)
+
 # REG_FILE READ COUNT
 REG_FILE_READS = 0
 
@@ -103,10 +169,10 @@ def check_reg_file(source_reg):
     """
     global REG_FILE_READS
 
-    if REGISTER_FILE[source_reg] == 1:
+    if REGISTER_FILE.get(source_reg) == 1:
         REG_FILE_READS += 1
     
-    return REGISTER_FILE[source_reg]
+    return REGISTER_FILE.get(source_reg, 0)
 
 
 def process_statistics(current_cycle, stalls):
@@ -166,42 +232,32 @@ def process_statistics(current_cycle, stalls):
 
 
 def parse_trace(trace_file):
-    """Parses the trace TEXT file into an array
-    for processing during the simulation
+    """Loads the hex TEXT or packed trace file into
+    an array for processing during the simulation
 
     Keyword arguments:
     trace_file -- the trace on instructions to simulate
 
-    Returns: List
+    Returns: Sequence of 16 bit instruction words
     """
 
-    instructions = []
-
-    with open(trace_file) as instruction_trace:
-        for line in instruction_trace:
-            if line[0] is not '#':
-                line = line.strip()
-                binary_value = bin(int(line, 16))[2:].zfill(16)
-                instructions.append(binary_value)
-
-    return instructions
+    return packed_trace.load_trace(trace_file)
 
 
-def get_instruction(instructions, instruction_count):
-    """Gets the next instruction and produces
-    the type and source operands
+def decode_instruction(next_instruction, address=None):
+    """Decodes a binary instruction into its type
+    and source operands
 
     Keyword arguments:
-    instructions -- the array of instructions
-    instructions_count -- the index of the next instruction
-
+    next_instruction -- binary string of the instruction
+    address -- word address of a load or store, if known.
+               Memory is named by the base register otherwise.
 
     Return: Tuple
     """
 
     i_type = ['liz', 'lis', 'lui']
 
-    next_instruction = instructions[instruction_count]
     opcode = next_instruction[0:5]
 
     instruction_type = OPCODE_MAP[opcode]
@@ -209,6 +265,11 @@ def get_instruction(instructions, instruction_count):
     source_1_status = 0
     source_2_status = 0
 
+    if address is None:
+        memory = ''.join(['MEM_', 'r', str(int(next_instruction[8:11], 2))])
+    else:
+        memory = ''.join(['MEM_', str(address)])
+
     if instruction_type in i_type:
         dest = ''.join(['r', str(int(next_instruction[5:8], 2))])
         # USE 'IMM8' to recoginize that the source operand
@@ -231,12 +292,12 @@ def get_instruction(instructions, instruction_count):
         source_2_status = 1
     elif instruction_type is 'lw':
         dest = ''.join(['r', str(int(next_instruction[5:8], 2))])
-        source_1 = ''.join(['MEM_', 'r', str(int(next_instruction[8:11], 2))])
+        source_1 = memory
         source_2 = None
         source_1_status = 0
         source_2_status = 1
     elif instruction_type is 'sw':
-        dest = ''.join(['MEM_', 'r', str(int(next_instruction[8:11], 2))])
+        dest = memory
         source_1 = ''.join(['r', str(int(next_instruction[11:14], 2))])
         source_2 = None
         source_1_status = 0
@@ -257,6 +318,102 @@ def get_instruction(instructions, instruction_count):
         source_2_status)
 
 
+def decode_trace(instructions):
+    """Decodes every distinct instruction of the trace
+    once and yields the decoded records in trace order
+
+    Keyword arguments:
+    instructions -- the array of 16 bit instruction words
+
+    Returns: Generator of Tuple
+    """
+    decoded = {}
+    for instruction in instructions:
+        if instruction not in decoded:
+            decoded[instruction] = decode_instruction(
+                format(instruction, '016b'))
+        yield decoded[instruction]
+
+
+def decode_retired(retired):
+    """Decodes the instructions retired by the functional
+    simulator.  Branches and jumps were resolved when they
+    retired and are not issued.  Loads and stores name the
+    memory word they access.
+
+    Keyword arguments:
+    retired -- generator of retired instruction records
+
+    Returns: Generator of Tuple
+    """
+    decoded = {}
+    for (_, instruction, _, address) in retired:
+        key = (instruction, address)
+        if key not in decoded:
+            binary_value = format(instruction, '016b')
+            if binary_value[0:5] in OPCODE_MAP:
+                decoded[key] = decode_instruction(binary_value, address)
+            else:
+                decoded[key] = None
+        if decoded[key] is not None:
+            yield decoded[key]
+
+
+def fill_window(window, instructions):
+    """Pulls decoded instructions into the issue window
+    until it holds LOOKAHEAD instructions or the
+    instructions run out
+
+    Keyword arguments:
+    window -- deque of instructions waiting to issue
+    instructions -- iterator of decoded instructions
+
+    Returns: None
+    """
+    window.extend(islice(instructions, LOOKAHEAD - len(window)))
+
+
+def init_simulation():
+    """Resets every functional unit, reservation station,
+    renaming map, register and event so that a simulation
+    can run more than once in the same process
+
+    Keyword arguments:
+    None
+
+    Returns: None
+    """
+    global INT_RS_MAX
+    global DIV_RS_MAX
+    global MULT_RS_MAX
+    global LD_RS_MAX
+    global ST_RS_MAX
+    global REG_FILE_READS
+
+    for unit_list in [INTEGER, DIVIDER, MULTIPLIER, LOAD, STORE,
+                      INT_RS, DIV_RS, MULT_RS, LD_RS, ST_RS,
+                      READ_OPERANDS, EXECUTING, WRITING]:
+        del unit_list[:]
+
+    INT_RS_MAX = 0
+    DIV_RS_MAX = 0
+    MULT_RS_MAX = 0
+    LD_RS_MAX = 0
+    ST_RS_MAX = 0
+
+    REG_RENAME.clear()
+    RES_STATUS.clear()
+    EXEC_DESTS.clear()
+    WAKEUP.clear()
+    for unit_class in FREE_RS:
+        FREE_RS[unit_class] = 0
+        FREE_UNITS[unit_class] = 0
+    for register in REGISTER_FILE:
+        REGISTER_FILE[register] = 0
+
+    REG_FILE_READS = 0
+
+
 def parse_config(config_file):
     """Parses the config JSON file into a dictionary
        to initialize the simulation
@@ -332,6 +489,10 @@ def parse_config(config_file):
         else:
             print('INVALID UNIT')
 
+    for unit_class in FREE_RS:
+        FREE_RS[unit_class] = (1 << len(RES_STATIONS[unit_class])) - 1
+        FREE_UNITS[unit_class] = (1 << len(FUNC_UNITS[unit_class])) - 1
+
 
 def get_unit_statistics():
     """Displays the statistics for all functional
@@ -367,7 +528,8 @@ def get_unit_statistics():
 def get_resv_station(op_name):
     """Checks if a reservation station is available
     and if it is fills in reservation station with the
-    given operation
+    given operation.  The free station with the lowest
+    position is taken.
 
     Keyword arguments:
     op_name -- the name of the operation
@@ -375,50 +537,16 @@ def get_resv_station(op_name):
     Returns: Tuple of RS type and Int of position in RS if successful otherwise None, -1
     """
 
-    int_operations = [
-        'add',
-        'sub',
-        'nor',
-        'and',
-        'lis',
-        'liz',
-        'lui',
-        'put',
-        'halt']
-    div_operations = ['div', 'exp', 'mod']
-    ret_val = ('STALL', -1)
-
-    if op_name in int_operations:
-        for i in range(INT_RS_MAX):
-            if INT_RS[i] == FREE:
-                INT_RS[i] = BUSY
-                ret_val = ('INT', i)
-                break
-    elif op_name in div_operations:
-        for i in range(DIV_RS_MAX):
-            if DIV_RS[i] == FREE:
-                DIV_RS[i] = BUSY
-                ret_val = ('DIV', i)
-                break
-    elif op_name is 'mul':
-        for i in range(MULT_RS_MAX):
-            if MULT_RS[i] == FREE:
-                MULT_RS[i] = BUSY
-                ret_val = ('MULT', i)
-                break
-    elif op_name is 'lw':
-        for i in range(LD_RS_MAX):
-            if LD_RS[i] == FREE:
-                LD_RS[i] = BUSY
-                ret_val = ('LD', i)
-                break
-    else:
-        for i in range(ST_RS_MAX):
-            if ST_RS[i] == FREE:
-                ST_RS[i] = BUSY
-                ret_val = ('ST', i)
-                break
-    return ret_val
+    res_class = OPCODE_CLASS[op_name]
+    free = FREE_RS[res_class]
+    if not free:
+        return ('STALL', -1)
+
+    position = (free & -free).bit_length() - 1
+    FREE_RS[res_class] = free & (free - 1)
+    RES_STATIONS[res_class][position] = BUSY
+
+    return (res_class, position)
 
 
 def rename_register(dest_reg, resv_name, res_pos):
@@ -456,10 +584,12 @@ def rename_sources(s1_name, s2_name):
     else:
         s1_renamed = 'REG_FILE'
 
-    if s2_name is not None:
+    if s2_name is None:
+        s2_renamed = None
+    elif s2_name in REG_RENAME:
         s2_renamed = REG_RENAME[s2_name]
     else:
-        s2_renamed = None
+        s2_renamed = 'REG_FILE'
 
     return (s1_renamed, s2_renamed)
 
@@ -490,31 +620,38 @@ def free_units(location, position, fu_pos):
     Returns: None
     """
 
-    if location is 'INT':
-        INT_RS[position] = FREE
-        INTEGER[fu_pos].set_status(FREE)
-        INTEGER[fu_pos].increment_instr()
-    elif location is 'DIV':
-        DIV_RS[position] = FREE
-        DIVIDER[fu_pos].set_status(FREE)
-        DIVIDER[fu_pos].increment_instr()
-    elif location is 'MULT':
-        MULT_RS[position] = FREE
-        MULTIPLIER[fu_pos].set_status(FREE)
-        MULTIPLIER[fu_pos].increment_instr()
-    elif location is 'LD':
-        LD_RS[position] = FREE
-        LOAD[fu_pos].set_status(FREE)
-        LOAD[fu_pos].increment_instr()
-    else:
-        ST_RS[position] = FREE
-        STORE[fu_pos].set_status(FREE)
-        STORE[fu_pos].increment_instr()
+    RES_STATIONS[location][position] = FREE
+    FREE_RS[location] |= 1 << position
+
+    func_unit = FUNC_UNITS[location][fu_pos]
+    func_unit.set_status(FREE)
+    func_unit.increment_instr()
+    FREE_UNITS[location] |= 1 << fu_pos
+
+
+def wait_for_sources(event):
+    """Adds the operands of a newly issued event that are
+    not available yet to the wakeup lists of the renamed
+    registers producing them
+
+    Keyword arguments:
+    event -- PipeEvent in the READ_OPERAND phase
+
+    Returns: None
+    """
+    (source_1, source_2) = event.get_sources()
+    (s1_stat, s2_stat) = event.get_source_statuses()
+
+    if s1_stat != 1:
+        WAKEUP[source_1].append((event, 1))
+
+    if s2_stat != 1:
+        WAKEUP[source_2].append((event, 2))
 
 
 def broadcast(renamed_reg, status):
     """Broadcasts the value of the renameded reg
-    to all RO events that might need the value
+    to the RO events on its wakeup list
 
     Keyword arguments:
     renamed_reg -- name of the renamed register
@@ -524,27 +661,21 @@ def broadcast(renamed_reg, status):
     Returns: None
     """
 
-    for event in EVENT_QUEUE:
-        if event.get_event() == 'RO':
-            (s1_stat, s2_stat) = event.get_source_statuses()
-            (source_1, source_2) = event.get_sources()
-
-            if s1_stat != 1 and source_1 == renamed_reg:
-                event.set_source_1_status(1)
-
-            if s2_stat != 1 and source_2 == renamed_reg:
-                event.set_source_2_status(1)
+    for (event, slot) in WAKEUP.pop(renamed_reg, ()):
+        if slot == 1:
+            event.set_source_1_status(status)
+        else:
+            event.set_source_2_status(status)
 
 # EVENT HANDLERS
 
 
 def write_op_handler(current_cycle):
-    """Handles WRITE_OPERAND events in the event queue.
-    If an event is found that can be processed on the
-    current clock cycle it will set the RS_STATUS
-    renamed register to True (1) and make the FU free
-    (NOT BUSY).  The event is then removed from the
-    EVENT QUEUE.
+    """Handles WRITE_OPERAND events, which all end on
+    the cycle after they were created.  Each sets the
+    RS_STATUS renamed register to True (1) and makes
+    the FU free (NOT BUSY).  The events are then
+    removed from the event queues.
 
     Keyword arguments:
     current_cycle -- the current cycle the simulation is
@@ -555,38 +686,31 @@ def write_op_handler(current_cycle):
     """
 
     events_processed = 0
-    queue_position = 0
-
-    events_for_removal = []
-
-    for event in EVENT_QUEUE:
-        if event.get_end() == current_cycle and event.get_event() == 'WO':
-            event_name = event.get_event()
-            fu_destination = event.get_destination()
-            (location, position) = event.get_resv_info()
-            (location, fu_id) = event.get_fu_info()
-            broadcast(fu_destination, 1)
-            update_reg_status(fu_destination, 1)
-            
-            org_dest = event.get_org_dest()
-            set_dest_value(org_dest, 1) 
-    
-            free_units(location, position, fu_id)
-            events_for_removal.append(event)
-            events_processed += 1
 
-    for removal in events_for_removal:
-        EVENT_QUEUE.remove(removal)
+    for (_, _, event) in WRITING:
+        fu_destination = event.get_destination()
+        (location, position) = event.get_resv_info()
+        (location, fu_id) = event.get_fu_info()
+        broadcast(fu_destination, 1)
+        update_reg_status(fu_destination, 1)
+
+        org_dest = event.get_org_dest()
+        set_dest_value(org_dest, 1)
+
+        free_units(location, position, fu_id)
+        events_processed += 1
+
+    del WRITING[:]
 
     return events_processed
 
 
 def exec_handler(current_cycle):
-    """Handles EXECUTE events in the event queue.
-    If an event is found that can be processed on
-    the current clock cycle it will upgrade the
-    event to the WRITE_OPERAND EVENT and mark
-    update the start and end times.
+    """Handles EXECUTE events.  The original destination
+    of every executing event is held at 0 in the register
+    file.  Events whose execution ends on the current
+    clock cycle are upgraded to the WRITE_OPERAND event
+    with updated start and end times.
 
     Keyword arguments:
     current_cycle -- the current cycle the simulation
@@ -597,48 +721,30 @@ def exec_handler(current_cycle):
     """
     events_processed = 0
 
-    for event in EVENT_QUEUE:
-        
-        if event.get_event() == 'EXEC':
-            REGISTER_FILE[event.get_org_dest()] = 0 
-            if event.get_end() == current_cycle:
-                event.update_event('WO')
-                event.update_start(current_cycle)
-                event.update_end(current_cycle + 1)
-                
-                events_processed += 1
-        
-        
-
-
-    return events_processed
-
-
-def check_sources(source_name):
-    """Checks the REGFILE status of the renamed registers
-    to determine if a queued event can proceed
-    from RO to EXEC with the necessary sources
+    for org_dest in EXEC_DESTS:
+        REGISTER_FILE[org_dest] = 0
 
-    Keyword arguments:
-    source_name -- name of the source
+    while EXECUTING and EXECUTING[0][0] <= current_cycle:
+        (_, issued, event) = heappop(EXECUTING)
+        org_dest = event.get_org_dest()
+        EXEC_DESTS[org_dest] -= 1
+        if not EXEC_DESTS[org_dest]:
+            del EXEC_DESTS[org_dest]
 
-    Return: Tuple with (s1 status, s2 status)
-    """
-    global REG_FILE_READS
+        event.update_event('WO')
+        event.update_start(current_cycle)
+        event.update_end(current_cycle + 1)
+        WRITING.append((current_cycle + 1, issued, event))
 
-    if source_name in RES_STATUS.keys():
-        source_status = RES_STATUS[source_name]
-        if source_status == 1:
-            REG_FILE_READS += 1
-    else:
-        source_status = 0
+        events_processed += 1
 
-    return source_status
+    return events_processed
 
 
 def find_func_unit(instr):
     """Finds an available functional unit for
-    the ready instruction.
+    the ready instruction, the free unit with
+    the lowest position.
 
     Keyword argument:
     instr -- the type of instruction being run
@@ -647,70 +753,28 @@ def find_func_unit(instr):
             and its latency. (-1,-1) if none found
     """
 
-    int_operations = [
-        'add',
-        'sub',
-        'nor',
-        'and',
-        'lis',
-        'liz',
-        'lui',
-        'put',
-        'halt']
-    div_operations = ['div', 'exp', 'mod']
-
-    fu_position = 0
-
-    if instr in int_operations:
-        for int_fu in INTEGER:
-            if int_fu.get_status() == FREE:
-                int_fu.set_status(BUSY)
-                return (fu_position, int_fu.get_latency())
-
-            fu_position += 1
-    elif instr in div_operations:
-        for div_fu in DIVIDER:
-            if div_fu.get_status() == FREE:
-                div_fu.set_status(BUSY)
-                return (fu_position, div_fu.get_latency())
-
-        fu_position += 1
-    elif instr is 'mul':
-        for mul_fu in MULTIPLIER:
-            if mul_fu.get_status() == FREE:
-                mul_fu.set_status(BUSY)
-                return (fu_position, mul_fu.get_latency())
-
-        fu_position += 1
-
-    elif instr is 'lw':
-        for ld_fu in LOAD:
-            if ld_fu.get_status() == FREE:
-                ld_fu.set_status(BUSY)
-                return (fu_position, ld_fu.get_latency())
-
-        fu_position += 1
+    unit_class = OPCODE_CLASS[instr]
+    free = FREE_UNITS[unit_class]
+    if not free:
+        return (-1, -1)
 
-    else:
-        for sw_fu in STORE:
-            if sw_fu.get_status() == FREE:
-                sw_fu.set_status(BUSY)
-                return (fu_position, sw_fu.get_latency())
-
-        fu_position += 1
+    fu_position = (free & -free).bit_length() - 1
+    FREE_UNITS[unit_class] = free & (free - 1)
+    func_unit = FUNC_UNITS[unit_class][fu_position]
+    func_unit.set_status(BUSY)
 
-    return (-1, -1)
+    return (fu_position, func_unit.get_latency())
 
 
 def read_op_handler(current_cycle):
     """Handles READ OPERAND events in the event queue.
-       If a read operand event is found, the necessary
-       sources are checked for availability.  If both
-       are already available, a functional unit is
-       checked for availablity and assigned if possible.
-       If sources are unavailable or FU not available,
-       event is updated as RO with only the end cycle
-       updated.
+       The events whose operands are checked on the current
+       cycle are handled oldest first.  If both sources
+       were woken up by a broadcast or were available at
+       issue, a functional unit is checked for
+       availablity and assigned if possible.  If sources
+       are unavailable or FU not available, the operands
+       are checked again two cycles later.
 
     Keyword arguments:
     current_cycle -- the current cycle the simulation is
@@ -719,35 +783,44 @@ def read_op_handler(current_cycle):
     Returns: Int indiciatng the number of events found
              and processed.
     """
+    events_processed = 0
+    retries = []
+
+    while READ_OPERANDS and READ_OPERANDS[0][0] == current_cycle:
+        (_, issued, event) = heappop(READ_OPERANDS)
+        if event.get_source_statuses() == (1, 1):
+            (pos, latency) = find_func_unit(event.get_instruction())
+            if pos != -1:
+                event.update_event('EXEC')
+                event.update_start(current_cycle)
+                event.update_end(current_cycle + latency)
+                event.set_fu_info(pos)
+                heappush(EXECUTING, (current_cycle + latency, issued, event))
+                EXEC_DESTS[event.get_org_dest()] += 1
+                events_processed += 1
+                continue
 
-    # Sorts all events by age in descending order.
-    # Read ops will therefore be handling in decreasing age
-    EVENT_QUEUE.sort(key=lambda x: x.get_age(current_cycle), reverse=True)
+        event.update_end(current_cycle + 2)
+        retries.append((current_cycle + 2, issued, event))
 
-    for event in EVENT_QUEUE:
-        if event.get_event() == 'RO': 
-            if event.get_end() == current_cycle:
-                (s1, s2) = event.get_sources()
-                (s1_status, s2_status) = event.get_source_statuses()
+    for retry in retries:
+        heappush(READ_OPERANDS, retry)
 
-                if s1_status != 1:
-                    s1_status = check_sources(s1)
-                    event.set_source_1_status(s1_status)
+    return events_processed
 
-                if s2_status != 1:
-                    s2_status = check_sources(s2)
-                    event.set_source_2_status(s2_status)
 
-                if event.get_source_statuses() == (1, 1):
-                    (pos, latency) = find_func_unit(event.get_instruction())
-                    if pos != -1:
-                        event.update_event('EXEC')
-                        event.update_start(current_cycle)
-                        event.update_end(current_cycle + latency)
-                        event.set_fu_info(pos)
-            else:
-                event.update_end(current_cycle + 1)
+def queued_events():
+    """Lists the events of every stage in the order
+    their instructions issued
 
+    Keyword arguments:
+    None
+
+    Returns: List of PipeEvent
+    """
+    return [event for (_, _, event)
+            in sorted(READ_OPERANDS + EXECUTING + WRITING,
+                      key=itemgetter(1))]
 
 
 def print_reg_changes(clock_cycle):
@@ -770,7 +843,7 @@ def print_reg_changes(clock_cycle):
 
 
 def print_event_queue(clock_cycle):
-    """Prints out all elements in the EVENT_QUEUE
+    """Prints out every event in the event queues
 
     Keyword arguments:
     clock_cycle -- the current simulation clock cycle
@@ -779,15 +852,33 @@ def print_event_queue(clock_cycle):
     """
 
     print('CURRENT CYCLE: {}'.format(clock_cycle))
-    print('EVENT QUEUE LENGTH: {}'.format(len(EVENT_QUEUE)))
+    events = queued_events()
+    print('EVENT QUEUE LENGTH: {}'.format(len(events)))
 
-    for event in EVENT_QUEUE:
+    for event in events:
         print('-------------------------------')
         print(event)
 
     print('-------------------------------')
 
 
+def dump_state(clock_cycle):
+    """Prints out the functional units, the renaming
+    and status maps, the event queue and the register
+    file at the given clock cycle
+
+    Keyword arguments:
+    clock_cycle -- the current simulation clock cycle
+
+    Returns: None
+    """
+    get_unit_statistics()
+    print_reg_changes(clock_cycle)
+    print_event_queue(clock_cycle)
+    print('REGISTER FILE')
+    pprint(REGISTER_FILE)
+
+
 def check_halt_sig():
     """Checks if a halt signal was received
 
@@ -814,43 +905,87 @@ def check_res_status(source_reg):
 
     return -1 
 
-def tomsim(trace_file, config_file, output_file):
-    """Simulates Tomasulos on the given trace
-       based on the information in the configuration
-       file and outputs statistics to the output_file
+def skip_idle_cycles(current_cycle, dump_every):
+    """Finds the next cycle anything can happen on after
+       a cycle that neither issued nor wrote back.  Until
+       the next write back no operand becomes available
+       and no FU or reservation station is freed, so the
+       events reading operands fail every check and issue
+       stays stalled.  The checks of those events are moved
+       past the skipped cycles, keeping to every other cycle.
 
        Keyword arguments:
-       trace_file -- trace file of X encoded instructions
-       config_file -- defines system set up
-       output_file -- output json file
+       current_cycle -- first cycle not simulated yet
+       dump_every -- cycles between pipeline state dumps or None
+
+       Return: Int cycle to simulate next
+    """
+    if WRITING or not EXECUTING:
+        return current_cycle
+
+    next_cycle = EXECUTING[0][0]
+    if dump_every is not None:
+        next_cycle = min(next_cycle,
+                         current_cycle + (-current_cycle % dump_every))
+
+    if next_cycle > current_cycle:
+        for (position, (check, issued, event)) in enumerate(READ_OPERANDS):
+            if check < next_cycle:
+                check += (next_cycle - check + 1) // 2 * 2
+                event.update_end(check)
+                READ_OPERANDS[position] = (check, issued, event)
+        heapify(READ_OPERANDS)
+
+    return max(next_cycle, current_cycle)
+
+
+def simulate(instructions, config_file, interactive=True,
+             issue_cycles=None, dump_every=None):
+    """Simulates Tomasulos on a stream of decoded
+       instructions from a fresh pipeline until every
+       instruction has written back
 
-       Return: None
+       Keyword arguments:
+       instructions -- iterator of decoded instructions
+       config_file -- defines system set up
+       interactive -- print the pipeline state and wait for
+                      ENTER every cycle when True
+       issue_cycles -- list receiving the cycle every
+                       instruction issued in or None
+       dump_every -- print the pipeline state every this
+                     many cycles without waiting, or None
+
+       Return: Dictionary
     """
+    init_simulation()
     RES_STATUS['HALT'] = 0
     halt_sig = False
-    instruction_count = 0
     clock_cycle = 0
     stalls = 0
 
     parse_config(config_file)
-    instructions = parse_trace(trace_file)
+    window = deque()
 
 
     while True:
         (res_name, res_pos) = (None, None)
-        write_op_handler(clock_cycle)
+        written = write_op_handler(clock_cycle)
         exec_handler(clock_cycle)
         read_op_handler(clock_cycle)
 
         if check_halt_sig():
-            print('HALT RECEIVED')
+            if interactive:
+                print('HALT RECEIVED')
             halt_sig = True
 
-        if instruction_count < len(instructions) and not halt_sig:
-            (instr, dest, s1, s1_stat, s2, s2_stat) = get_instruction(
-                instructions, instruction_count)
+        if not window:
+            fill_window(window, instructions)
+
+        if window and not halt_sig:
+            (instr, dest, s1, s1_stat, s2, s2_stat) = window[0]
 
-            print('{} {} {} {}'.format(instr, dest, s1, s2)) 
+            if interactive:
+                print('{} {} {} {}'.format(instr, dest, s1, s2))
 
             (res_name, res_pos) = get_resv_station(instr)
             # Only prepare to fetch next instruction if no stall
@@ -882,11 +1017,15 @@ def tomsim(trace_file, config_file, output_file):
            
             if s1_rename == 'REG_FILE':
                 s1_stat = 1 
+
+            if s2_rename == 'REG_FILE':
+                s2_stat = 1
             
             new_event.set_sources(s1_rename, s2_rename)
             new_event.set_resv_info(res_name, res_pos)
             new_event.set_source_1_status(s1_stat)
             new_event.set_source_2_status(s2_stat)
+            wait_for_sources(new_event)
 
             if dest is not None:
                 set_dest_value(dest, 0) 
@@ -895,42 +1034,129 @@ def tomsim(trace_file, config_file, output_file):
                 rename_register(dest, res_name, res_pos)
                 update_reg_status(renamed_dest, 0)
 
-            EVENT_QUEUE.append(new_event)
-            instruction_count += 1
+            heappush(READ_OPERANDS,
+                     (new_event.get_end(), clock_cycle, new_event))
+            window.popleft()
+            if issue_cycles is not None:
+                issue_cycles.append(clock_cycle)
 
         elif res_name is 'STALL':
-            print('Stalling the Pipe')
+            if interactive:
+                print('Stalling the Pipe')
             stalls += 1
-        else:
+        elif interactive:
             print('Out of instructions')
 
-        get_unit_statistics()
-        print_reg_changes(clock_cycle)
-        print_event_queue(clock_cycle)
+        if interactive:
+            get_unit_statistics()
+            print_reg_changes(clock_cycle)
+            print_event_queue(clock_cycle)
+        elif dump_every is not None and clock_cycle % dump_every == 0:
+            dump_state(clock_cycle)
         clock_cycle += 1
 
-        if len(EVENT_QUEUE) == 0:
-            print("SIM DONE")
+        if not (READ_OPERANDS or EXECUTING or WRITING):
+            if interactive:
+                print("SIM DONE")
             break
 
-        pprint(REGISTER_FILE)    
-        input("Press ENTER to go to next cycle")
+        if interactive:
+            pprint(REGISTER_FILE)
+            input("Press ENTER to go to next cycle")
+        elif not written and res_name in (None, 'STALL'):
+            next_cycle = skip_idle_cycles(clock_cycle, dump_every)
+            if res_name == 'STALL':
+                stalls += next_cycle - clock_cycle
+            clock_cycle = next_cycle
 
-    stat_dict = process_statistics(clock_cycle, stalls)
+    return process_statistics(clock_cycle, stalls)
 
-    with open(output_file, 'w') as ofp:
-        json.dump(stat_dict, ofp)
 
-    pprint(stat_dict)
+def tomsim(trace_file, config_file, output_file, interactive=True,
+           execute=False, dump_every=None, display=None):
+    """Simulates Tomasulos on the given trace
+       based on the information in the configuration
+       file and outputs statistics to the output_file
 
-if __name__ == '__main__':
+       Keyword arguments:
+       trace_file -- trace file of X encoded instructions
+       config_file -- defines system set up
+       output_file -- output json file or None to only
+                      return the statistics
+       interactive -- print the pipeline state and wait for
+                      ENTER every cycle when True
+       execute -- run trace_file as a program and issue the
+                  instructions as they retire instead of
+                  reading them as a trace
+       dump_every -- print the pipeline state every this
+                     many cycles without waiting, or None
+       display -- pretty print the statistics when True,
+                  None to print them only when interactive
+
+       Return: Dictionary
+    """
+    if display is None:
+        display = interactive
+
+    if execute:
+        instructions = decode_retired(
+            xsim_stream.retire(parse_trace(trace_file)))
+    else:
+        instructions = decode_trace(parse_trace(trace_file))
+
+    stat_dict = simulate(instructions, config_file, interactive,
+                         dump_every=dump_every)
+
+    if output_file is not None:
+        with open(output_file, 'w') as ofp:
+            json.dump(stat_dict, ofp)
+
+    if display:
+        pprint(stat_dict)
 
-    if len(sys.argv) != 4:
-        print('Usage: ./tomsim tracefile config.json output.json')
-        exit(1)
+    return stat_dict
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments
+
+    Keyword arguments:
+    argv -- list of command line arguments sans program name
+
+    Returns: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog='./tomsim',
+        usage='./tomsim tracefile config.json output.json [options]')
+    parser.add_argument('trace_file')
+    parser.add_argument('config_file')
+    parser.add_argument('output_file')
+    parser.add_argument('--execute', action='store_true',
+                        help='run tracefile as a program and issue its '
+                             'instructions as they retire')
+    parser.add_argument('--step', action='store_true',
+                        help='print the pipeline state and wait for ENTER '
+                             'every cycle')
+    parser.add_argument('--dump-every', type=int, metavar='N',
+                        help='print the pipeline state every N cycles '
+                             'without waiting')
+    parser.add_argument('--quiet', action='store_true',
+                        help='do not display the statistics when the run '
+                             'ends')
+
+    args = parser.parse_args(argv)
+    if args.step and args.quiet:
+        parser.error('--step and --quiet cannot be combined')
+    if args.dump_every is not None and args.dump_every <= 0:
+        parser.error('--dump-every needs a positive number of cycles')
+
+    return args
+
+
+if __name__ == '__main__':
 
-    TRACE_FILE = sys.argv[1]
-    CONFIG_FILE = sys.argv[2]
-    OUTPUT_FILE = sys.argv[3]
+    ARGS = parse_arguments(sys.argv[1:])
 
-    tomsim(TRACE_FILE, CONFIG_FILE, OUTPUT_FILE)
+    tomsim(ARGS.trace_file, ARGS.config_file, ARGS.output_file,
+           interactive=ARGS.step, execute=ARGS.execute,
+           dump_every=ARGS.dump_every, display=not ARGS.quiet)
@@ -0,0 +1,135 @@
+#!/usr/bin/python
+"""
+Project: tomsim simulator
+Module:  tomsim_batch
+Course:  CS2410
+
+Batch runner for every trace against every functional unit
+configuration.  Jobs run in a pool of worker processes that
+import the simulator once and are reused for every job, and all
+statistics are written to one aggregated JSON file.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+
+import tomsim
+
+
+def expand_patterns(patterns):
+    """Expands a list of file names and glob patterns
+
+       Keyword arguments:
+       patterns -- list of file names or glob patterns
+
+       Return: List of file names in order without duplicates
+    """
+    file_names = []
+
+    for pattern in patterns:
+        for file_name in sorted(glob.glob(pattern)):
+            if file_name not in file_names:
+                file_names.append(file_name)
+
+    return file_names
+
+
+def load_manifest(manifest_file):
+    """Reads a batch manifest.  The manifest is a JSON object
+       with a 'traces' and a 'configs' list of file names or
+       glob patterns.
+
+       Keyword arguments:
+       manifest_file -- JSON manifest file
+
+       Return: Tuple(list of trace files, list of config files)
+    """
+    with open(manifest_file) as manifest:
+        manifest_values = json.load(manifest)
+
+    return (expand_patterns(manifest_values['traces']),
+            expand_patterns(manifest_values['configs']))
+
+
+def run_job(job):
+    """Runs one simulation in a worker process
+
+       Keyword arguments:
+       job -- Tuple(trace file, config file)
+
+       Return: Dictionary of the job and its statistics, or the
+               error that stopped it
+    """
+    (trace_file, config_file) = job
+    result = {'trace': trace_file, 'config': config_file}
+
+    try:
+        result['statistics'] = tomsim.tomsim(trace_file, config_file, None,
+                                             interactive=False)
+    except Exception as error:
+        result['error'] = '{}: {}'.format(type(error).__name__, error)
+
+    return result
+
+
+def run_batch(trace_files, config_files, workers=None):
+    """Runs every trace file against every config file
+
+       Keyword arguments:
+       trace_files -- list of instruction traces
+       config_files -- list of functional unit configuration files
+       workers -- number of worker processes, all cores if None
+
+       Return: List of job results in trace major order
+    """
+    jobs = [(trace_file, config_file)
+            for trace_file in trace_files
+            for config_file in config_files]
+    workers = workers or os.cpu_count()
+    chunk_size = max(1, len(jobs) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_job, jobs, chunksize=chunk_size))
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments
+
+       Keyword arguments:
+       argv -- list of command line arguments sans program name
+
+       Return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog='./tomsim_batch',
+        usage='./tomsim_batch manifest outputfile [options]')
+    parser.add_argument('manifest_file')
+    parser.add_argument('output_file')
+    parser.add_argument('--workers', type=int,
+                        help='number of worker processes '
+                             '(default: number of cores)')
+
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+
+    ARGS = parse_arguments(sys.argv[1:])
+    (TRACE_FILES, CONFIG_FILES) = load_manifest(ARGS.manifest_file)
+
+    START = time.perf_counter()
+    RESULTS = run_batch(TRACE_FILES, CONFIG_FILES, ARGS.workers)
+    ELAPSED = time.perf_counter() - START
+
+    with open(ARGS.output_file, 'w') as OFP:
+        json.dump(RESULTS, OFP)
+
+    FAILED = sum(1 for result in RESULTS if 'error' in result)
+    print('{} jobs ({} failed) in {:.2f}s: {:.1f} jobs/s'.format(
+        len(RESULTS), FAILED, ELAPSED, len(RESULTS) / max(ELAPSED, 1e-9)))
@@ -0,0 +1,285 @@
+#!/usr/bin/python
+"""
+Project: tomsim simulator
+Module:  tomsim_sample
+Course:  CS2410
+
+Sampled simulation of long programs.  The functional simulator of
+xsim_stream runs the program and only a few windows of it are
+simulated in detail by tomsim, the rest being fast forwarded.
+
+Every period of M instructions starts with W warm-up instructions
+and N measured instructions that are simulated in detail from an
+empty pipeline.  The warm-up fills the reservation stations and
+functional units so that the measured instructions see a busy
+machine.  The cycles of a window are the cycles between the issue
+of the last warm-up instruction and of the last measured one, so
+the drain of the pipeline is not counted.  The CPI of the windows
+is extrapolated to every instruction of the program with a
+confidence interval from the spread of the window CPIs, normal
+approximation as in SMARTS.
+
+With a SimPoint manifest from xsim_simpoint the measured windows
+are the representative intervals instead, each preceded by W
+warm-up instructions, and their CPIs are weighted as the manifest
+says.
+
+Branches and jumps retire in the functional simulator and are not
+issued, as with tomsim --execute, but they count as instructions.
+"""
+
+import sys
+import json
+import math
+import argparse
+
+from collections import deque
+from itertools import chain, islice
+from statistics import NormalDist
+
+import tomsim
+import xsim_stream
+
+# DEFINES
+DEFAULT_WINDOW = 1000
+DEFAULT_PERIOD = 100000
+DEFAULT_WARMUP = 200
+DEFAULT_CONFIDENCE = 0.95
+
+
+def fast_forward(retired, count):
+    """Retires instructions in the functional simulator
+       without simulating them in detail
+
+       Keyword arguments:
+       retired -- generator of retired instruction records
+       count -- number of instructions to retire
+
+       Return: Number of instructions retired, fewer than count
+               when the program ended
+    """
+    skipped = deque(enumerate(islice(retired, count), 1), maxlen=1)
+    return skipped[0][0] if skipped else 0
+
+
+def measure_window(warmup_records, window_records, config_file):
+    """Simulates a warm-up and a measured window in detail
+       from an empty pipeline
+
+       Keyword arguments:
+       warmup_records -- retired instruction records warming up
+       window_records -- retired instruction records measured
+       config_file -- tomsim configuration file
+
+       Return: Cycles of the measured instructions or None when
+               none of them issued
+    """
+    warmup = list(tomsim.decode_retired(warmup_records))
+    window = list(tomsim.decode_retired(window_records))
+    issue_cycles = []
+
+    tomsim.simulate(chain(warmup, window), config_file, interactive=False,
+                    issue_cycles=issue_cycles)
+
+    if len(issue_cycles) <= len(warmup):
+        return None
+    if warmup:
+        return issue_cycles[-1] - issue_cycles[len(warmup) - 1]
+    return issue_cycles[-1] + 1
+
+
+def confidence_interval(cpis, instructions, confidence):
+    """Extrapolates the cycles of a program from the CPI of
+       its windows
+
+       Keyword arguments:
+       cpis -- CPI of every measured window
+       instructions -- instructions of the whole program
+       confidence -- confidence level of the interval
+
+       Return: Dictionary
+    """
+    count = len(cpis)
+    mean = sum(cpis) / count
+    if count > 1:
+        deviation = math.sqrt(sum((cpi - mean) ** 2 for cpi in cpis) /
+                              (count - 1))
+    else:
+        deviation = 0.0
+    z_score = NormalDist().inv_cdf((1 + confidence) / 2)
+    half_width = z_score * deviation / math.sqrt(count)
+
+    return {'samples': count,
+            'cpi': round(mean, 6),
+            'cpi_stdev': round(deviation, 6),
+            'confidence': confidence,
+            'cycles': round(mean * instructions),
+            'cycles_low': round((mean - half_width) * instructions),
+            'cycles_high': round((mean + half_width) * instructions),
+            'relative_error': round(half_width / mean, 6) if mean else 0.0}
+
+
+def sample(instruction_memory, config_file, window=DEFAULT_WINDOW,
+           period=DEFAULT_PERIOD, warmup=DEFAULT_WARMUP,
+           confidence=DEFAULT_CONFIDENCE):
+    """Estimates the cycles of a program from a detailed
+       window of every period
+
+       Keyword arguments:
+       instruction_memory -- sequence of 16 bit instruction words
+       config_file -- tomsim configuration file
+       window -- instructions measured every period
+       period -- instructions from the start of one window's
+                 warm-up to the next
+       warmup -- instructions simulated before every window
+       confidence -- confidence level of the interval
+
+       Return: Dictionary
+    """
+    if window <= 0 or warmup < 0 or warmup + window > period:
+        raise ValueError('need 0 < window and warmup + window <= period')
+
+    retired = xsim_stream.retire(instruction_memory)
+    instructions = 0
+    cpis = []
+
+    while True:
+        warmup_records = list(islice(retired, warmup))
+        window_records = list(islice(retired, window))
+        instructions += len(warmup_records) + len(window_records)
+        if window_records:
+            cycles = measure_window(warmup_records, window_records,
+                                    config_file)
+            if cycles is not None:
+                cpis.append(cycles / len(window_records))
+        if len(window_records) < window:
+            break
+        skipped = fast_forward(retired, period - warmup - window)
+        instructions += skipped
+        if skipped < period - warmup - window:
+            break
+
+    if not cpis:
+        raise ValueError('no window was simulated')
+
+    estimate = confidence_interval(cpis, instructions, confidence)
+    estimate.update({'instructions': instructions,
+                     'window': window,
+                     'period': period,
+                     'warmup': warmup,
+                     'detailed_instructions': len(cpis) * (warmup + window)})
+    return estimate
+
+
+def sample_simpoints(instruction_memory, config_file, manifest,
+                     warmup=DEFAULT_WARMUP):
+    """Estimates the cycles of a program from the detailed
+       simulation of its SimPoint intervals
+
+       Keyword arguments:
+       instruction_memory -- sequence of 16 bit instruction words
+       config_file -- tomsim configuration file
+       manifest -- manifest written by xsim_simpoint
+       warmup -- instructions simulated before every interval
+
+       Return: Dictionary
+    """
+    retired = xsim_stream.retire(instruction_memory)
+    position = 0
+    cpi = 0.0
+    simpoints = []
+
+    for simpoint in sorted(manifest['simpoints'],
+                           key=lambda simpoint: simpoint['start']):
+        warmup_start = max(simpoint['start'] - warmup, position)
+        position += fast_forward(retired, warmup_start - position)
+        warmup_records = list(islice(retired, simpoint['start'] - position))
+        window_records = list(islice(retired, simpoint['instructions']))
+        position += len(warmup_records) + len(window_records)
+        if not window_records:
+            raise ValueError('program ended before the simpoint at '
+                             'instruction {}'.format(simpoint['start']))
+
+        cycles = measure_window(warmup_records, window_records, config_file)
+        interval_cpi = (cycles or 0) / len(window_records)
+        cpi += simpoint['weight'] * interval_cpi
+        simpoints.append({'interval': simpoint['interval'],
+                          'start': simpoint['start'],
+                          'weight': simpoint['weight'],
+                          'cpi': round(interval_cpi, 6)})
+
+    return {'samples': len(simpoints),
+            'cpi': round(cpi, 6),
+            'cycles': round(cpi * manifest['instructions']),
+            'instructions': manifest['instructions'],
+            'warmup': warmup,
+            'simpoints': simpoints,
+            'xsim_cpi_error': manifest.get('xsim_cpi_error')}
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments
+
+    Keyword arguments:
+    argv -- list of command line arguments sans program name
+
+    Returns: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog='./tomsim_sample',
+        usage='./tomsim_sample programfile config.json output.json '
+              '[options]')
+    parser.add_argument('program_file')
+    parser.add_argument('config_file')
+    parser.add_argument('output_file')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW,
+                        help='instructions measured in detail every period '
+                             '(default: %(default)s)')
+    parser.add_argument('--period', type=int, default=DEFAULT_PERIOD,
+                        help='instructions between the starts of two '
+                             'windows (default: %(default)s)')
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP,
+                        help='instructions simulated in detail before every '
+                             'window (default: %(default)s)')
+    parser.add_argument('--confidence', type=float,
+                        default=DEFAULT_CONFIDENCE,
+                        help='confidence level of the cycle interval '
+                             '(default: %(default)s)')
+    parser.add_argument('--simpoints', metavar='MANIFEST',
+                        help='measure the intervals of an xsim_simpoint '
+                             'manifest instead of periodic windows')
+
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+
+    ARGS = parse_arguments(sys.argv[1:])
+    PROGRAM = tomsim.parse_trace(ARGS.program_file)
+
+    try:
+        if ARGS.simpoints is not None:
+            with open(ARGS.simpoints) as MANIFEST:
+                ESTIMATE = sample_simpoints(PROGRAM, ARGS.config_file,
+                                            json.load(MANIFEST), ARGS.warmup)
+        else:
+            ESTIMATE = sample(PROGRAM, ARGS.config_file, ARGS.window,
+                              ARGS.period, ARGS.warmup, ARGS.confidence)
+    except ValueError as error:
+        print('ERROR: {}'.format(error), file=sys.stderr)
+        exit(1)
+
+    with open(ARGS.output_file, 'w') as OFP:
+        json.dump(ESTIMATE, OFP)
+
+    if 'cycles_low' in ESTIMATE:
+        print('{} instructions, CPI {} from {} windows: {} cycles '
+              '({} to {} at {:.0%})'.format(
+                  ESTIMATE['instructions'], ESTIMATE['cpi'],
+                  ESTIMATE['samples'], ESTIMATE['cycles'],
+                  ESTIMATE['cycles_low'], ESTIMATE['cycles_high'],
+                  ESTIMATE['confidence']))
+    else:
+        print('{} instructions, CPI {} from {} simpoints: {} cycles'.format(
+            ESTIMATE['instructions'], ESTIMATE['cpi'], ESTIMATE['samples'],
+            ESTIMATE['cycles']))
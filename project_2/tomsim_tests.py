@@ -0,0 +1,201 @@
+#!/usr/bin/python
+"""
+Project: tomsim simulator testing
+Course: CS2410
+"""
+import glob
+import random
+
+import tomsim
+import tomsim_sample
+import xsim_stream
+
+#DEFINES
+
+CONFIG_FILE = 'configs/example_config.json'
+TRACE_FILES = sorted(glob.glob('traces/*.t'))
+
+# Cycles, stalls and register file reads of every trace on every
+# config, as simulated by the original interactive tomsim
+GOLDEN_RUNS = {
+    ('array_example', 'example'): (216, 4, 2),
+    ('array_example', 'narrow'): (75, 43, 1),
+    ('array_example', 'wide'): (21, 0, 3),
+    ('basic_functionality', 'example'): (71, 18, 5),
+    ('basic_functionality', 'narrow'): (48, 33, 1),
+    ('basic_functionality', 'wide'): (35, 0, 7),
+    ('debug', 'example'): (7, 1, 0),
+    ('debug', 'narrow'): (10, 4, 0),
+    ('debug', 'wide'): (7, 0, 0),
+    ('example', 'example'): (14, 4, 0),
+    ('example', 'narrow'): (22, 12, 0),
+    ('example', 'wide'): (10, 0, 1),
+    ('hazard_check', 'example'): (71, 39, 7),
+    ('hazard_check', 'narrow'): (48, 33, 2),
+    ('hazard_check', 'wide'): (35, 0, 7),
+    ('load_store_test', 'example'): (116, 102, 1),
+    ('load_store_test', 'narrow'): (43, 29, 2),
+    ('load_store_test', 'wide'): (22, 0, 1),
+    ('loop_carry_test', 'example'): (23, 3, 2),
+    ('loop_carry_test', 'narrow'): (31, 17, 0),
+    ('loop_carry_test', 'wide'): (14, 0, 2),
+    ('more_hazard_test', 'example'): (31, 1, 4),
+    ('more_hazard_test', 'narrow'): (28, 16, 2),
+    ('more_hazard_test', 'wide'): (23, 0, 4),
+    ('op_medley', 'example'): (49, 0, 2),
+    ('op_medley', 'narrow'): (31, 16, 1),
+    ('op_medley', 'wide'): (19, 0, 2),
+    ('slides_example', 'example'): (27, 0, 1),
+    ('slides_example', 'narrow'): (20, 6, 2),
+    ('slides_example', 'wide'): (19, 0, 1),
+    ('test_trace', 'example'): (881, 31, 17),
+    ('test_trace', 'narrow'): (298, 208, 7),
+    ('test_trace', 'wide'): (81, 0, 11),
+    ('un_looped', 'example'): (28, 4, 7),
+    ('un_looped', 'narrow'): (37, 20, 0),
+    ('un_looped', 'wide'): (18, 0, 4)}
+
+# OP CODES of the generated programs
+BODY_OPCODES = [xsim_stream.ADD, xsim_stream.SUB, xsim_stream.AND,
+                xsim_stream.NOR, xsim_stream.MUL, xsim_stream.LW,
+                xsim_stream.SW]
+
+
+def full_run(program):
+    """Simulates every instruction a program retires in
+       detail
+
+       Keyword arguments:
+       program -- sequence of 16 bit instruction words
+
+       Return: Tuple(statistics, issue cycle of every
+                     instruction, instructions retired)
+    """
+    issue_cycles = []
+    statistics = tomsim.simulate(
+        tomsim.decode_retired(xsim_stream.retire(program)), CONFIG_FILE,
+        interactive=False, issue_cycles=issue_cycles)
+    retired = sum(1 for _ in xsim_stream.retire(program))
+
+    return (statistics, issue_cycles, retired)
+
+
+def random_loop(seed, body=40, iterations=100):
+    """Builds a loop running a random body of register and
+       memory operations
+
+       Keyword arguments:
+       seed -- seed of the random body
+       body -- instructions in the body
+       iterations -- runs of the body
+
+       Return: List of 16 bit instruction words
+    """
+    rng = random.Random(seed)
+    # r1 = 1, r2 = iterations
+    words = [(xsim_stream.LIZ << 11) | (1 << 8) | 1,
+             (xsim_stream.LIZ << 11) | (2 << 8) | iterations]
+    for _ in range(body):
+        words.append((rng.choice(BODY_OPCODES) << 11) |
+                     (rng.randrange(3, 8) << 8) |
+                     (rng.randrange(1, 8) << 5) |
+                     (rng.randrange(1, 8) << 2))
+    # r2 = r2 - r1, loop back to the body while r2 > 0, halt
+    words += [(xsim_stream.SUB << 11) | (2 << 8) | (2 << 5) | (1 << 2),
+              (xsim_stream.BP << 11) | (2 << 8) | 2,
+              xsim_stream.HALT << 11]
+
+    return words
+
+
+def test_sample_one_window_matches_full_run():
+    """Tests that a window covering a whole trace measures
+       the cycles up to the issue of its last instruction in a
+       full run of the trace.
+    """
+    assert TRACE_FILES
+
+    for trace_file in TRACE_FILES:
+        program = tomsim.parse_trace(trace_file)
+        (_, issue_cycles, retired) = full_run(program)
+
+        estimate = tomsim_sample.sample(program, CONFIG_FILE,
+                                        window=retired, period=retired,
+                                        warmup=0)
+
+        assert 1 == estimate['samples']
+        assert retired == estimate['instructions']
+        assert issue_cycles[-1] + 1 == estimate['cycles']
+        assert estimate['cycles_low'] == estimate['cycles_high']
+
+
+def test_sample_counts_every_instruction():
+    """Tests that the windows, warm-ups and fast forwarded
+       instructions add up to the instructions of a full run.
+    """
+    program = tomsim.parse_trace('traces/test_trace.t')
+    (_, _, retired) = full_run(program)
+
+    estimate = tomsim_sample.sample(program, CONFIG_FILE, window=10,
+                                    period=20, warmup=5)
+
+    assert retired == estimate['instructions']
+    assert 4 == estimate['samples']
+    assert 4 * 15 == estimate['detailed_instructions']
+
+
+def test_sample_interval_contains_true_cpi():
+    """Tests that the confidence interval of a sampled run
+       of a random loop contains the cycles of its full run.
+    """
+    program = random_loop(seed=0)
+    (statistics, _, retired) = full_run(program)
+
+    estimate = tomsim_sample.sample(program, CONFIG_FILE, window=100,
+                                    period=500, warmup=50)
+    true_cpi = statistics['cycles'] / retired
+
+    assert retired == estimate['instructions']
+    assert 9 == estimate['samples']
+    assert estimate['cycles_low'] <= statistics['cycles'] <= \
+        estimate['cycles_high']
+    assert abs(estimate['cpi'] - true_cpi) / true_cpi < 0.05
+
+
+def test_tomsim_matches_golden_runs(capsys):
+    """Tests that headless runs, with and without idle cycle
+       skipping, simulate every trace on every config cycle for
+       cycle as the original interactive tomsim did.
+    """
+    for ((trace, config), golden) in sorted(GOLDEN_RUNS.items()):
+        trace_file = 'traces/{}.t'.format(trace)
+        config_file = 'configs/{}_config.json'.format(config)
+
+        for dump_every in [None, 1]:
+            statistics = tomsim.tomsim(trace_file, config_file, None,
+                                       interactive=False,
+                                       dump_every=dump_every)
+            capsys.readouterr()
+
+            assert golden == (statistics['cycles'], statistics['stalls'],
+                              statistics['reg reads']), (trace, config)
+
+
+def test_tomsim_credits_the_unit_that_ran():
+    """Tests that the per-unit statistics credit the unit an
+       instruction ran on rather than always the first one of
+       its class.
+    """
+    # the two multiplies of un_looped overlap
+    statistics = tomsim.tomsim('traces/un_looped.t', CONFIG_FILE, None,
+                               interactive=False)
+    assert [1, 1] == [unit['instructions']
+                      for unit in statistics['multiplier']]
+
+    # two divides and two loads overlap on the wide config
+    statistics = tomsim.tomsim('traces/array_example.t',
+                               'configs/wide_config.json', None,
+                               interactive=False)
+    assert [1, 1] == [unit['instructions']
+                      for unit in statistics['divider']]
+    assert [1, 1] == [unit['instructions'] for unit in statistics['load']]
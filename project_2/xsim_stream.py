@@ -0,0 +1,186 @@
+#!/usr/bin/python
+"""
+Project: tomsim simulator
+Module:  xsim_stream
+Course:  CS2410
+
+Functional X simulator run as a generator of retired instructions
+so that tomsim can be driven by execution instead of a trace.
+Registers and data memory are plain 16 bit ints with the same
+semantics as the integer engine of xsim.  Every retired
+instruction is yielded with its resolved next PC and, for loads
+and stores, the word address it accesses.  Nothing is kept per
+retired instruction, so programs of any length run in constant
+memory.
+"""
+
+from array import array
+
+# DEFINES
+WORD_MASK = 0xFFFF
+SIGN_BIT = 0x8000
+WORD_MODULUS = 0x10000
+REGISTER_COUNT = 8
+MEMORY_WORDS = 1 << 16
+
+# OP CODES
+ADD = 0b00000
+SUB = 0b00001
+AND = 0b00010
+NOR = 0b00011
+DIV = 0b00100
+MUL = 0b00101
+MOD = 0b00110
+EXP = 0b00111
+LW = 0b01000
+SW = 0b01001
+JR = 0b01100
+HALT = 0b01101
+PUT = 0b01110
+LIZ = 0b10000
+LIS = 0b10001
+LUI = 0b10010
+JALR = 0b10011
+BP = 0b10100
+BN = 0b10101
+BX = 0b10110
+BZ = 0b10111
+J = 0b11000
+
+
+def to_signed(value):
+    """Interprets a 16 bit word as a two's complement integer
+
+       Keyword arguments:
+       value -- 16 bit unsigned word
+
+       Return: int
+    """
+    return value - WORD_MODULUS if value & SIGN_BIT else value
+
+
+def bounded_exp(base, exponent):
+    """Raises base to exponent keeping only the lower
+       16 bits of the result.  Negative exponents truncate
+       toward zero.
+
+       Keyword arguments:
+       base -- signed base
+       exponent -- signed exponent
+
+       Return: int
+    """
+    if exponent >= 0:
+        return pow(base, exponent, WORD_MODULUS)
+    if base == 0:
+        raise ZeroDivisionError('0 cannot be raised to a negative power')
+    if base == 1 or (base == -1 and exponent % 2 == 0):
+        return 1
+    if base == -1:
+        return WORD_MASK
+    return 0
+
+
+def alu(op_code, left, right):
+    """Computes the result of a register to register operation
+
+       Keyword arguments:
+       op_code -- op_code of the operation
+       left -- 16 bit word of rs
+       right -- 16 bit word of rt
+
+       Return: 16 bit word
+    """
+    if op_code == ADD:
+        return (left + right) & WORD_MASK
+    if op_code == SUB:
+        return (left - right) & WORD_MASK
+    if op_code == AND:
+        return left & right
+    if op_code == NOR:
+        return ~(left | right) & WORD_MASK
+
+    left = to_signed(left)
+    right = to_signed(right)
+    if op_code == DIV:
+        quotient = abs(left) // abs(right)
+        if (left < 0) != (right < 0):
+            quotient = -quotient
+        return quotient & WORD_MASK
+    if op_code == MUL:
+        return (left * right) & WORD_MASK
+    if op_code == MOD:
+        return (left % right) & WORD_MASK
+    return bounded_exp(left, right)
+
+
+def retire(instruction_memory):
+    """Executes a program and yields every instruction as it
+       retires.  The run ends after HALT or when the PC leaves
+       instruction memory.
+
+       Keyword arguments:
+       instruction_memory -- sequence of 16 bit instruction words
+
+       Return: Generator of Tuple(PC, instruction word, next PC
+               or None after HALT, word address of a load or
+               store or None)
+    """
+    registers = [0] * REGISTER_COUNT
+    memory = array('H', bytes(2 * MEMORY_WORDS))
+    program_length = len(instruction_memory)
+    program_counter = 0
+
+    while 0 <= program_counter < program_length:
+        word = instruction_memory[program_counter]
+        op_code = word >> 11
+        rd = (word >> 8) & 7
+        rs = (word >> 5) & 7
+        imm8 = word & 0xFF
+        next_pc = program_counter + 1
+        address = None
+
+        if op_code <= EXP:
+            registers[rd] = alu(op_code, registers[rs],
+                                registers[(word >> 2) & 7])
+        elif op_code == LW:
+            address = registers[rs]
+            registers[rd] = memory[address]
+        elif op_code == SW:
+            address = registers[rs]
+            memory[address] = registers[(word >> 2) & 7]
+        elif op_code == LIZ:
+            registers[rd] = imm8
+        elif op_code == LIS:
+            registers[rd] = imm8 | 0xFF00 if imm8 & 0x80 else imm8
+        elif op_code == LUI:
+            registers[rd] = (imm8 << 8) | (registers[rd] & 0xFF)
+        elif op_code == BP:
+            if to_signed(registers[rd]) > 0:
+                next_pc = imm8
+        elif op_code == BN:
+            if registers[rd] & SIGN_BIT:
+                next_pc = imm8
+        elif op_code == BX:
+            if registers[rd] != 0:
+                next_pc = imm8
+        elif op_code == BZ:
+            if registers[rd] == 0:
+                next_pc = imm8
+        elif op_code == JR:
+            next_pc = to_signed(registers[rs])
+        elif op_code == JALR:
+            registers[rd] = next_pc & WORD_MASK
+            next_pc = int(to_signed(registers[rs]) / 2)
+        elif op_code == J:
+            next_pc = to_signed(((program_counter * 2) & 0xF800) |
+                                (word & 0x7FF))
+        elif op_code == HALT:
+            yield (program_counter, word, None, None)
+            return
+        elif op_code != PUT:
+            raise ValueError('unknown op_code {:05b} at PC {}'.format(
+                op_code, program_counter))
+
+        yield (program_counter, word, next_pc, address)
+        program_counter = next_pc